@@ -13,8 +13,32 @@ BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 RAW_PDF_DIR = DATA_DIR / "raw_pdfs"
 PROCESSED_DIR = DATA_DIR / "processed"
+IMAGES_DIR = PROCESSED_DIR / "images"
 SESSIONS_DIR = DATA_DIR / "sessions"
 QUESTIONS_FILE = DATA_DIR / "questions.json"
+QUESTIONS_DB = DATA_DIR / "questions.db"
+# One question id array per daily mock paper
+MOCK_PAPERS_DIR = DATA_DIR / "mock_papers"
+# Per-user seen/attempted/correct/incorrect bitmaps
+EXPOSURE_DIR = SESSIONS_DIR / "exposure"
+# Per-user spaced-repetition review logs
+REVIEWS_DIR = SESSIONS_DIR / "reviews"
+# In-progress mock attempts (answers, position, start time) shared by all server nodes
+MOCK_SESSIONS_DB = SESSIONS_DIR / "mock_sessions.db"
+MOCK_STATE_DIR = SESSIONS_DIR / "mock_state"
+# Fitted IRT item difficulty/discrimination and user ability
+IRT_PARAMS_FILE = DATA_DIR / "irt_params.npz"
+# Snapshot published by `main.py publish-bank` for every server process to map
+PUBLISHED_BANK_FILE = DATA_DIR / "questions.published.snap"
+
+# Question bank backend: "json" (questions.json) or "sqlite" (questions.db)
+STORAGE_BACKEND = os.environ.get("FMGE_STORAGE_BACKEND", "json")
+
+# In-progress mock backend: "sqlite" (mock_sessions.db) or "file" (mock_state/)
+MOCK_SESSION_BACKEND = os.environ.get("FMGE_MOCK_SESSION_BACKEND", "sqlite")
+
+# Journal entries appended to questions.json before it is compacted in the background
+JOURNAL_COMPACT_THRESHOLD = 1000
 
 # Ensure directories exist
 for dir_path in [DATA_DIR, RAW_PDF_DIR, PROCESSED_DIR, SESSIONS_DIR]:
@@ -27,6 +51,7 @@ class ParserConfig:
     
     # Minimum requirements for valid question
     min_question_length: int = 20
+    max_question_length: int = 2000  # Longer is suspicious
     min_option_length: int = 1
     required_options: int = 4
     
@@ -54,7 +79,8 @@ class ParserConfig:
         r'\*[A-Da-d]\*',               # *A*
     ])
     
-    # Noise patterns to remove
+    # Noise lines to remove: a line that is only one of these (plus any
+    # trailing non-space text, e.g. the rest of a URL) is stripped
     noise_patterns: List[str] = field(default_factory=lambda: [
         r'PrepLadder',
         r'DAMS',
@@ -64,6 +90,16 @@ class ParserConfig:
         r'Copyright',
         r'All Rights Reserved',
     ])
+    
+    # Garbage patterns - question is rejected (case-insensitive)
+    garbage_patterns: List[str] = field(default_factory=lambda: [
+        r'^[\d\s\.\-]+$',              # Only numbers and punctuation
+        r'^[A-Z]{20,}$',               # All caps gibberish
+        r'lorem ipsum',                # Placeholder text
+    ])
+    
+    # Time each rule individually on every Nth scan (0 disables)
+    rule_profile_every: int = 50
 
 
 @dataclass
@@ -104,6 +140,9 @@ class ExamConfig:
     correct_marks: float = 1.0
     incorrect_marks: float = 0.0  # No negative marking in FMGE
     unattempted_marks: float = 0.0
+    
+    # Autosave: journal events between full checkpoints of a session
+    checkpoint_every: int = 50
 
 
 @dataclass
@@ -134,8 +173,73 @@ class SubjectConfig:
 
 
 
+@dataclass
+class BackupConfig:
+    """Configuration for question bank backups"""
+    
+    # Content-defined chunking: a chunk ends after a line whose CRC32 has
+    # boundary_bits low zero bits, within these size limits
+    min_chunk_size: int = 16 * 1024
+    max_chunk_size: int = 256 * 1024
+    boundary_bits: int = 6
+    
+    # Retention: the newest keep_last backups, plus the newest backup in
+    # each of the last N hours / days / ISO weeks
+    keep_last: int = 10
+    keep_hourly: int = 24
+    keep_daily: int = 7
+    keep_weekly: int = 8
+
+
+@dataclass
+class MockBlueprint:
+    """Composition of a generated mock paper"""
+    
+    # Questions per subject; names match SubjectConfig. Scaled when a paper
+    # of another length is requested
+    subject_counts: Dict[str, int] = field(default_factory=lambda: {
+        "Anatomy": 9, "Physiology": 8, "Biochemistry": 8,
+        "Pathology": 7, "Pharmacology": 7, "Microbiology": 7,
+        "Forensic Medicine": 5, "Community Medicine": 15,
+        "ENT": 7, "Ophthalmology": 8,
+        "Medicine": 17, "Surgery": 16, "Obstetrics & Gynecology": 15, "Pediatrics": 8,
+        "Psychiatry": 3, "Dermatology": 3, "Radiology": 2, "Anaesthesia": 2, "Orthopedics": 3,
+    })
+    
+    # Share of image-based questions, spread over subjects that have them
+    image_ratio: float = 0.1
+    
+    # Year mix: within a subject, a question from year Y is weight[Y] times
+    # as likely as one from an unlisted year (weight 1.0)
+    year_weights: Dict[str, float] = field(default_factory=dict)
+    
+    @property
+    def total(self) -> int:
+        return sum(self.subject_counts.values())
+
+
+@dataclass
+class ReviewConfig:
+    """Spaced-repetition (SM-2) scheduling of practice reviews"""
+    
+    initial_ease: float = 2.5
+    min_ease: float = 1.3
+    # Intervals in days after the first and second successful review
+    first_interval: float = 1.0
+    second_interval: float = 6.0
+    
+    # A correct answer slower than this counts as uncertain
+    slow_answer_seconds: int = 90
+    
+    # Cards fetched for one "Review due" session
+    session_size: int = 50
+
+
 # Global config instances
 PARSER_CONFIG = ParserConfig()
 IMAGE_CONFIG = ImageConfig()
 EXAM_CONFIG = ExamConfig()
-SUBJECT_CONFIG = SubjectConfig()
\ No newline at end of file
+SUBJECT_CONFIG = SubjectConfig()
+BACKUP_CONFIG = BackupConfig()
+MOCK_BLUEPRINT = MockBlueprint()
+REVIEW_CONFIG = ReviewConfig()
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Cleaning Rules Module
+Declarative validation and noise rules compiled once from ParserConfig
+Finds rule matches with one combined scan and tracks per-rule hits and cost
+"""
+
+import re
+import time
+from bisect import bisect_right
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+
+from config.settings import PARSER_CONFIG
+
+
+REJECT = "reject"   # Question is dropped when the rule fires
+STRIP = "strip"     # Matched text is removed from the question
+
+# A noise pattern only strips a line that is nothing but the noise (a
+# watermark, footer or URL line), never text inside a sentence: "Marrow"
+# is a publisher name on its own line and anatomy in "Bone Marrow".
+NOISE_LINE = r"^[ \t]*(?:{})\S*[ \t]*$"
+
+
+@dataclass
+class CleaningRule:
+    """A single regex rule declared in config"""
+    name: str
+    pattern: str
+    action: str
+    flags: int = 0
+
+
+@dataclass
+class RuleStats:
+    """Counters for one rule"""
+    hits: int = 0
+    profiled_scans: int = 0
+    profiled_time: float = 0.0  # seconds spent in this rule alone
+
+    def to_dict(self) -> Dict:
+        avg_us = (self.profiled_time / self.profiled_scans * 1e6) if self.profiled_scans else 0.0
+        return {
+            "hits": self.hits,
+            "profiled_scans": self.profiled_scans,
+            "avg_cost_us": round(avg_us, 2),
+        }
+
+
+@dataclass
+class ScanResult:
+    """Outcome of scanning one question"""
+    rejected_by: List[str] = field(default_factory=list)
+    # (field index, start, end) spans to strip, relative to each field
+    strip_spans: List[Tuple[int, int, int]] = field(default_factory=list)
+
+    @property
+    def is_rejected(self) -> bool:
+        return bool(self.rejected_by)
+
+
+def rules_from_config(config=None) -> List[CleaningRule]:
+    """Build the rule list from ParserConfig pattern lists"""
+    config = config or PARSER_CONFIG
+    rules = []
+
+    for pattern in config.garbage_patterns:
+        rules.append(CleaningRule(f"garbage:{pattern}", pattern, REJECT, re.IGNORECASE))
+
+    for pattern in config.noise_patterns:
+        rules.append(CleaningRule(f"noise:{pattern}", NOISE_LINE.format(pattern), STRIP, re.MULTILINE))
+
+    return rules
+
+
+class RuleEngine:
+    """
+    Runs all cleaning rules as one alternation regex.
+    Each rule becomes a named group, so a single finditer pass reports
+    which rules fired. That pass consumes the text it matches, so a rule
+    matching inside (or overlapping) another rule's match is not reported
+    by it; each rule is then searched on its own from the spans the pass
+    consumed. Every rule is detected independently, and hit counts are
+    per rule. Texts without any match, the common case, cost one pass.
+    Per-rule latency can't be separated out of a combined scan, so every
+    Nth scan also times each rule on its own.
+    """
+
+    def __init__(self, rules: List[CleaningRule] = None, profile_every: Optional[int] = None):
+        self.rules = rules if rules is not None else rules_from_config()
+        self.profile_every = (
+            PARSER_CONFIG.rule_profile_every if profile_every is None else profile_every
+        )
+
+        self._group_to_rule: Dict[str, CleaningRule] = {}
+        alternatives = []
+        for i, rule in enumerate(self.rules):
+            group = f"r{i}"
+            self._group_to_rule[group] = rule
+            alternatives.append(f"(?P<{group}>{self._scoped(rule)})")
+
+        self._combined = re.compile("|".join(alternatives)) if alternatives else None
+        self._compiled = {rule.name: re.compile(rule.pattern, rule.flags) for rule in self.rules}
+
+        self.stats: Dict[str, RuleStats] = {rule.name: RuleStats() for rule in self.rules}
+        self.scans = 0
+        self.scan_time = 0.0
+
+    @staticmethod
+    def _scoped(rule: CleaningRule) -> str:
+        """Wrap a pattern so its flags only apply inside its own group"""
+        letters = "".join(
+            letter for flag, letter in ((re.IGNORECASE, "i"), (re.MULTILINE, "m"))
+            if rule.flags & flag
+        )
+        return f"(?{letters}:{rule.pattern})"
+
+    def scan(self, fields: List[str]) -> ScanResult:
+        """
+        Scan question fields (question text first, then options).
+        Fields are joined with newlines so anchored rules still see the
+        whole question, as the old per-pattern re.search calls did.
+        """
+        result = ScanResult()
+        if self._combined is None:
+            return result
+
+        text = "\n".join(fields)
+        starts = []
+        pos = 0
+        for f in fields:
+            starts.append(pos)
+            pos += len(f) + 1
+
+        t0 = time.perf_counter()
+        fired = set()
+        consumed = []
+        for m in self._combined.finditer(text):
+            rule = self._group_to_rule[m.lastgroup]
+            fired.add(rule.name)
+            consumed.append((m.start(), max(m.end(), m.start() + 1)))
+
+            if rule.action == REJECT:
+                if rule.name not in result.rejected_by:
+                    result.rejected_by.append(rule.name)
+            else:
+                self._add_strip(result, fields, starts, m)
+
+        if consumed:
+            # Matches the combined pass consumed before their rule could report them
+            for rule in self.rules:
+                if rule.action == REJECT and rule.name in fired:
+                    continue
+                for m in self._shadowed(self._compiled[rule.name], text, consumed):
+                    fired.add(rule.name)
+                    if rule.action == REJECT:
+                        result.rejected_by.append(rule.name)
+                        break
+                    self._add_strip(result, fields, starts, m)
+        self.scan_time += time.perf_counter() - t0
+
+        self.scans += 1
+        for name in fired:
+            self.stats[name].hits += 1
+
+        if self.profile_every and self.scans % self.profile_every == 0:
+            self._profile(text)
+
+        return result
+
+    @staticmethod
+    def _add_strip(result: ScanResult, fields: List[str], starts: List[int], m: re.Match):
+        if m.end() > m.start():
+            idx = bisect_right(starts, m.start()) - 1
+            field_end = starts[idx] + len(fields[idx])
+            # Never strip across a field boundary
+            if m.end() <= field_end:
+                result.strip_spans.append(
+                    (idx, m.start() - starts[idx], m.end() - starts[idx])
+                )
+
+    @staticmethod
+    def _shadowed(regex: re.Pattern, text: str, consumed: List[Tuple[int, int]]) -> List[re.Match]:
+        """
+        Matches of regex starting inside a consumed span. Any other match
+        would have started a combined match of its own.
+        """
+        found = []
+        i = 0
+        for m in regex.finditer(text, consumed[0][0]):
+            while i < len(consumed) and consumed[i][1] <= m.start():
+                i += 1
+            if i == len(consumed):
+                break
+            if m.start() >= consumed[i][0]:
+                found.append(m)
+        return found
+
+    def _profile(self, text: str):
+        for name, regex in self._compiled.items():
+            t0 = time.perf_counter()
+            regex.search(text)
+            stats = self.stats[name]
+            stats.profiled_time += time.perf_counter() - t0
+            stats.profiled_scans += 1
+
+    @staticmethod
+    def apply_strips(fields: List[str], result: ScanResult) -> List[str]:
+        """Return fields with all STRIP spans removed"""
+        if not result.strip_spans:
+            return fields
+
+        # Rules may match overlapping text; strip the union of their spans
+        merged: List[List[int]] = []
+        for idx, start, end in sorted(result.strip_spans):
+            if merged and merged[-1][0] == idx and start <= merged[-1][2]:
+                merged[-1][2] = max(merged[-1][2], end)
+            else:
+                merged.append([idx, start, end])
+
+        cleaned = list(fields)
+        # Remove right-to-left so earlier offsets stay valid
+        for idx, start, end in reversed(merged):
+            cleaned[idx] = cleaned[idx][:start] + cleaned[idx][end:]
+        return cleaned
+
+    def export_stats(self) -> Dict:
+        """Raw counters in a picklable form, for merging across processes"""
+        return {
+            "scans": self.scans,
+            "scan_time": self.scan_time,
+            "rules": {
+                name: (s.hits, s.profiled_scans, s.profiled_time)
+                for name, s in self.stats.items()
+            },
+        }
+
+    def merge_stats(self, exported: Dict) -> None:
+        """Fold in counters from another engine's export_stats()"""
+        self.scans += exported["scans"]
+        self.scan_time += exported["scan_time"]
+        for name, (hits, scans, spent) in exported["rules"].items():
+            stats = self.stats.setdefault(name, RuleStats())
+            stats.hits += hits
+            stats.profiled_scans += scans
+            stats.profiled_time += spent
+
+    def get_stats(self) -> Dict:
+        """Per-rule hit counts and costs, most expensive first"""
+        rules = {name: s.to_dict() for name, s in self.stats.items()}
+        return {
+            "scans": self.scans,
+            "combined_scan_ms": round(self.scan_time * 1000, 2),
+            "rules": dict(sorted(rules.items(), key=lambda x: -x[1]["avg_cost_us"])),
+        }
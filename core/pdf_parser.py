@@ -4,7 +4,7 @@ Universal PDF Parser - Complete Version
 
 import fitz
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Callable, Iterable
 from dataclasses import dataclass, field
 import hashlib
 import logging
@@ -17,6 +17,10 @@ from core.image_handler import ImageExtractor, SmartImageLinker, ExtractedImage,
 logger = logging.getLogger(__name__)
 
 
+# Fields only needed once results are shown; storage may load them lazily
+COLD_FIELDS = ("explanation", "image_pattern_matched")
+
+
 @dataclass
 class ParsedQuestion:
     """Complete parsed question with all fields"""
@@ -40,6 +44,50 @@ class ParsedQuestion:
     image_pattern_matched: str = ""
     needs_review: bool = False
     
+    def detach_cold_fields(self, loader: Callable[[], Dict], fields: Iterable[str] = COLD_FIELDS):
+        """
+        Drop cold fields from the instance; the first access to any of them
+        calls loader() once for all their values. Only detach fields that
+        have a value - has_value() relies on it.
+        """
+        names = tuple(name for name in fields if name in COLD_FIELDS)
+        for name in names:
+            self.__dict__.pop(name, None)
+        self.__dict__["_cold"] = (loader, names)
+    
+    def has_value(self, name: str) -> bool:
+        """Truthiness of a field without forcing a lazy load"""
+        cold = self.__dict__.get("_cold")
+        if cold and name in cold[1] and name not in self.__dict__:
+            return True
+        return bool(getattr(self, name))
+    
+    def _load_cold_fields(self, name: str):
+        cold = self.__dict__.get("_cold")
+        if cold is None:
+            # Loaded by another thread since the caller looked
+            if name in self.__dict__:
+                return self.__dict__[name]
+            raise AttributeError(name)
+        
+        # Values go in before the marker comes out, so a concurrent reader
+        # sees one or the other; at worst both threads call loader()
+        loader, names = cold
+        values = loader()
+        for field_name in names:
+            self.__dict__.setdefault(field_name, values.get(field_name))
+        self.__dict__.pop("_cold", None)
+        return self.__dict__[name]
+    
+    def __getstate__(self):
+        # Copies and pickles carry values, not the loader
+        cold = self.__dict__.get("_cold")
+        if cold is not None and cold[1]:
+            self._load_cold_fields(cold[1][0])
+        state = dict(self.__dict__)
+        state.pop("_cold", None)
+        return state
+    
     def to_dict(self) -> Dict:
         return {
             "id": self.id,
@@ -63,6 +111,32 @@ class ParsedQuestion:
         }
 
 
+class _ColdField:
+    """
+    Data descriptor for COLD_FIELDS: returns the instance value, or loads
+    it on first access once the field was detached by the storage layer.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        try:
+            return obj.__dict__[self.name]
+        except KeyError:
+            return obj._load_cold_fields(self.name)
+    
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+
+# Installed after @dataclass so the generated __init__ keeps its defaults
+for _name in COLD_FIELDS:
+    setattr(ParsedQuestion, _name, _ColdField(_name))
+
+
 class UniversalPDFParser:
     """Universal parser with image support"""
     
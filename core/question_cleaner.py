@@ -5,13 +5,16 @@ Ensures only high-quality MCQs enter the question bank
 """
 
 import re
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Set, Optional, Tuple, Iterable
 from dataclasses import dataclass
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import hashlib
+import math
 
 from core.pdf_parser import ParsedQuestion
-from config.settings import SUBJECT_CONFIG
+from core.cleaning_rules import RuleEngine, rules_from_config
+from config.settings import SUBJECT_CONFIG, PARSER_CONFIG
 
 
 @dataclass
@@ -20,6 +23,7 @@ class CleaningStats:
     total_input: int = 0
     duplicates_removed: int = 0
     invalid_removed: int = 0
+    noise_stripped: int = 0
     enhanced: int = 0
     final_output: int = 0
     
@@ -28,6 +32,7 @@ class CleaningStats:
             "total_input": self.total_input,
             "duplicates_removed": self.duplicates_removed,
             "invalid_removed": self.invalid_removed,
+            "noise_stripped": self.noise_stripped,
             "enhanced": self.enhanced,
             "final_output": self.final_output,
             "duplicate_rate": f"{(self.duplicates_removed/self.total_input*100):.1f}%" if self.total_input > 0 else "0%",
@@ -35,20 +40,75 @@ class CleaningStats:
         }
 
 
+# Parallel cleaning: don't fork for tiny inputs, and over-split so
+# uneven shards still balance across workers
+MIN_SHARD_SIZE = 200
+SHARDS_PER_WORKER = 4
+
+
+def generate_question_hashes(q: ParsedQuestion) -> List[str]:
+    """
+    Hash signatures used for duplicate detection.
+    Shared with the storage layer, which persists them as the bank's dedupe index.
+    """
+    hashes = []
+    
+    # Hash 1: Full question text
+    h1 = hashlib.md5(q.question_text.lower().encode()).hexdigest()
+    hashes.append(f"full_{h1}")
+    
+    # Hash 2: Normalized question (remove numbers, special chars)
+    normalized = re.sub(r'[^a-zA-Z\s]', '', q.question_text.lower())
+    normalized = ' '.join(normalized.split())
+    h2 = hashlib.md5(normalized.encode()).hexdigest()
+    hashes.append(f"norm_{h2}")
+    
+    # Hash 3: First 100 chars (catches questions with different endings)
+    h3 = hashlib.md5(q.question_text[:100].lower().encode()).hexdigest()
+    hashes.append(f"prefix_{h3}")
+    
+    # Hash 4: Question + first option (catches exact copies)
+    combined = f"{q.question_text}{q.option_a}".lower()
+    h4 = hashlib.md5(combined.encode()).hexdigest()
+    hashes.append(f"combo_{h4}")
+    
+    return hashes
+
+
 class QuestionCleaner:
     """
     Cleans and validates questions for the question bank
     Focuses on quality over quantity
     """
     
-    def __init__(self, subject_config: SUBJECT_CONFIG = None):
+    def __init__(
+        self,
+        subject_config: SUBJECT_CONFIG = None,
+        known_hashes: Optional[Iterable[str]] = None,
+        parser_config: PARSER_CONFIG = None
+    ):
         self.subject_config = subject_config or SUBJECT_CONFIG
+        self.parser_config = parser_config or PARSER_CONFIG
+        # Garbage and noise rules, compiled once for the whole run
+        self.rule_engine = RuleEngine(
+            rules=rules_from_config(self.parser_config),
+            profile_every=self.parser_config.rule_profile_every,
+        )
         self.stats = CleaningStats()
-        self._seen_hashes: Set[str] = set()
+        # Seed with the bank's persisted hash index so questions already
+        # stored by an earlier run count as duplicates
+        self._seen_hashes: Set[str] = set(known_hashes or ())
         self._seen_questions: Dict[str, ParsedQuestion] = {}
     
-    def clean_questions(self, questions: List[ParsedQuestion]) -> List[ParsedQuestion]:
+    def clean_questions(
+        self,
+        questions: List[ParsedQuestion],
+        workers: int = 1
+    ) -> List[ParsedQuestion]:
         """Main cleaning pipeline"""
+        if workers > 1 and len(questions) >= workers * MIN_SHARD_SIZE:
+            return self._clean_parallel(questions, workers)
+        
         self.stats.total_input = len(questions)
         
         # Step 1: Remove invalid questions
@@ -67,6 +127,55 @@ class QuestionCleaner:
         
         return final_questions
     
+    def _clean_parallel(
+        self,
+        questions: List[ParsedQuestion],
+        workers: int
+    ) -> List[ParsedQuestion]:
+        """
+        Sharded cleaning across processes, identical to a serial run.
+        
+        Workers filter, hash, locally deduplicate and enhance contiguous
+        shards. Local duplicates come back un-enhanced together with their
+        hashes, because a question only loses to a *kept* question: if its
+        local winner turns out to be a global duplicate, it may survive.
+        The reduce walks the shards in input order against the global hash
+        set, so the first occurrence wins exactly as in _deduplicate.
+        """
+        self.stats.total_input = len(questions)
+        
+        shard_size = math.ceil(len(questions) / (workers * SHARDS_PER_WORKER))
+        shards = [
+            questions[i:i + shard_size]
+            for i in range(0, len(questions), shard_size)
+        ]
+        jobs = [(shard, self.subject_config, self.parser_config) for shard in shards]
+        
+        final = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, which keeps the reduce deterministic
+            for result in pool.map(_clean_shard, jobs):
+                self.stats.invalid_removed += result["invalid_removed"]
+                self.stats.noise_stripped += result["noise_stripped"]
+                self.rule_engine.merge_stats(result["rule_stats"])
+                
+                for q, hashes, enhanced in result["entries"]:
+                    if any(h in self._seen_hashes for h in hashes):
+                        self.stats.duplicates_removed += 1
+                        continue
+                    
+                    self._seen_hashes.update(hashes)
+                    self._seen_questions[q.id] = q
+                    
+                    if not enhanced:
+                        q = self._final_validation(self._enhance_questions([q]))[0]
+                    else:
+                        self.stats.enhanced += 1
+                    final.append(q)
+        
+        self.stats.final_output = len(final)
+        return final
+    
     def _filter_invalid(self, questions: List[ParsedQuestion]) -> List[ParsedQuestion]:
         """Remove questions that don't meet quality standards"""
         valid = []
@@ -86,34 +195,47 @@ class QuestionCleaner:
         if not q.is_valid:
             return False
         
+        if not self._has_valid_structure(q):
+            return False
+        
+        # Garbage rules reject, noise rules strip - one combined scan
+        fields = [q.question_text, q.option_a, q.option_b, q.option_c, q.option_d]
+        result = self.rule_engine.scan(fields)
+        
+        if result.is_rejected:
+            return False
+        
+        if result.strip_spans:
+            (q.question_text, q.option_a, q.option_b,
+             q.option_c, q.option_d) = [f.strip() for f in self.rule_engine.apply_strips(fields, result)]
+            self.stats.noise_stripped += 1
+            
+            # Stripping may leave a stub behind
+            if not self._has_valid_structure(q):
+                return False
+        
+        return True
+    
+    def _has_valid_structure(self, q: ParsedQuestion) -> bool:
+        """Length and option checks"""
+        config = self.parser_config
+        
         # Question text checks
-        if len(q.question_text) < 20:
+        if len(q.question_text) < config.min_question_length:
             return False
         
-        if len(q.question_text) > 2000:  # Suspiciously long
+        if len(q.question_text) > config.max_question_length:  # Suspiciously long
             return False
         
         # Must have all 4 options
         options = [q.option_a, q.option_b, q.option_c, q.option_d]
-        if not all(len(opt) >= 1 for opt in options):
+        if not all(len(opt) >= config.min_option_length for opt in options):
             return False
         
         # Options should be distinct
-        if len(set(options)) != 4:
+        if len(set(options)) != config.required_options:
             return False
         
-        # Check for garbage/noise patterns
-        garbage_patterns = [
-            r'^[\d\s\.\-]+$',  # Only numbers and punctuation
-            r'^[A-Z]{20,}$',   # All caps gibberish
-            r'lorem ipsum',     # Placeholder text
-        ]
-        
-        combined_text = q.question_text + ' '.join(options)
-        for pattern in garbage_patterns:
-            if re.search(pattern, combined_text, re.IGNORECASE):
-                return False
-        
         return True
     
     def _deduplicate(self, questions: List[ParsedQuestion]) -> List[ParsedQuestion]:
@@ -139,28 +261,7 @@ class QuestionCleaner:
     
     def _generate_hashes(self, q: ParsedQuestion) -> List[str]:
         """Generate multiple hash signatures for duplicate detection"""
-        hashes = []
-        
-        # Hash 1: Full question text
-        h1 = hashlib.md5(q.question_text.lower().encode()).hexdigest()
-        hashes.append(f"full_{h1}")
-        
-        # Hash 2: Normalized question (remove numbers, special chars)
-        normalized = re.sub(r'[^a-zA-Z\s]', '', q.question_text.lower())
-        normalized = ' '.join(normalized.split())
-        h2 = hashlib.md5(normalized.encode()).hexdigest()
-        hashes.append(f"norm_{h2}")
-        
-        # Hash 3: First 100 chars (catches questions with different endings)
-        h3 = hashlib.md5(q.question_text[:100].lower().encode()).hexdigest()
-        hashes.append(f"prefix_{h3}")
-        
-        # Hash 4: Question + first option (catches exact copies)
-        combined = f"{q.question_text}{q.option_a}".lower()
-        h4 = hashlib.md5(combined.encode()).hexdigest()
-        hashes.append(f"combo_{h4}")
-        
-        return hashes
+        return generate_question_hashes(q)
     
     def _enhance_questions(self, questions: List[ParsedQuestion]) -> List[ParsedQuestion]:
         """Add metadata enhancements to questions"""
@@ -258,6 +359,10 @@ class QuestionCleaner:
         """Return cleaning statistics"""
         return self.stats.to_dict()
     
+    def get_rule_stats(self) -> Dict:
+        """Per-rule hit counts and costs from the rule engine"""
+        return self.rule_engine.get_stats()
+    
     def get_subject_distribution(self, questions: List[ParsedQuestion]) -> Dict[str, int]:
         """Get distribution of questions by subject"""
         distribution = defaultdict(int)
@@ -269,6 +374,31 @@ class QuestionCleaner:
         return dict(sorted(distribution.items(), key=lambda x: -x[1]))
 
 
+def _clean_shard(job: Tuple) -> Dict:
+    """Worker for QuestionCleaner._clean_parallel"""
+    shard, subject_config, parser_config = job
+    cleaner = QuestionCleaner(subject_config=subject_config, parser_config=parser_config)
+    
+    entries = []
+    for q in cleaner._filter_invalid(shard):
+        hashes = cleaner._generate_hashes(q)
+        
+        if any(h in cleaner._seen_hashes for h in hashes):
+            entries.append((q, hashes, False))
+            continue
+        
+        cleaner._seen_hashes.update(hashes)
+        q = cleaner._final_validation(cleaner._enhance_questions([q]))[0]
+        entries.append((q, hashes, True))
+    
+    return {
+        "entries": entries,
+        "invalid_removed": cleaner.stats.invalid_removed,
+        "noise_stripped": cleaner.stats.noise_stripped,
+        "rule_stats": cleaner.rule_engine.export_stats(),
+    }
+
+
 class DuplicateAnalyzer:
     """
     Analyzes potential duplicates for manual review
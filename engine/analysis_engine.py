@@ -27,6 +27,7 @@ class QuestionResult:
     subject: Optional[str]
     explanation: Optional[str]
     time_spent: int = 0
+    marked_for_review: bool = False
     
     @property
     def status(self) -> str:
@@ -172,6 +173,8 @@ class AnalysisEngine:
                 subject=original.subject if original else None,
                 explanation=original.explanation if original else None,
                 time_spent=eq.time_spent,
+                marked_for_review=eq.status in (QuestionStatus.MARKED_FOR_REVIEW,
+                                                QuestionStatus.ANSWERED_AND_MARKED),
             )
             results.append(result)
         
@@ -2,8 +2,17 @@
 Exam Engine Module
 Handles exam session creation, question delivery, and answer collection
 Provides exam-like experience without spoilers
+
+Sessions autosave: every answer, mark, navigation and timing tick is
+appended to the session's journal, with a full checkpoint every
+checkpoint_every events, so a crashed session resumes where it stopped.
+
+Session files hold question ids, answers and timings only (see
+storage/attempt_payload.py); the questions are rehydrated from the bank
+when a session is loaded.
 """
 
+import os
 import random
 import time
 from datetime import datetime, timedelta
@@ -13,9 +22,22 @@ from enum import Enum
 import json
 from pathlib import Path
 
+import logging
+
+import numpy as np
+
 from core.pdf_parser import ParsedQuestion
+from engine.exposure import bank_ids
+from engine.question_index import QuestionIndex
+from engine.paper_generator import PaperGenerator
+from engine.session_journal import SessionJournal, journal_path
+from storage.attempt_payload import (
+    FORMAT, compact_session, decode_answers, decode_marks, encode_answers, question_count,
+)
 from config.settings import EXAM_CONFIG, SESSIONS_DIR
 
+logger = logging.getLogger(__name__)
+
 
 class ExamMode(Enum):
     DAILY_PRACTICE = "daily_practice"
@@ -48,16 +70,15 @@ class ExamQuestion:
     status: QuestionStatus = QuestionStatus.UNANSWERED
     time_spent: int = 0  # seconds
     
+    @property
+    def is_marked(self) -> bool:
+        return self.status in (QuestionStatus.MARKED_FOR_REVIEW, QuestionStatus.ANSWERED_AND_MARKED)
+    
     def to_dict(self) -> Dict:
+        # The question itself stays in the bank
         return {
             "index": self.index,
             "question_id": self.question_id,
-            "question_text": self.question_text,
-            "option_a": self.option_a,
-            "option_b": self.option_b,
-            "option_c": self.option_c,
-            "option_d": self.option_d,
-            "images": self.images,
             "selected_answer": self.selected_answer,
             "status": self.status.value,
             "time_spent": self.time_spent,
@@ -94,9 +115,7 @@ class ExamSession:
     
     @property
     def marked_count(self) -> int:
-        return sum(1 for q in self.questions 
-                   if q.status in [QuestionStatus.MARKED_FOR_REVIEW, 
-                                   QuestionStatus.ANSWERED_AND_MARKED])
+        return sum(1 for q in self.questions if q.is_marked)
     
     @property
     def elapsed_time(self) -> timedelta:
@@ -121,10 +140,15 @@ class ExamSession:
         return self.remaining_time.total_seconds() <= 0
     
     def to_dict(self) -> Dict:
+        """Compact payload: question ids, answers and timings, no question text"""
         return {
+            "format": FORMAT,
             "session_id": self.session_id,
             "mode": self.mode.value,
-            "questions": [q.to_dict() for q in self.questions],
+            "question_ids": [q.question_id for q in self.questions],
+            "answers": encode_answers([q.selected_answer for q in self.questions],
+                                      [q.is_marked for q in self.questions]),
+            "time_spent": [q.time_spent for q in self.questions],
             "start_time": self.start_time.isoformat() if self.start_time else None,
             "end_time": self.end_time.isoformat() if self.end_time else None,
             "time_limit_minutes": self.time_limit_minutes,
@@ -135,6 +159,32 @@ class ExamSession:
         }
 
 
+def _apply_answer(question: ExamQuestion, answer: Optional[str], mark_for_review: bool):
+    question.selected_answer = answer
+    
+    if answer and mark_for_review:
+        question.status = QuestionStatus.ANSWERED_AND_MARKED
+    elif answer:
+        question.status = QuestionStatus.ANSWERED
+    elif mark_for_review:
+        question.status = QuestionStatus.MARKED_FOR_REVIEW
+    else:
+        question.status = QuestionStatus.UNANSWERED
+
+
+def _apply_event(session: ExamSession, event: Dict):
+    """Replay one journal event onto a session"""
+    kind = event.get("e")
+    if kind == "answer":
+        _apply_answer(session.questions[event["i"] - 1], event.get("a"), event.get("m", False))
+    elif kind == "nav":
+        session.current_index = event["i"] - 1
+    elif kind == "tick":
+        session.questions[event["i"] - 1].time_spent += event["s"]
+    elif kind == "start":
+        session.start_time = datetime.fromisoformat(event["t"])
+
+
 class ExamEngine:
     """
     Main exam engine that manages exam sessions
@@ -152,21 +202,14 @@ class ExamEngine:
         self.sessions_dir = sessions_dir
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
         
-        # Index questions by subject for filtered exams
-        self._subject_index = self._build_subject_index()
+        # Filter masks (subject, year, source, flags) for question selection
+        self.index = QuestionIndex(question_bank)
+        self.paper_generator = PaperGenerator(self.index)
         
-        # Active session
+        # Active session and its autosave journal
         self.current_session: Optional[ExamSession] = None
-    
-    def _build_subject_index(self) -> Dict[str, List[ParsedQuestion]]:
-        """Build index of questions by subject"""
-        index = {}
-        for q in self.question_bank:
-            subject = q.subject or "General"
-            if subject not in index:
-                index[subject] = []
-            index[subject].append(q)
-        return index
+        self._journal: Optional[SessionJournal] = None
+        self._checkpoint = 0
     
     def create_session(
         self,
@@ -193,13 +236,16 @@ class ExamEngine:
         else:
             time_limit = question_count * 1.2  # 1.2 min per question
         
-        # Select questions
-        available_questions = self._get_available_questions(subject)
-        
-        if len(available_questions) < question_count:
-            question_count = len(available_questions)
+        # Select questions: whole-bank papers follow the subject blueprint
+        candidates = np.flatnonzero(self._available_mask(subject))
+        question_count = min(question_count, len(candidates))
         
-        selected = random.sample(available_questions, question_count)
+        rng = np.random.default_rng()
+        if subject is None and question_count <= self.paper_generator.eligible_count:
+            positions = self.paper_generator.generate(question_count, rng)
+        else:
+            positions = rng.choice(candidates, size=question_count, replace=False)
+        selected = [self.question_bank[int(i)] for i in positions]
         
         # Create exam questions (without answers)
         exam_questions = [
@@ -226,16 +272,21 @@ class ExamEngine:
         )
         
         self.current_session = session
+        self._open_journal(session, 0)
+        self._write_checkpoint()
         return session
     
-    def _get_available_questions(
-        self, 
-        subject: Optional[str] = None
-    ) -> List[ParsedQuestion]:
-        """Get questions available for selection"""
-        if subject and subject in self._subject_index:
-            return self._subject_index[subject]
-        return self.question_bank
+    def _available_mask(self, subject: Optional[str] = None) -> np.ndarray:
+        """Mask of questions available for selection"""
+        if subject:
+            mask = self.index.value_mask("subject", subject)
+            if subject == "General":
+                # Untagged questions count as General
+                mask = mask | self.index.value_mask("subject", None)
+            if mask.any():
+                return mask
+        # Unknown subject: the whole bank, as before
+        return self.index.mask()
     
     def _generate_session_id(self) -> str:
         """Generate unique session ID"""
@@ -249,6 +300,7 @@ class ExamEngine:
             return False
         
         self.current_session.start_time = datetime.now()
+        self._log({"e": "start", "t": self.current_session.start_time.isoformat()})
         return True
     
     def get_question(self, index: int) -> Optional[ExamQuestion]:
@@ -275,18 +327,18 @@ class ExamEngine:
         if answer is not None and answer not in 'ABCD':
             return False
         
-        question.selected_answer = answer
-        
-        # Update status
-        if answer and mark_for_review:
-            question.status = QuestionStatus.ANSWERED_AND_MARKED
-        elif answer:
-            question.status = QuestionStatus.ANSWERED
-        elif mark_for_review:
-            question.status = QuestionStatus.MARKED_FOR_REVIEW
-        else:
-            question.status = QuestionStatus.UNANSWERED
+        _apply_answer(question, answer, mark_for_review)
+        self._log({"e": "answer", "i": index, "a": answer, "m": mark_for_review})
+        return True
+    
+    def record_time(self, index: int, seconds: int) -> bool:
+        """Add time spent on a question (1-based), e.g. on leaving it"""
+        question = self.get_question(index)
+        if not question or seconds <= 0:
+            return False
         
+        question.time_spent += seconds
+        self._log({"e": "tick", "i": index, "s": seconds})
         return True
     
     def navigate_to(self, index: int) -> bool:
@@ -296,6 +348,7 @@ class ExamEngine:
         
         if 1 <= index <= self.current_session.total_questions:
             self.current_session.current_index = index - 1
+            self._log({"e": "nav", "i": index})
             return True
         return False
     
@@ -307,6 +360,7 @@ class ExamEngine:
         current = self.current_session.current_index
         if current < self.current_session.total_questions - 1:
             self.current_session.current_index = current + 1
+            self._log({"e": "nav", "i": current + 2})
             return self.current_session.questions[self.current_session.current_index]
         return None
     
@@ -318,6 +372,7 @@ class ExamEngine:
         current = self.current_session.current_index
         if current > 0:
             self.current_session.current_index = current - 1
+            self._log({"e": "nav", "i": current})
             return self.current_session.questions[self.current_session.current_index]
         return None
     
@@ -343,20 +398,70 @@ class ExamEngine:
         self.current_session.end_time = datetime.now()
         self.current_session.is_submitted = True
         
-        # Save session
-        self._save_session(self.current_session)
+        # Save session; the journal is folded in for good
+        self._save_session(self.current_session, self._checkpoint + 1)
+        if self._journal:
+            self._journal.remove()
+            self._journal = None
         
         return self.current_session
     
-    def _save_session(self, session: ExamSession):
+    # ----- autosave -----
+    
+    def _open_journal(self, session: ExamSession, checkpoint: int):
+        if self._journal:
+            self._journal.close()
+        self._journal = SessionJournal(journal_path(self.sessions_dir, session.session_id))
+        self._checkpoint = checkpoint
+    
+    def _write_checkpoint(self):
+        """Save the whole session and start an empty journal on top of it"""
+        self._checkpoint += 1
+        self._save_session(self.current_session, self._checkpoint)
+        self._journal.reset(self._checkpoint)
+    
+    def _log(self, event: Dict):
+        """Journal a change to the current session, checkpointing every so often"""
+        if not self._journal or self.current_session.is_submitted:
+            return
+        self._journal.append(event)
+        if self._journal.events >= self.config.checkpoint_every:
+            self._write_checkpoint()
+    
+    def resume_session(self, session_id: str) -> Optional[ExamSession]:
+        """Make an unsubmitted saved session current again, journal replayed"""
+        loaded = self._load_session(session_id)
+        if loaded is None or loaded[0].is_submitted:
+            return None
+        
+        session, checkpoint, journal = loaded
+        self.current_session = session
+        self._journal = journal
+        self._checkpoint = checkpoint
+        return session
+    
+    def _save_session(self, session: ExamSession, checkpoint: int = 0):
         """Save session to disk"""
         filepath = self.sessions_dir / f"{session.session_id}.json"
-        
-        with open(filepath, 'w') as f:
-            json.dump(session.to_dict(), f, indent=2)
+        data = session.to_dict()
+        data["bank"] = bank_ids(self.index)[0]
+        data["checkpoint"] = checkpoint
+        
+        tmp_path = filepath.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, filepath)
     
     def load_session(self, session_id: str) -> Optional[ExamSession]:
-        """Load a previous session"""
+        """Load a previous session, with any journaled changes since its last save"""
+        loaded = self._load_session(session_id)
+        if loaded is None:
+            return None
+        loaded[2].close()
+        return loaded[0]
+    
+    def _load_session(self, session_id: str):
+        """(session, checkpoint number, journal) or None"""
         filepath = self.sessions_dir / f"{session_id}.json"
         
         if not filepath.exists():
@@ -365,23 +470,9 @@ class ExamEngine:
         with open(filepath) as f:
             data = json.load(f)
         
-        # Reconstruct session
-        questions = [
-            ExamQuestion(
-                index=q["index"],
-                question_id=q["question_id"],
-                question_text=q["question_text"],
-                option_a=q["option_a"],
-                option_b=q["option_b"],
-                option_c=q["option_c"],
-                option_d=q["option_d"],
-                images=q.get("images", []),
-                selected_answer=q.get("selected_answer"),
-                status=QuestionStatus(q.get("status", "unanswered")),
-                time_spent=q.get("time_spent", 0),
-            )
-            for q in data["questions"]
-        ]
+        # Reconstruct session; older files are read through the compact form
+        data = compact_session(data)
+        questions = self._rehydrate(data)
         
         session = ExamSession(
             session_id=data["session_id"],
@@ -396,7 +487,45 @@ class ExamEngine:
             subject_filter=data.get("subject_filter"),
         )
         
-        return session
+        checkpoint = data.get("checkpoint", 0)
+        journal = SessionJournal(journal_path(self.sessions_dir, session_id))
+        if not session.is_submitted:
+            for event in journal.read(checkpoint):
+                _apply_event(session, event)
+        
+        return session, checkpoint, journal
+    
+    def _rehydrate(self, data: Dict) -> List[ExamQuestion]:
+        """Exam questions of a compact payload, text and options from the bank"""
+        positions = self.index.id_positions()
+        marks = decode_marks(data["answers"])
+        time_spent = data.get("time_spent") or [0] * len(marks)
+        if not len(marks) == len(time_spent) == len(data["question_ids"]):
+            raise ValueError(f"Session {data['session_id']} has {len(marks)} answers and "
+                             f"{len(time_spent)} timings for {len(data['question_ids'])} questions")
+        questions = []
+        for i, (q_id, answer) in enumerate(zip(data["question_ids"], decode_answers(data["answers"]))):
+            position = positions.get(q_id)
+            if position is None:
+                logger.warning(f"Question {q_id} of session {data['session_id']} "
+                               f"is no longer in the bank")
+                exam_question = ExamQuestion(i + 1, q_id, "", "", "", "", "")
+            else:
+                q = self.question_bank[position]
+                exam_question = ExamQuestion(
+                    index=i + 1,
+                    question_id=q.id,
+                    question_text=q.question_text,
+                    option_a=q.option_a,
+                    option_b=q.option_b,
+                    option_c=q.option_c,
+                    option_d=q.option_d,
+                    images=q.images,
+                )
+            _apply_answer(exam_question, answer, marks[i])
+            exam_question.time_spent = time_spent[i]
+            questions.append(exam_question)
+        return questions
     
     def get_all_sessions(self) -> List[Dict]:
         """Get list of all saved sessions"""
@@ -411,7 +540,7 @@ class ExamEngine:
                     "mode": data["mode"],
                     "created_at": data["created_at"],
                     "is_submitted": data.get("is_submitted", False),
-                    "total_questions": len(data["questions"]),
+                    "total_questions": question_count(data),
                 })
             except Exception:
                 continue
@@ -0,0 +1,255 @@
+"""
+Question Exposure
+Per-user record of which questions a student has seen, attempted, got
+right and got wrong, across practice sessions and mock attempts, plus the
+day each was last seen. Practice filters such as "unseen only" or
+"previously wrong" become one boolean mask over the bank.
+
+Every bit is keyed by the question's position in the bank. Bitmaps are
+kept packed (one bit per question) and written zlib-compressed, so even
+a heavy user costs a few KB. Each file names the bank version its
+positions belong to, via a content-addressed table of the bank's ids.
+When the bank changes, the user's bits are remapped to the new positions
+by a vectorised id join on first load.
+
+History is per question id. A bank may hold several questions with the
+same id (the storage backends keep repeated ids); those copies share the
+first copy's bits, which is where record() writes them and what mask()
+reads for every copy.
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from engine.question_index import QuestionIndex
+from config.settings import EXPOSURE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+BITMAPS = ("seen", "attempted", "correct", "incorrect")
+# last_seen holds days since this epoch; 0 means never
+EPOCH = date(2020, 1, 1)
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+# Question ids per position, and their digest, per index (so per bank version)
+_BANK_IDS: "weakref.WeakKeyDictionary[QuestionIndex, Tuple[str, np.ndarray]]" = weakref.WeakKeyDictionary()
+
+
+def bank_ids(index: QuestionIndex) -> Tuple[str, np.ndarray]:
+    """
+    (bank key, id per position) for an index. Positions without an id, and
+    every copy after the first of a repeated id, get b''.
+    """
+    cached = _BANK_IDS.get(index)
+    if cached is None:
+        ids = [b""] * index.size
+        for q_id, position in index.id_positions().items():
+            ids[position] = q_id.encode("utf-8")
+        ids = np.array(ids, dtype=np.bytes_)
+        key = hashlib.sha1(ids.tobytes()).hexdigest()[:16]
+        cached = _BANK_IDS[index] = (key, ids)
+    return cached
+
+
+_FIRST_COPIES: "weakref.WeakKeyDictionary[QuestionIndex, np.ndarray]" = weakref.WeakKeyDictionary()
+
+
+def first_copies(index: QuestionIndex) -> np.ndarray:
+    """Position of the first question with each position's id (itself unless the id repeats)"""
+    first = _FIRST_COPIES.get(index)
+    if first is None:
+        first = np.arange(index.size)
+        _, ids = bank_ids(index)
+        repeated = np.flatnonzero(ids == b"")
+        if len(repeated):
+            by_id = index.id_positions()
+            get = getattr(index.bank, "peek", index.bank.__getitem__)
+            for position in repeated.tolist():
+                first[position] = by_id.get(get(position).id, position)
+        _FIRST_COPIES[index] = first
+    return first
+
+
+class UserExposure:
+    """One user's bitmaps over the positions of one bank version"""
+
+    def __init__(self, bank_key: str, size: int, bits: Optional[Dict[str, np.ndarray]] = None,
+                 last_seen: Optional[np.ndarray] = None):
+        self.bank_key = bank_key
+        self.size = size
+        self.bits = bits or {name: np.zeros((size + 7) // 8, dtype=np.uint8) for name in BITMAPS}
+        self.last_seen = last_seen if last_seen is not None else np.zeros(size, dtype=np.uint16)
+
+    def mask(self, name: str) -> np.ndarray:
+        """Boolean mask over the bank for one bitmap"""
+        return np.unpackbits(self.bits[name], count=self.size).astype(bool)
+
+    def seen_since(self, day: date) -> np.ndarray:
+        return self.last_seen >= day_number(day)
+
+    def record(self, positions: np.ndarray, outcomes: Iterable[Optional[bool]], day: date):
+        """outcomes per position: None if unanswered, else whether it was correct"""
+        outcomes = list(outcomes)
+        answered = np.array([o is not None for o in outcomes], dtype=bool)
+        right = np.array([o is not None and bool(o) for o in outcomes], dtype=bool)
+
+        masks = {name: self.mask(name) for name in BITMAPS}
+        masks["seen"][positions] = True
+        masks["attempted"][positions[answered]] = True
+        # correct/incorrect follow the latest answer to each question
+        masks["correct"][positions[answered]] = right[answered]
+        masks["incorrect"][positions[answered]] = ~right[answered]
+        self.bits = {name: np.packbits(mask) for name, mask in masks.items()}
+        self.last_seen[positions] = day_number(day)
+
+    def remapped(self, bank_key: str, old_ids: np.ndarray, new_ids: np.ndarray) -> "UserExposure":
+        """The same exposure over another bank version's positions"""
+        if not len(old_ids):
+            return UserExposure(bank_key, len(new_ids))
+        order = np.argsort(old_ids)
+        found = np.searchsorted(old_ids, new_ids, sorter=order).clip(max=len(old_ids) - 1)
+        old_positions = order[found]
+        matched = (old_ids[old_positions] == new_ids) & (new_ids != b"")
+
+        bits = {name: np.packbits(self.mask(name)[old_positions] & matched) for name in BITMAPS}
+        last_seen = np.where(matched, self.last_seen[old_positions], 0).astype(np.uint16)
+        return UserExposure(bank_key, len(new_ids), bits, last_seen)
+
+
+class ExposureStore:
+    """<user_id>.npz per user under root, plus banks/<key>.npy id tables"""
+
+    def __init__(self, root: Path = EXPOSURE_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "banks").mkdir(exist_ok=True)
+        self._cache: Dict[str, Tuple[Optional[Tuple[int, int]], UserExposure]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, user_id: str) -> Path:
+        return self.root / f"{user_id}.npz"
+
+    def users(self) -> List[str]:
+        """Users with a saved history"""
+        return sorted(p.stem for p in self.root.glob("*.npz"))
+
+    def _bank_path(self, key: str) -> Path:
+        return self.root / "banks" / f"{key}.npy"
+
+    def _signature(self, user_id: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path(user_id).stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self, user_id: str) -> Optional[UserExposure]:
+        try:
+            with np.load(self.path(user_id), allow_pickle=False) as data:
+                return UserExposure(
+                    str(data["bank_key"]), int(data["size"]),
+                    {name: data[name] for name in BITMAPS}, data["last_seen"],
+                )
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to load exposure for {user_id}: {e}")
+            return None
+
+    def _write(self, user_id: str, exposure: UserExposure):
+        path = self.path(user_id)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, bank_key=np.array(exposure.bank_key), size=np.array(exposure.size),
+                                last_seen=exposure.last_seen, **exposure.bits)
+        os.replace(tmp_path, path)
+
+    def _save_bank_ids(self, key: str, ids: np.ndarray):
+        path = self._bank_path(key)
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, ids, allow_pickle=False)
+            os.replace(tmp_path, path)
+
+    def load(self, user_id: str, index: QuestionIndex) -> UserExposure:
+        """The user's exposure over index's bank (empty for new users)"""
+        key, ids = bank_ids(index)
+        signature = self._signature(user_id)
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] == signature and cached[1].bank_key == key:
+            return cached[1]
+
+        exposure = self._read(user_id) if signature else None
+        if exposure is None:
+            exposure = UserExposure(key, index.size)
+        elif exposure.bank_key != key:
+            try:
+                old_ids = np.load(self._bank_path(exposure.bank_key), allow_pickle=False)
+            except OSError:
+                logger.warning(f"Bank {exposure.bank_key} of {user_id}'s exposure is gone; starting over")
+                exposure = UserExposure(key, index.size)
+            else:
+                exposure = exposure.remapped(key, old_ids, ids)
+        self._cache[user_id] = (signature, exposure)
+        return exposure
+
+    def record(self, user_id: str, index: QuestionIndex, question_ids: Iterable[str],
+               outcomes: Iterable[Optional[bool]], day: Optional[date] = None) -> UserExposure:
+        """
+        Mark questions as seen on day (default today), with their outcome:
+        None if unanswered, else whether the answer was correct. Questions no
+        longer in the bank are skipped.
+        """
+        by_id = index.id_positions()
+        pairs = [(by_id[q_id], outcome) for q_id, outcome in zip(question_ids, outcomes) if q_id in by_id]
+        with self._lock:
+            exposure = self.load(user_id, index)
+            if pairs:
+                positions = np.array([p for p, _ in pairs], dtype=np.int64)
+                exposure.record(positions, [o for _, o in pairs], day or date.today())
+            key, ids = bank_ids(index)
+            self._save_bank_ids(key, ids)
+            self._write(user_id, exposure)
+            self._cache[user_id] = (self._signature(user_id), exposure)
+        return exposure
+
+    def mask(self, user_id: str, index: QuestionIndex, unseen: bool = False, wrong: bool = False,
+             not_seen_days: Optional[int] = None, today: Optional[date] = None) -> np.ndarray:
+        """AND of the requested history filters, as a mask over the bank"""
+        exposure = self.load(user_id, index)
+        # Every copy of a repeated id reads its first copy's history
+        first = first_copies(index)
+        mask = np.ones(index.size, dtype=bool)
+        if unseen:
+            mask &= ~exposure.mask("seen")[first]
+        if wrong:
+            mask &= exposure.mask("incorrect")[first]
+        if not_seen_days is not None:
+            since = date.fromordinal((today or date.today()).toordinal() - not_seen_days)
+            mask &= ~exposure.seen_since(since)[first]
+        return mask
+
+
+_EXPOSURE_STORE: Optional[ExposureStore] = None
+
+
+def get_exposure_store() -> ExposureStore:
+    """Process-wide exposure store"""
+    global _EXPOSURE_STORE
+    if _EXPOSURE_STORE is None:
+        _EXPOSURE_STORE = ExposureStore()
+    return _EXPOSURE_STORE
@@ -0,0 +1,297 @@
+"""
+Item Response Theory
+Fits a 1PL (Rasch) or 2PL model to students' answers, giving each question
+a difficulty and discrimination and each student an ability on the same
+scale:
+
+    P(correct) = 1 / (1 + exp(-a_i * (theta_u - b_i)))
+
+Responses come from every user's exposure history (their latest answer to
+each question, practice and mocks alike) and from saved ExamEngine
+sessions, each counted as its own respondent. The fit is joint MAP
+estimation with weak normal priors, alternating one vectorised Newton
+step for abilities and one for item parameters over the sparse response
+list.
+
+Adaptive practice then serves, at the student's current ability, the
+question with the highest Fisher information a^2 * p * (1 - p). That is a
+single vectorised argmax over the bank.
+"""
+
+import json
+import os
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from engine.exposure import ExposureStore, bank_ids, first_copies, get_exposure_store
+from engine.question_index import QuestionIndex
+from storage.attempt_payload import session_answers
+from config.settings import IRT_PARAMS_FILE, SESSIONS_DIR
+
+logger = logging.getLogger(__name__)
+
+
+# Prior standard deviations: ability, difficulty, log discrimination
+ABILITY_SD = 1.0
+DIFFICULTY_SD = 2.0
+LOG_DISCRIMINATION_SD = 0.5
+
+
+class Responses:
+    """Sparse (respondent, item, correct) triples; items are bank positions"""
+
+    def __init__(self, respondents: List[str], users: np.ndarray, items: np.ndarray, correct: np.ndarray):
+        self.respondents = respondents
+        self.users = users
+        self.items = items
+        self.correct = correct
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+
+def collect_responses(index: QuestionIndex, store: Optional[ExposureStore] = None,
+                      sessions_dir: Path = SESSIONS_DIR) -> Responses:
+    """Every user's latest answers plus the answers in saved exam sessions"""
+    store = store or get_exposure_store()
+    respondents: List[str] = []
+    users, items, correct = [], [], []
+
+    for user_id in store.users():
+        exposure = store.load(user_id, index)
+        attempted = np.flatnonzero(exposure.mask("attempted"))
+        if not len(attempted):
+            continue
+        users.append(np.full(len(attempted), len(respondents), dtype=np.int32))
+        items.append(attempted)
+        correct.append(exposure.mask("correct")[attempted])
+        respondents.append(user_id)
+
+    by_id = index.id_positions()
+    get = getattr(index.bank, "peek", index.bank.__getitem__)
+    for path in sorted(sessions_dir.glob("*.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                session = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable session {path.name}: {e}")
+            continue
+        answered = [
+            (by_id[q_id], answer)
+            for q_id, answer in session_answers(session)
+            if answer and q_id in by_id
+        ]
+        if not answered:
+            continue
+        positions = np.array([p for p, _ in answered], dtype=np.int64)
+        users.append(np.full(len(answered), len(respondents), dtype=np.int32))
+        items.append(positions)
+        correct.append(np.array([get(int(p)).correct_answer == a for p, a in answered], dtype=bool))
+        respondents.append(f"session:{session.get('session_id', path.stem)}")
+
+    if not respondents:
+        empty = np.zeros(0, dtype=np.int64)
+        return Responses([], empty.astype(np.int32), empty, empty.astype(bool))
+    return Responses(respondents, np.concatenate(users), np.concatenate(items).astype(np.int64),
+                     np.concatenate(correct))
+
+
+def fit(responses: Responses, n_items: int, model: str = "2pl", iterations: int = 100,
+        tol: float = 1e-4) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ability per respondent, difficulty per item, discrimination per item)"""
+    if model not in ("1pl", "2pl"):
+        raise ValueError(f"Unknown IRT model: {model}")
+    u, i = responses.users, responses.items
+    y = responses.correct.astype(np.float64)
+    n_users = len(responses.respondents)
+
+    theta = np.zeros(n_users)
+    b = np.zeros(n_items)
+    log_a = np.zeros(n_items)
+
+    for step in range(iterations):
+        a = np.exp(log_a)
+
+        # Abilities, items fixed
+        p = 1.0 / (1.0 + np.exp(-a[i] * (theta[u] - b[i])))
+        r, w = y - p, p * (1 - p)
+        grad = np.bincount(u, a[i] * r, n_users) - theta / ABILITY_SD ** 2
+        hess = np.bincount(u, a[i] ** 2 * w, n_users) + 1 / ABILITY_SD ** 2
+        d_theta = np.clip(grad / hess, -1.0, 1.0)
+        theta += d_theta
+
+        # Item difficulty (and discrimination), abilities fixed
+        z = theta[u] - b[i]
+        p = 1.0 / (1.0 + np.exp(-a[i] * z))
+        r, w = y - p, p * (1 - p)
+        grad = -np.bincount(i, a[i] * r, n_items) - b / DIFFICULTY_SD ** 2
+        hess = np.bincount(i, a[i] ** 2 * w, n_items) + 1 / DIFFICULTY_SD ** 2
+        d_b = np.clip(grad / hess, -1.0, 1.0)
+        b += d_b
+
+        change = max(np.abs(d_theta).max(initial=0), np.abs(d_b).max(initial=0))
+        if model == "2pl":
+            grad = a * np.bincount(i, r * z, n_items) - log_a / LOG_DISCRIMINATION_SD ** 2
+            hess = a ** 2 * np.bincount(i, w * z ** 2, n_items) + 1 / LOG_DISCRIMINATION_SD ** 2
+            d_log_a = np.clip(grad / hess, -0.5, 0.5)
+            log_a += d_log_a
+            change = max(change, np.abs(d_log_a).max(initial=0))
+
+        if change < tol:
+            logger.info(f"IRT fit converged after {step + 1} iterations")
+            break
+    return theta, b, np.exp(log_a)
+
+
+class IRTParameters:
+    """Fitted parameters, keyed by question id and respondent"""
+
+    def __init__(self, item_ids: np.ndarray, difficulty: np.ndarray, discrimination: np.ndarray,
+                 item_responses: np.ndarray, respondents: np.ndarray, ability: np.ndarray,
+                 info: Optional[Dict] = None):
+        self.item_ids = item_ids
+        self.difficulty = difficulty
+        self.discrimination = discrimination
+        self.item_responses = item_responses
+        self.respondents = respondents
+        self.ability = ability
+        self.info = info or {}
+        self._abilities = {str(r): float(t) for r, t in zip(respondents.tolist(), ability)}
+        self._aligned: "weakref.WeakKeyDictionary[QuestionIndex, Tuple[np.ndarray, np.ndarray]]" = \
+            weakref.WeakKeyDictionary()
+
+    def user_ability(self, user_id: str) -> float:
+        """Fitted ability, 0 (the population mean) for users not in the fit"""
+        return self._abilities.get(user_id, 0.0)
+
+    def for_index(self, index: QuestionIndex) -> Tuple[np.ndarray, np.ndarray]:
+        """(difficulty, discrimination) per bank position; unfitted items get 0 and 1"""
+        aligned = self._aligned.get(index)
+        if aligned is None:
+            _, ids = bank_ids(index)
+            difficulty = np.zeros(index.size)
+            discrimination = np.ones(index.size)
+            if len(self.item_ids):
+                order = np.argsort(self.item_ids)
+                found = np.searchsorted(self.item_ids, ids, sorter=order).clip(max=len(self.item_ids) - 1)
+                source = order[found]
+                matched = self.item_ids[source] == ids
+                difficulty[matched] = self.difficulty[source[matched]]
+                discrimination[matched] = self.discrimination[source[matched]]
+            # Copies of a repeated id take the first copy's parameters
+            first = first_copies(index)
+            aligned = self._aligned[index] = (difficulty[first], discrimination[first])
+        return aligned
+
+    def save(self, path: Path = IRT_PARAMS_FILE):
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f, item_ids=self.item_ids, difficulty=self.difficulty,
+                discrimination=self.discrimination, item_responses=self.item_responses,
+                respondents=self.respondents, ability=self.ability, info=np.array(json.dumps(self.info)),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = IRT_PARAMS_FILE) -> Optional["IRTParameters"]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls(data["item_ids"], data["difficulty"], data["discrimination"],
+                           data["item_responses"], data["respondents"], data["ability"],
+                           json.loads(str(data["info"])))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Failed to load IRT parameters: {e}")
+            return None
+
+
+def fit_bank(index: QuestionIndex, model: str = "2pl", iterations: int = 100,
+             store: Optional[ExposureStore] = None, sessions_dir: Path = SESSIONS_DIR,
+             path: Optional[Path] = IRT_PARAMS_FILE) -> IRTParameters:
+    """Fit the model to all recorded responses and save it (unless path is None)"""
+    responses = collect_responses(index, store, sessions_dir)
+    theta, b, a = fit(responses, index.size, model, iterations)
+
+    answered = np.bincount(responses.items, minlength=index.size)
+    fitted = np.flatnonzero(answered)
+    _, ids = bank_ids(index)
+    params = IRTParameters(
+        ids[fitted], b[fitted], a[fitted], answered[fitted],
+        np.array(responses.respondents, dtype=np.str_), theta,
+        {"model": model, "responses": len(responses), "fitted_at": datetime.now().isoformat()},
+    )
+    if path is not None:
+        params.save(path)
+    return params
+
+
+def probability(theta: float, difficulty: np.ndarray, discrimination: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-discrimination * (theta - difficulty)))
+
+
+def estimate_ability(prior: float, difficulty: np.ndarray, discrimination: np.ndarray,
+                     correct: Sequence[bool], iterations: int = 10) -> float:
+    """MAP ability from a few answers, with a N(prior, 1) prior"""
+    y = np.asarray(correct, dtype=np.float64)
+    theta = prior
+    for _ in range(iterations):
+        p = probability(theta, difficulty, discrimination)
+        grad = np.sum(discrimination * (y - p)) - (theta - prior) / ABILITY_SD ** 2
+        hess = np.sum(discrimination ** 2 * p * (1 - p)) + 1 / ABILITY_SD ** 2
+        step = float(np.clip(grad / hess, -1.0, 1.0))
+        theta += step
+        if abs(step) < 1e-6:
+            break
+    return float(theta)
+
+
+class AdaptiveSelector:
+    """Maximum-information item selection over one bank"""
+
+    def __init__(self, index: QuestionIndex, params: IRTParameters):
+        self.index = index
+        self.difficulty, self.discrimination = params.for_index(index)
+
+    def information(self, theta: float) -> np.ndarray:
+        """Fisher information of every question at ability theta"""
+        p = probability(theta, self.difficulty, self.discrimination)
+        return self.discrimination ** 2 * p * (1 - p)
+
+    def next_question(self, theta: float, candidates: np.ndarray,
+                      exclude: Sequence[int] = ()) -> Optional[int]:
+        """Most informative position among candidates (a mask), skipping exclude"""
+        info = np.where(candidates, self.information(theta), -1.0)
+        if len(exclude):
+            info[np.asarray(exclude, dtype=np.int64)] = -1.0
+        best = int(np.argmax(info))
+        return best if info[best] >= 0 else None
+
+    def update_ability(self, prior: float, positions: Sequence[int], correct: Sequence[bool]) -> float:
+        """Ability after the answers given so far in a session"""
+        if not len(positions):
+            return prior
+        positions = np.asarray(positions, dtype=np.int64)
+        return estimate_ability(prior, self.difficulty[positions], self.discrimination[positions], correct)
+
+
+_PARAMS: Dict[Path, Tuple[Optional[Tuple[int, int]], Optional[IRTParameters]]] = {}
+
+
+def get_irt_parameters(path: Path = IRT_PARAMS_FILE) -> Optional[IRTParameters]:
+    """Saved parameters, reloaded when the fit job rewrites them"""
+    try:
+        st = path.stat()
+        signature = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+    cached = _PARAMS.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _PARAMS[path] = (signature, IRTParameters.load(path))
+    return cached[1]
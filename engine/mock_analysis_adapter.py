@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import timedelta
 from engine.analysis_engine import (
     QuestionResult,
@@ -14,7 +14,8 @@ def analyze_mock_attempt(
     questions: List[ParsedQuestion],
     answers: Dict[int, str],
     start_time: float,
-    end_time: float
+    end_time: float,
+    time_spent: Optional[List[float]] = None
 ) -> SessionAnalysis:
     """
     Converts a mock exam attempt into a SessionAnalysis object
@@ -38,7 +39,7 @@ def analyze_mock_attempt(
                 is_attempted=is_attempted,
                 subject=q.subject,
                 explanation=q.explanation,
-                time_spent=0  # optional future enhancement
+                time_spent=round(time_spent[idx]) if time_spent else 0
             )
         )
 
@@ -1,17 +1,33 @@
 # engine/mock_exam_engine.py
 
 import time
-import random
+from typing import Dict
+
 import streamlit as st
 
+from engine.exposure import bank_ids
+from engine.mock_papers import get_daily_paper
+from engine.paper_generator import get_paper_generator
+from engine.question_index import QuestionIndex
+from storage.attempt_payload import FORMAT, decode_answers, encode_answers
+from storage.mock_sessions import MockState, get_mock_session_store
+from storage.shared_bank import QuestionSelection
+
 TOTAL_QUESTIONS = 150
 TOTAL_TIME_SEC = 180 * 60  # 180 minutes
 
 
-def init_mock_session(all_questions):
+def init_mock_session(all_questions, index: QuestionIndex = None, mock_id: str = None,
+                      user_id: str = None):
     """
     Initialize mock exam session exactly once.
     Safe against reruns and partial session resets.
+    Pass the bank's QuestionIndex when one exists to skip building it.
+    With a mock_id every session gets that mock's shared paper; without
+    one a fresh blueprint paper is drawn.
+    With both a user_id and a mock_id the attempt is kept in the mock
+    session store, and an attempt already in progress there (from before
+    a refresh, a restart or on another node) is resumed.
     """
 
     # If already initialized properly, do nothing
@@ -28,17 +44,28 @@ def init_mock_session(all_questions):
             f"Required={TOTAL_QUESTIONS}, Available={len(all_questions)}"
         )
 
-    st.session_state.mock_questions = random.sample(
-        all_questions, TOTAL_QUESTIONS
-    )
+    # Blueprint paper, held as indices into the shared bank
+    index = index if index is not None else QuestionIndex(all_questions)
+    if mock_id is not None:
+        positions = get_daily_paper(index, mock_id)
+    else:
+        positions = get_paper_generator(index).generate(TOTAL_QUESTIONS)
+    st.session_state.mock_questions = QuestionSelection(all_questions, positions)
+    # The bank version the paper was drawn from, for the saved attempt;
+    # the shared bank may be reloaded before it is submitted
+    st.session_state.mock_bank_key = bank_ids(index)[0]
 
     # index → selected option (A/B/C/D or None)
     st.session_state.mock_answers = {
-        i: None for i in range(TOTAL_QUESTIONS)
+        i: None for i in range(len(positions))
     }
 
     st.session_state.mock_current_q = 0
 
+    # Seconds spent on each question, and which one is on screen since when
+    st.session_state.mock_time_spent = [0.0] * len(positions)
+    st.session_state.mock_last_view = None
+
     # Timer state
     st.session_state.mock_exam_started = False
     st.session_state.mock_start_time = None
@@ -46,14 +73,86 @@ def init_mock_session(all_questions):
     # Submission lock
     st.session_state.mock_submitted = False
 
+    st.session_state.mock_state_key = None
+    if user_id and mock_id is not None:
+        st.session_state.mock_state_key = (user_id, mock_id)
+        saved = get_mock_session_store().load(user_id, mock_id)
+        if saved is not None:
+            _restore(saved)
+
+
+def _restore(saved: MockState):
+    answers = decode_answers(saved.answers)
+    if len(answers) == len(st.session_state.mock_answers):
+        st.session_state.mock_answers = dict(enumerate(answers))
+        st.session_state.mock_current_q = saved.current_q
+    if saved.start_time is not None:
+        st.session_state.mock_exam_started = True
+        st.session_state.mock_start_time = saved.start_time
+
+
+def _mock_state() -> MockState:
+    user_id, mock_id = st.session_state.mock_state_key
+    answers = st.session_state.mock_answers
+    return MockState(
+        user_id, mock_id,
+        encode_answers([answers[i] for i in range(len(answers))]),
+        st.session_state.mock_current_q,
+        st.session_state.mock_start_time,
+        st.session_state.mock_submitted,
+    )
+
+
+def save_mock_state():
+    """Queue the attempt's answers and position for the mock session store"""
+    if st.session_state.get("mock_state_key"):
+        get_mock_session_store().save(_mock_state())
+
+
+def submit_mock_state():
+    """Mark the stored attempt submitted"""
+    st.session_state.mock_submitted = True
+    if st.session_state.get("mock_state_key"):
+        get_mock_session_store().submit(_mock_state())
+
 
 def start_exam_if_needed():
     """
     Starts timer ONLY on first answer selection.
+    A stored attempt keeps the start time it was first given, whichever
+    node gave it.
     """
     if not st.session_state.mock_exam_started:
         st.session_state.mock_exam_started = True
-        st.session_state.mock_start_time = time.time()
+        if st.session_state.get("mock_state_key"):
+            st.session_state.mock_start_time = get_mock_session_store().start(_mock_state())
+        else:
+            st.session_state.mock_start_time = time.time()
+
+
+def track_question_time():
+    """
+    Credit the time since the last rerun to the question shown during it.
+    Call once per render; every answer and navigation is a rerun.
+    """
+    now = time.time()
+    last = st.session_state.mock_last_view
+    if last is not None:
+        st.session_state.mock_time_spent[last[0]] += now - last[1]
+    st.session_state.mock_last_view = (st.session_state.mock_current_q, now)
+
+
+def mock_attempt_payload() -> Dict:
+    """The attempt's question ids, answers and timings (storage/attempt_payload.py)"""
+    questions = st.session_state.mock_questions
+    answers = st.session_state.mock_answers
+    return {
+        "format": FORMAT,
+        "bank": st.session_state.mock_bank_key,
+        "question_ids": [q.id for q in questions],
+        "answers": encode_answers([answers[i] for i in range(len(questions))]),
+        "time_spent": [round(t) for t in st.session_state.mock_time_spent],
+    }
 
 
 def remaining_time():
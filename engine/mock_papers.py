@@ -0,0 +1,179 @@
+"""
+Daily Mock Papers
+The official mock of a day is one paper, shared by everyone who sits it.
+It is generated once per mock_id from the blueprint with a seed derived
+from the id, then stored as a compact array of question ids; sessions only
+map those ids back to bank positions, which each process caches. Days
+covered by a pre-built pool (engine/mock_pool.py) are served from it.
+"""
+
+import hashlib
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from engine.mock_pool import MockPool
+from engine.paper_generator import get_paper_generator
+from engine.question_index import QuestionIndex
+from storage.attempt_payload import decode_answers, is_compact
+from storage.image_store import get_image_manifest
+from storage.shared_bank import QuestionSelection
+from config.settings import MOCK_PAPERS_DIR, EXAM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+def mock_id_for(day: date) -> str:
+    """Official mock ID for a day"""
+    return f"mock_fmge_{day.strftime('%Y_%m_%d')}"
+
+
+def day_of_mock(mock_id: str) -> Optional[date]:
+    """Day of an official mock ID, or None for other ids"""
+    try:
+        return datetime.strptime(mock_id, "mock_fmge_%Y_%m_%d").date()
+    except ValueError:
+        return None
+
+
+def paper_seed(mock_id: str) -> int:
+    """Stable seed for a mock, the same in every process and Python version"""
+    return int.from_bytes(hashlib.sha256(mock_id.encode("utf-8")).digest()[:8], "little")
+
+
+class MockPaperStore:
+    """
+    <mock_id>.npy files holding a fixed-width byte array of question ids,
+    falling back to the pool for days without their own file
+    """
+
+    def __init__(self, root: Path = MOCK_PAPERS_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.pool = MockPool(root)
+
+    def path(self, mock_id: str) -> Path:
+        return self.root / f"{mock_id}.npy"
+
+    def exists(self, mock_id: str) -> bool:
+        return self.path(mock_id).exists() or self._pool_paper(mock_id) is not None
+
+    def _pool_paper(self, mock_id: str) -> Optional[List[str]]:
+        day = day_of_mock(mock_id)
+        return self.pool.paper(day) if day else None
+
+    def save(self, mock_id: str, question_ids: List[str]):
+        ids = np.array([q_id.encode("utf-8") for q_id in question_ids], dtype=np.bytes_)
+        path = self.path(mock_id)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, ids, allow_pickle=False)
+        os.replace(tmp_path, path)
+
+    def load(self, mock_id: str) -> Optional[List[str]]:
+        path = self.path(mock_id)
+        if not path.exists():
+            # A paper built on its own (and possibly already sat) wins over the pool
+            return self._pool_paper(mock_id)
+        ids = np.load(path, allow_pickle=False)
+        return [q_id.decode("utf-8") for q_id in ids.tolist()]
+
+
+def build_paper(index: QuestionIndex, mock_id: str, count: int = EXAM_CONFIG.full_mock_count) -> List[str]:
+    """Question ids of the blueprint paper for mock_id"""
+    rng = np.random.default_rng(paper_seed(mock_id))
+    positions = get_paper_generator(index).generate(count, rng)
+    get = getattr(index.bank, "peek", index.bank.__getitem__)
+    return [get(p).id for p in positions]
+
+
+# Positions of each loaded paper, per index (so per bank version)
+_POSITIONS: "weakref.WeakKeyDictionary[QuestionIndex, Dict[str, List[int]]]" = weakref.WeakKeyDictionary()
+_BUILD_LOCK = threading.Lock()
+
+
+def get_daily_paper(index: QuestionIndex, mock_id: str,
+                    store: Optional[MockPaperStore] = None, warm: bool = True) -> List[int]:
+    """
+    Bank positions of mock_id's paper, building and saving it on first use.
+    Questions deleted since the paper was built are left out. The first
+    load in a process encodes the paper's images in the background.
+    """
+    papers = _POSITIONS.setdefault(index, {})
+    positions = papers.get(mock_id)
+    if positions is not None:
+        return positions
+
+    store = store or MockPaperStore()
+    with _BUILD_LOCK:
+        question_ids = store.load(mock_id)
+        if question_ids is None:
+            question_ids = build_paper(index, mock_id)
+            store.save(mock_id, question_ids)
+            logger.info(f"Built mock paper {mock_id} ({len(question_ids)} questions)")
+
+    by_id = index.id_positions()
+    positions = [by_id[q_id] for q_id in question_ids if q_id in by_id]
+    if len(positions) < len(question_ids):
+        logger.warning(f"{len(question_ids) - len(positions)} questions of {mock_id} "
+                       f"are no longer in the bank")
+    papers[mock_id] = positions
+    if warm:
+        threading.Thread(target=warm_images, args=(index, positions), daemon=True).start()
+    return positions
+
+
+def attempt_questions(index: QuestionIndex,
+                      attempt: Dict) -> Optional[Tuple[QuestionSelection, List[Optional[str]]]]:
+    """
+    (questions, answer per question) of a saved mock attempt, the
+    questions rehydrated from the current bank. Questions deleted since
+    are left out, with their answers. None for old attempts, which did
+    not record their paper.
+    """
+    if not is_compact(attempt):
+        return None
+    answers = decode_answers(attempt["answers"])
+    if len(answers) != len(attempt["question_ids"]):
+        raise ValueError(f"Mock attempt {attempt.get('mock_id')} has {len(answers)} answers "
+                         f"for {len(attempt['question_ids'])} questions")
+    by_id = index.id_positions()
+    kept = [
+        (by_id[q_id], answer)
+        for q_id, answer in zip(attempt["question_ids"], answers)
+        if q_id in by_id
+    ]
+    return QuestionSelection(index.bank, [p for p, _ in kept]), [a for _, a in kept]
+
+
+def warm_images(index: QuestionIndex, positions: List[int], workers: int = 4) -> int:
+    """Encode a paper's images into the manifest's cache; returns how many were found"""
+    get = getattr(index.bank, "peek", index.bank.__getitem__)
+    paths = [img for p in positions for img in get(p).images if not img.startswith("data:")]
+    manifest = get_image_manifest()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(uri is not None for uri in pool.map(manifest.data_uri, paths))
+
+
+def rollover(index: QuestionIndex, day: Optional[date] = None,
+             store: Optional[MockPaperStore] = None) -> Dict:
+    """Pre-build the paper for day (default tomorrow) and warm its images"""
+    day = day or date.today() + timedelta(days=1)
+    mock_id = mock_id_for(day)
+    store = store or MockPaperStore()
+
+    existed = store.exists(mock_id)
+    positions = get_daily_paper(index, mock_id, store, warm=False)
+    return {
+        "mock_id": mock_id,
+        "questions": len(positions),
+        "built": not existed,
+        "images_warmed": warm_images(index, positions),
+    }
@@ -0,0 +1,216 @@
+"""
+Mock Paper Pool
+A season of daily mock papers built offline in one run. Every paper
+follows the blueprint, and no question appears twice within `window`
+consecutive days.
+
+The eligible bank is dealt into `window` partitions, stratified by
+subject, image/text and year so each partition carries the bank's mix.
+Day d draws only from partition d % window, so any two papers less than
+window days apart are disjoint by construction. Partitions are independent
+and are generated in parallel; within one, a greedy pass keeps drawing
+questions it has not used yet and starts a new cycle once a stratum runs dry.
+
+The pool is one 2-D array of question ids (a row per day) plus a manifest
+with its first day, so serving a day's paper is a single row lookup.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+import numpy as np
+
+from engine.paper_generator import ELIGIBLE, PaperGenerator
+from engine.question_index import QuestionIndex
+from config.settings import MOCK_BLUEPRINT, MOCK_PAPERS_DIR, MockBlueprint, EXAM_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+POOL_VERSION = 1
+POOL_MANIFEST = "pool.json"
+
+
+def partition_bank(index: QuestionIndex, parts: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Partition number per question (-1 if ineligible). Strata are dealt
+    round-robin one after another, so partition sizes differ by at most one.
+    """
+    eligible = index.mask(**ELIGIBLE)
+    subject_codes, _ = index.column("subject")
+    year_codes, _ = index.column("year")
+    has_images = index.mask(has_images=True)
+
+    partition = np.full(index.size, -1, dtype=np.int32)
+    positions = np.flatnonzero(eligible)
+    strata = np.stack([subject_codes[positions], year_codes[positions], has_images[positions]])
+    _, stratum = np.unique(strata, axis=1, return_inverse=True)
+    stratum = stratum.ravel()
+    dealt = 0
+    for s in range(int(stratum.max()) + 1 if len(stratum) else 0):
+        members = rng.permutation(positions[stratum == s])
+        partition[members] = (dealt + np.arange(len(members))) % parts
+        dealt += len(members)
+    return partition
+
+
+# Per worker process, set by _init_worker
+_WORKER: Dict = {}
+
+
+def _init_worker(index: QuestionIndex, blueprint: MockBlueprint, partition: np.ndarray):
+    _WORKER.update(index=index, blueprint=blueprint, partition=partition)
+
+
+def _build_partition(part: int, days: List[int], count: int,
+                     seed: int) -> Tuple[List[int], np.ndarray, int]:
+    """Papers for the given days from one partition: (days, positions, topped up)"""
+    generator = PaperGenerator(_WORKER["index"], _WORKER["blueprint"],
+                               restrict=_WORKER["partition"] == part)
+    rng = np.random.default_rng([seed, part])
+    papers = np.empty((len(days), count), dtype=np.int64)
+    topped_up = 0
+    used: Set[int] = set()
+    for row in range(len(days)):
+        try:
+            positions, shortfall = generator.draw(count, rng, used)
+        except ValueError:
+            if not used:
+                raise
+            shortfall = count
+        if shortfall and used:
+            # Part of the partition is used up: start a new cycle over all of it
+            used.clear()
+            positions, shortfall = generator.draw(count, rng)
+        used.update(positions)
+        papers[row] = positions
+        topped_up += shortfall
+    return days, papers, topped_up
+
+
+def build_pool(index: QuestionIndex, start: date, papers: int, window: int = 30,
+               count: int = EXAM_CONFIG.full_mock_count, workers: Optional[int] = None,
+               seed: int = 0, blueprint: MockBlueprint = MOCK_BLUEPRINT,
+               root: Path = MOCK_PAPERS_DIR) -> Dict:
+    """Build and save papers for start .. start + papers - 1; returns the manifest"""
+    eligible = index.count(**ELIGIBLE)
+    parts = min(window, papers, eligible // count)
+    if parts < 1:
+        raise ValueError(f"Not enough questions for a paper. Required={count}, Available={eligible}")
+    if parts < min(window, papers):
+        logger.warning(f"Bank only supports a no-repeat window of {parts} days (asked for {window})")
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    partition = partition_bank(index, parts, rng)
+    tasks = [(part, list(range(part, papers, parts)), count, seed) for part in range(parts)]
+
+    positions = np.empty((papers, count), dtype=np.int64)
+    topped_up = 0
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(index, blueprint, partition)
+        results = [_build_partition(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, parts), initializer=_init_worker,
+                                 initargs=(index, blueprint, partition)) as pool:
+            results = list(pool.map(_build_partition, *zip(*tasks)))
+    for days, rows, shortfall in results:
+        positions[days] = rows
+        topped_up += shortfall
+
+    # Positions -> ids once per distinct question
+    get = getattr(index.bank, "peek", index.bank.__getitem__)
+    distinct, inverse = np.unique(positions, return_inverse=True)
+    distinct_ids = np.array([get(int(p)).id.encode("utf-8") for p in distinct], dtype=np.bytes_)
+    ids = distinct_ids[inverse.reshape(positions.shape)]
+
+    manifest = {
+        "version": POOL_VERSION,
+        "ids_file": "pool.npy",
+        "start": start.isoformat(),
+        "papers": papers,
+        "questions_per_paper": count,
+        "window": parts,
+        "seed": seed,
+        "distinct_questions": len(distinct),
+        "topped_up": topped_up,
+        "bank_questions": index.size,
+        "built_at": datetime.now().isoformat(),
+        "build_seconds": round(time.perf_counter() - started, 2),
+    }
+    MockPool(root).save(ids, manifest)
+    return manifest
+
+
+class MockPool:
+    """Reader for the saved pool: the id array is memory-mapped, a paper is one row"""
+
+    def __init__(self, root: Path = MOCK_PAPERS_DIR):
+        self.root = root
+        self._signature = None
+        self._manifest: Optional[Dict] = None
+        self._ids: Optional[np.ndarray] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / POOL_MANIFEST
+
+    def save(self, ids: np.ndarray, manifest: Dict):
+        """Write the id array, then the manifest that points at it"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        ids_path = self.root / manifest["ids_file"]
+        tmp_path = ids_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, ids, allow_pickle=False)
+        os.replace(tmp_path, ids_path)
+
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _load(self) -> bool:
+        try:
+            st = self.manifest_path.stat()
+        except OSError:
+            self._manifest = self._ids = None
+            return False
+        signature = (st.st_mtime_ns, st.st_size)
+        if signature != self._signature:
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("version") != POOL_VERSION:
+                    raise ValueError(f"unsupported pool version {manifest.get('version')}")
+                ids = np.load(self.root / manifest["ids_file"], mmap_mode="r", allow_pickle=False)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable mock pool: {e}")
+                manifest = ids = None
+            self._signature, self._manifest, self._ids = signature, manifest, ids
+        return self._manifest is not None
+
+    def manifest(self) -> Optional[Dict]:
+        return self._manifest if self._load() else None
+
+    def paper(self, day: date) -> Optional[List[str]]:
+        """Question ids of day's paper, or None if the pool doesn't cover it"""
+        if not self._load():
+            return None
+        row = (day - date.fromisoformat(self._manifest["start"])).days
+        if not 0 <= row < len(self._ids):
+            return None
+        return [q_id.decode("utf-8") for q_id in self._ids[row].tolist() if q_id]
+
+    def days(self) -> Optional[Tuple[date, date]]:
+        """First and last day covered"""
+        if not self._load():
+            return None
+        start = date.fromisoformat(self._manifest["start"])
+        return start, start + timedelta(days=len(self._ids) - 1)
@@ -0,0 +1,232 @@
+"""
+Mock Paper Generator
+Builds papers that follow the FMGE subject blueprint instead of sampling
+the whole bank uniformly, so every paper has the configured number of
+questions per subject, share of image questions and year mix.
+
+Eligible questions are split once into strata (subject x image/text x
+year). Each subject/image bucket gets a Walker alias table over its years,
+weighted by pool size and the blueprint's year weights, so a paper is a
+handful of O(1) draws rather than a pass over the bank.
+"""
+
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from engine.question_index import QuestionIndex
+from config.settings import MOCK_BLUEPRINT, MockBlueprint
+
+# Questions a paper may use
+ELIGIBLE = {"is_valid": True, "has_answer": True}
+
+
+class AliasTable:
+    """Walker's alias method: O(1) draws from a fixed discrete distribution"""
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        if n == 0 or weights.sum() <= 0:
+            raise ValueError("Alias table needs at least one positive weight")
+
+        scaled = weights * n / weights.sum()
+        self.prob = np.ones(n)
+        self.alias = np.arange(n)
+
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding error and keep prob 1
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        columns = rng.integers(len(self.prob), size=size)
+        keep = rng.random(size) < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns])
+
+
+@dataclass
+class _Bucket:
+    """Eligible questions of one subject, with or without images, by year"""
+    pools: List[np.ndarray]
+    years: AliasTable
+
+    @property
+    def size(self) -> int:
+        return sum(len(pool) for pool in self.pools)
+
+
+def apportion(weights: Dict, total: int) -> Dict:
+    """Split total into integers proportional to weights (largest remainder)"""
+    weight_sum = sum(weights.values())
+    if total <= 0 or weight_sum <= 0:
+        return {key: 0 for key in weights}
+
+    exact = {key: total * w / weight_sum for key, w in weights.items()}
+    counts = {key: int(value) for key, value in exact.items()}
+    by_remainder = sorted(weights, key=lambda key: exact[key] - counts[key], reverse=True)
+    for key in by_remainder[:total - sum(counts.values())]:
+        counts[key] += 1
+    return counts
+
+
+class PaperGenerator:
+    """Blueprint papers over one QuestionIndex; pools are built once"""
+
+    def __init__(self, index: QuestionIndex, blueprint: MockBlueprint = MOCK_BLUEPRINT,
+                 restrict: Optional[np.ndarray] = None):
+        """restrict: optional boolean mask of the questions this generator may use"""
+        self.index = index
+        self.blueprint = blueprint
+
+        eligible = index.mask(**ELIGIBLE)
+        if restrict is not None:
+            eligible &= restrict
+        self._eligible = np.flatnonzero(eligible)
+        year_codes, year_values = index.column("year")
+        has_images = index.mask(has_images=True)
+
+        self._buckets: Dict[Tuple[str, bool], _Bucket] = {}
+        self._plans: Dict[int, Dict[Tuple[str, bool], int]] = {}
+        for subject in blueprint.subject_counts:
+            subject_mask = eligible & index.value_mask("subject", subject)
+            for with_images in (True, False):
+                positions = np.flatnonzero(subject_mask & (has_images == with_images))
+                if not len(positions):
+                    continue
+                codes = year_codes[positions]
+                pools, weights = [], []
+                for code in np.unique(codes):
+                    pool = positions[codes == code]
+                    pools.append(pool)
+                    weights.append(len(pool) * blueprint.year_weights.get(year_values[code], 1.0))
+                if sum(weights) > 0:
+                    self._buckets[(subject, with_images)] = _Bucket(pools, AliasTable(weights))
+
+    @property
+    def eligible_count(self) -> int:
+        return len(self._eligible)
+
+    def plan(self, count: Optional[int] = None) -> Dict[Tuple[str, bool], int]:
+        """Questions per (subject, with_images) for a paper of count questions"""
+        count = self.blueprint.total if count is None else count
+        if count in self._plans:
+            return self._plans[count]
+        per_subject = apportion(self.blueprint.subject_counts, count)
+
+        sizes = {key: bucket.size for key, bucket in self._buckets.items()}
+        with_images = apportion(
+            {s: n for s, n in per_subject.items() if sizes.get((s, True))},
+            round(count * self.blueprint.image_ratio),
+        )
+
+        plan = {}
+        for subject, n in per_subject.items():
+            n_images = min(with_images.get(subject, 0), n, sizes.get((subject, True), 0))
+            plan[(subject, True)] = n_images
+            plan[(subject, False)] = n - n_images
+        self._plans[count] = plan
+        return plan
+
+    def generate(self, count: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None) -> List[int]:
+        """
+        Bank positions of one paper, shuffled. Strata that run short are
+        topped up from the rest of the eligible bank.
+        """
+        return self.draw(count, rng)[0]
+
+    def draw(self, count: Optional[int] = None, rng: Optional[np.random.Generator] = None,
+             exclude: Optional[Set[int]] = None) -> Tuple[List[int], int]:
+        """
+        (positions, how many were topped up outside the blueprint) for one
+        paper that avoids the positions in exclude.
+        """
+        count = self.blueprint.total if count is None else count
+        rng = rng or np.random.default_rng()
+        used: Set[int] = set(exclude) if exclude else set()
+        available = len(self._eligible) - len(used)
+        if count > available:
+            raise ValueError(
+                f"Not enough questions for a paper. "
+                f"Required={count}, Available={available}"
+            )
+
+        chosen: List[int] = []
+        for key, n in self.plan(count).items():
+            bucket = self._buckets.get(key)
+            if bucket is not None and n:
+                chosen.extend(self._draw_bucket(bucket, n, rng, used))
+
+        shortfall = count - len(chosen)
+        if shortfall:
+            chosen.extend(_draw_distinct(self._eligible, shortfall, rng, used))
+
+        rng.shuffle(chosen)
+        return chosen, shortfall
+
+    def _draw_bucket(self, bucket: _Bucket, n: int, rng: np.random.Generator,
+                     used: Set[int]) -> List[int]:
+        picked: List[int] = []
+        taken = [0] * len(bucket.pools)
+        # Redraw years whose pool this paper has emptied; give up after a
+        # few rounds and let the caller top up from the whole bank
+        for _ in range(8):
+            wanted = n - len(picked)
+            if not wanted:
+                break
+            per_year = np.bincount(bucket.years.draw(rng, wanted), minlength=len(bucket.pools))
+            for year, k in enumerate(per_year):
+                k = min(int(k), len(bucket.pools[year]) - taken[year])
+                if k > 0:
+                    drawn = _draw_distinct(bucket.pools[year], k, rng, used)
+                    picked.extend(drawn)
+                    taken[year] += len(drawn)
+        return picked
+
+
+def _draw_distinct(pool: np.ndarray, k: int, rng: np.random.Generator, used: Set[int]) -> List[int]:
+    """k positions from pool not in used (which is updated); fewer if pool runs out"""
+    picked: List[int] = []
+    if k * 4 < len(pool):
+        # Rejection sampling: cheap while the pool is much larger than k and
+        # mostly unused. A few rounds only: used may cover nearly all of the
+        # pool (e.g. a mock pool partition), and then the scan below finishes
+        for _ in range(8):
+            for i in rng.integers(len(pool), size=k - len(picked)):
+                position = int(pool[i])
+                if position not in used:
+                    used.add(position)
+                    picked.append(position)
+            if len(picked) == k:
+                return picked
+
+    for i in rng.permutation(len(pool)):
+        position = int(pool[i])
+        if position not in used:
+            used.add(position)
+            picked.append(position)
+            if len(picked) == k:
+                break
+    return picked
+
+
+_GENERATORS: "weakref.WeakKeyDictionary[QuestionIndex, PaperGenerator]" = weakref.WeakKeyDictionary()
+
+
+def get_paper_generator(index: QuestionIndex) -> PaperGenerator:
+    """Generator for an index with the configured blueprint, built once per index"""
+    generator = _GENERATORS.get(index)
+    if generator is None:
+        generator = _GENERATORS[index] = PaperGenerator(index)
+    return generator
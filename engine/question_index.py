@@ -0,0 +1,213 @@
+"""
+Question Index
+NumPy boolean masks over a question bank for every field exams and the UI
+filter on. Any conjunction of filters is a vectorised AND of masks, and
+random selections are drawn uniformly from the resulting mask.
+
+Built once per bank version: straight from the record columns of a mapped
+snapshot or a QuestionTable, otherwise with one pass over the questions.
+"""
+
+from collections.abc import Sequence
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.pdf_parser import ParsedQuestion
+from storage import question_table, snapshot
+from storage.question_table import QuestionTable
+from storage.snapshot import SnapshotBank
+
+
+CATEGORY_FIELDS = ("subject", "year", "source_file")
+FLAG_FIELDS = ("is_valid", "has_images", "has_image_reference", "has_answer",
+               "has_explanation", "needs_review")
+
+# Snapshot flag bit per boolean field
+SNAPSHOT_FLAGS = {
+    "is_valid": snapshot.IS_VALID,
+    "has_images": snapshot.HAS_IMAGES,
+    "has_image_reference": snapshot.HAS_IMAGE_REFERENCE,
+    "has_answer": snapshot.HAS_ANSWER,
+    "has_explanation": snapshot.HAS_EXPLANATION,
+    "needs_review": snapshot.NEEDS_REVIEW,
+}
+
+
+def _snapshot_record_dtype() -> np.dtype:
+    """snapshot.RECORD as a structured dtype: string ids, page number, flags"""
+    names = list(snapshot.STRING_FIELDS) + ["page_number", "flags"]
+    count = len(snapshot.STRING_FIELDS)
+    return np.dtype({
+        "names": names,
+        "formats": ["<u4"] * (count + 1) + ["u1"],
+        "offsets": [4 * i for i in range(count + 1)] + [4 * (count + 1)],
+        "itemsize": snapshot.RECORD.size,
+    })
+
+
+class QuestionIndex:
+    """Masks for one bank; the bank must not change while the index is used"""
+
+    def __init__(self, bank: Sequence[ParsedQuestion]):
+        self.bank = bank
+        self.size = len(bank)
+        self._flags: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._categories: Dict[str, List[Optional[str]]] = {}
+        self._value_masks: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+        self._ids: Optional[Dict[str, int]] = None
+
+        if isinstance(bank, SnapshotBank):
+            self._build_from_snapshot(bank)
+        elif isinstance(bank, QuestionTable):
+            self._build_from_table(bank)
+        else:
+            self._build_from_questions(bank)
+
+    # ----- building -----
+
+    def _build_from_snapshot(self, bank: SnapshotBank):
+        records = np.frombuffer(bank.record_buffer(), dtype=_snapshot_record_dtype())
+        flags = records["flags"]
+        for name, bit in SNAPSHOT_FLAGS.items():
+            self._flags[name] = (flags & bit) != 0
+
+        # String ids are already category codes; renumber them densely
+        for name in CATEGORY_FIELDS:
+            sids, codes = np.unique(records[name], return_inverse=True)
+            self._codes[name] = codes.astype(np.int32)
+            self._categories[name] = [
+                None if sid == snapshot.NONE_ID else bank.string(int(sid)) for sid in sids
+            ]
+
+    def _build_from_table(self, table: QuestionTable):
+        flags = np.frombuffer(table.flag_column(), dtype=np.uint8)
+        for name, bit in question_table.FLAG_FIELDS.items():
+            self._flags[name] = (flags & bit) != 0
+
+        has_images = np.zeros(self.size, dtype=bool)
+        has_images[table.rows_with("images")] = True
+        self._flags["has_images"] = has_images
+
+        answer_codes, answers = table.category_column("correct_answer")
+        answered = np.array([bool(a) for a in answers], dtype=bool)
+        self._flags["has_answer"] = answered[np.frombuffer(answer_codes, dtype=np.uint32)] \
+            if answers else np.zeros(self.size, dtype=bool)
+        self._flags["has_explanation"] = np.fromiter(
+            (table.has_value(i, "explanation") for i in range(self.size)), dtype=bool, count=self.size)
+
+        for name in CATEGORY_FIELDS:
+            codes, values = table.category_column(name)
+            self._codes[name] = np.frombuffer(codes, dtype=np.uint32).astype(np.int32)
+            self._categories[name] = list(values)
+
+    def _build_from_questions(self, bank: Sequence[ParsedQuestion]):
+        get = getattr(bank, "peek", bank.__getitem__)  # don't fill bank caches
+        flags = {name: np.zeros(self.size, dtype=bool) for name in FLAG_FIELDS}
+        codes = {name: np.zeros(self.size, dtype=np.int32) for name in CATEGORY_FIELDS}
+        lookup: Dict[str, Dict[Optional[str], int]] = {name: {} for name in CATEGORY_FIELDS}
+
+        for i in range(self.size):
+            q = get(i)
+            flags["is_valid"][i] = q.is_valid
+            flags["has_images"][i] = bool(q.images)
+            flags["has_image_reference"][i] = q.has_image_reference
+            flags["has_answer"][i] = bool(q.correct_answer)
+            flags["has_explanation"][i] = q.has_value("explanation")
+            flags["needs_review"][i] = q.needs_review
+            for name in CATEGORY_FIELDS:
+                values = lookup[name]
+                codes[name][i] = values.setdefault(getattr(q, name), len(values))
+
+        self._flags = flags
+        self._codes = codes
+        self._categories = {name: list(lookup[name]) for name in CATEGORY_FIELDS}
+
+    def __getstate__(self):
+        # Pickled for worker processes: masks and codes only, not the bank
+        state = self.__dict__.copy()
+        state.update(bank=None, _ids=None, _value_masks={})
+        return state
+
+    # ----- queries -----
+
+    def values(self, name: str) -> List[str]:
+        """Distinct non-empty values of a categorical field, sorted"""
+        return sorted(v for v in self._categories[name] if v)
+
+    def column(self, name: str) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """(code per question, value per code) of a categorical field"""
+        return self._codes[name], self._categories[name]
+
+    def id_positions(self) -> Dict[str, int]:
+        """Question id -> position in the bank, built on first use"""
+        if self._ids is None:
+            if hasattr(self.bank, "id_index"):
+                ids = self.bank.id_index()
+            else:
+                get = getattr(self.bank, "peek", self.bank.__getitem__)
+                ids = {}
+                for i in range(self.size):
+                    ids.setdefault(get(i).id, i)
+            self._ids = ids
+        return self._ids
+
+    def value_mask(self, name: str, value: Optional[str]) -> np.ndarray:
+        """Questions whose categorical field equals value (None matches unset)"""
+        key = (name, value)
+        mask = self._value_masks.get(key)
+        if mask is None:
+            try:
+                code = self._categories[name].index(value)
+            except ValueError:
+                mask = np.zeros(self.size, dtype=bool)
+            else:
+                mask = self._codes[name] == code
+            self._value_masks[key] = mask
+        return mask
+
+    def mask(self, search: Optional[str] = None, within: Optional[np.ndarray] = None,
+             **filters) -> np.ndarray:
+        """
+        AND of the masks for filters (filter_questions() names plus
+        has_explanation and needs_review); None means "don't filter".
+        within is an extra boolean mask from outside the index, e.g. a
+        user's history.
+        """
+        mask = np.ones(self.size, dtype=bool) if within is None else within.copy()
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name in self._flags:
+                mask &= self._flags[name] if value else ~self._flags[name]
+            elif name in self._codes:
+                mask &= self.value_mask(name, value)
+            else:
+                raise ValueError(f"Unknown filter: {name}")
+
+        if search:
+            # Free text has no index: scan only what the masks left
+            needle = search.lower()
+            get = getattr(self.bank, "peek", self.bank.__getitem__)
+            for i in np.flatnonzero(mask):
+                if needle not in (get(int(i)).question_text or "").lower():
+                    mask[i] = False
+        return mask
+
+    def positions(self, search: Optional[str] = None, within: Optional[np.ndarray] = None,
+                  **filters) -> List[int]:
+        return np.flatnonzero(self.mask(search, within, **filters)).tolist()
+
+    def count(self, search: Optional[str] = None, within: Optional[np.ndarray] = None,
+              **filters) -> int:
+        return int(np.count_nonzero(self.mask(search, within, **filters)))
+
+    def sample(self, count: int, rng: Optional[np.random.Generator] = None,
+               search: Optional[str] = None, within: Optional[np.ndarray] = None,
+               **filters) -> List[int]:
+        """Up to count distinct positions drawn uniformly from the filtered mask"""
+        rng = rng or np.random.default_rng()
+        candidates = np.flatnonzero(self.mask(search, within, **filters))
+        picked = rng.choice(candidates, size=min(count, len(candidates)), replace=False)
+        return picked.tolist()
@@ -0,0 +1,259 @@
+"""
+Review Scheduler
+Spaced repetition for practice: questions a student got wrong or was
+unsure of become review cards, rescheduled with SM-2 after every answer,
+and the "Review due" mode serves the most overdue cards first.
+
+Each user's cards sit in a min-heap keyed by due time, so fetching the
+next k due cards is O(k log n) whatever the length of their history.
+Rescheduling pushes a new heap entry and leaves the old one to be skipped
+when popped. Every change is appended to the user's JSONL log as the
+card's new state, and loading replays the log; the log is rewritten with
+one line per card once it is mostly superseded entries.
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from engine.analysis_engine import QuestionResult
+from config.settings import REVIEWS_DIR, REVIEW_CONFIG, ReviewConfig
+
+logger = logging.getLogger(__name__)
+
+
+DAY_SECONDS = 24 * 60 * 60
+
+# SM-2 answer quality (0-5); below 3 is a lapse
+QUALITY_WRONG = 1
+QUALITY_SKIPPED = 2
+QUALITY_UNSURE = 3
+QUALITY_CORRECT = 5
+
+
+@dataclass
+class ReviewCard:
+    """SM-2 state of one question for one user"""
+    question_id: str
+    ease: float = REVIEW_CONFIG.initial_ease
+    interval: float = 0.0  # days
+    repetitions: int = 0
+    lapses: int = 0
+    due: float = 0.0  # unix time
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ReviewCard":
+        return cls(**data)
+
+
+def grade(result: QuestionResult, config: ReviewConfig = REVIEW_CONFIG) -> int:
+    """SM-2 quality of an answer: wrong, skipped, unsure (marked or slow) or correct"""
+    if not result.is_attempted:
+        return QUALITY_SKIPPED
+    if not result.is_correct:
+        return QUALITY_WRONG
+    if result.marked_for_review or result.time_spent > config.slow_answer_seconds:
+        return QUALITY_UNSURE
+    return QUALITY_CORRECT
+
+
+def review(card: ReviewCard, quality: int, now: float, config: ReviewConfig = REVIEW_CONFIG):
+    """Apply one SM-2 review to card"""
+    if quality < 3:
+        card.repetitions = 0
+        card.lapses += 1
+        card.interval = config.first_interval
+    else:
+        card.repetitions += 1
+        if card.repetitions == 1:
+            card.interval = config.first_interval
+        elif card.repetitions == 2:
+            card.interval = config.second_interval
+        else:
+            card.interval = round(card.interval * card.ease, 2)
+    card.ease = max(config.min_ease, card.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    card.due = now + card.interval * DAY_SECONDS
+
+
+class ReviewQueue:
+    """One user's review cards, a due-time heap over them and their log"""
+
+    def __init__(self, path: Path, config: ReviewConfig = REVIEW_CONFIG):
+        self.path = path
+        self.config = config
+        self.cards: Dict[str, ReviewCard] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._log_lines = 0
+        self._signature = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @property
+    def is_stale(self) -> bool:
+        """Whether another process has written the log since this queue did"""
+        return self._file_signature() != self._signature
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        card = ReviewCard.from_dict(json.loads(line))
+                    except (ValueError, TypeError):
+                        # Torn final write from a crash; nothing after it was acknowledged
+                        logger.warning(f"Ignoring truncated review entry in {self.path}")
+                        break
+                    self.cards[card.question_id] = card
+                    self._log_lines += 1
+        except OSError as e:
+            logger.error(f"Failed to read review log {self.path}: {e}")
+        self._signature = self._file_signature()
+        self._heap = [(card.due, q_id) for q_id, card in self.cards.items()]
+        heapq.heapify(self._heap)
+
+    def _append(self, cards: List[ReviewCard]) -> bool:
+        """Durably append the new state of cards"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for card in cards:
+                    f.write(json.dumps(card.to_dict()) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            logger.error(f"Failed to append to review log {self.path}: {e}")
+            return False
+        self._log_lines += len(cards)
+        self._signature = self._file_signature()
+        return True
+
+    def _compact(self):
+        """Rewrite the log with one line per card"""
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for card in self.cards.values():
+                    f.write(json.dumps(card.to_dict()) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to compact review log {self.path}: {e}")
+            return
+        self._log_lines = len(self.cards)
+        self._signature = self._file_signature()
+
+    def schedule(self, results: Iterable[QuestionResult], now: Optional[float] = None) -> int:
+        """
+        Review the answers of one session. Wrong, skipped and unsure answers
+        get a card if they had none; answers to existing cards move them on.
+        Returns how many cards changed.
+        """
+        now = time.time() if now is None else now
+        changed = []
+        with self._lock:
+            for result in results:
+                quality = grade(result, self.config)
+                card = self.cards.get(result.question_id)
+                if card is None:
+                    if quality >= QUALITY_CORRECT:
+                        continue
+                    card = self.cards[result.question_id] = ReviewCard(
+                        result.question_id, ease=self.config.initial_ease)
+                review(card, quality, now, self.config)
+                heapq.heappush(self._heap, (card.due, card.question_id))
+                changed.append(card)
+
+            if changed and self._append(changed) and self._log_lines > 4 * len(self.cards) + 100:
+                self._compact()
+            if len(self._heap) > 2 * len(self.cards) + 64:
+                self._heap = [(card.due, q_id) for q_id, card in self.cards.items()]
+                heapq.heapify(self._heap)
+        return len(changed)
+
+    def due(self, k: int, now: Optional[float] = None) -> List[str]:
+        """Question ids of up to k due cards, most overdue first"""
+        now = time.time() if now is None else now
+        picked: List[Tuple[float, str]] = []
+        picked_ids = set()
+        with self._lock:
+            while self._heap and len(picked) < k and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                card = self.cards.get(entry[1])
+                if card is not None and card.due == entry[0] and entry[1] not in picked_ids:
+                    picked.append(entry)
+                    picked_ids.add(entry[1])
+            # Still due until answered: put them back
+            for entry in picked:
+                heapq.heappush(self._heap, entry)
+        return [q_id for _, q_id in picked]
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the earliest card"""
+        with self._lock:
+            while self._heap:
+                due, q_id = self._heap[0]
+                card = self.cards.get(q_id)
+                if card is not None and card.due == due:
+                    return due
+                heapq.heappop(self._heap)
+        return None
+
+
+class ReviewScheduler:
+    """Review queues per user, one <user_id>.jsonl log each under root"""
+
+    def __init__(self, root: Path = REVIEWS_DIR, config: ReviewConfig = REVIEW_CONFIG):
+        self.root = root
+        self.config = config
+        self._queues: Dict[str, ReviewQueue] = {}
+        self._lock = threading.Lock()
+
+    def queue(self, user_id: str) -> ReviewQueue:
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if queue is None or queue.is_stale:
+                queue = self._queues[user_id] = ReviewQueue(self.root / f"{user_id}.jsonl", self.config)
+            return queue
+
+    def schedule(self, user_id: str, results: Iterable[QuestionResult],
+                 now: Optional[float] = None) -> int:
+        return self.queue(user_id).schedule(results, now)
+
+    def due(self, user_id: str, k: int = REVIEW_CONFIG.session_size,
+            now: Optional[float] = None) -> List[str]:
+        return self.queue(user_id).due(k, now)
+
+
+_REVIEW_SCHEDULER: Optional[ReviewScheduler] = None
+
+
+def get_review_scheduler() -> ReviewScheduler:
+    """Process-wide review scheduler"""
+    global _REVIEW_SCHEDULER
+    if _REVIEW_SCHEDULER is None:
+        _REVIEW_SCHEDULER = ReviewScheduler()
+    return _REVIEW_SCHEDULER
@@ -0,0 +1,102 @@
+"""
+Session Journal
+Autosave for exam sessions. The session document is written in full only
+at checkpoints; in between, every answer, mark, navigation and timing
+tick is a one-line append to <session_id>.journal.jsonl. Loading a
+session reads its last checkpoint and replays the journal on top.
+
+The journal's first line names the checkpoint it extends. A crash after
+a checkpoint was written but before the journal was reset leaves a
+journal for the previous checkpoint, whose events the new checkpoint
+already holds, so it is ignored.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionJournal:
+    """Append-only event log of one session since its last checkpoint"""
+
+    def __init__(self, path: Path, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync  # flush to disk on every append, not just to the OS
+        self.events = 0  # appended since the last checkpoint
+        self._file = None
+
+    def reset(self, checkpoint: int):
+        """Start an empty journal on top of checkpoint number checkpoint"""
+        self.close()
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"e": "base", "checkpoint": checkpoint}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to reset session journal {self.path}: {e}")
+        self.events = 0
+
+    def append(self, event: Dict) -> bool:
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(event, separators=(",", ":")) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            logger.error(f"Failed to append to session journal {self.path}: {e}")
+            return False
+        self.events += 1
+        return True
+
+    def read(self, checkpoint: int) -> List[Dict]:
+        """Events written on top of checkpoint number checkpoint"""
+        events = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("checkpoint") != checkpoint:
+                    return []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # Torn final write from a crash
+                        logger.warning(f"Ignoring truncated entry in {self.path}")
+                        break
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read session journal {self.path}: {e}")
+            return []
+        self.events = len(events)
+        return events
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Drop the journal once the session is saved in full for good"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to remove session journal {self.path}: {e}")
+
+
+def journal_path(sessions_dir: Path, session_id: str) -> Path:
+    return sessions_dir / f"{session_id}.journal.jsonl"
@@ -30,7 +30,7 @@ def cmd_process(args):
     """Process PDFs and build question bank"""
     from core.pdf_parser import UniversalPDFParser
     from core.question_cleaner import QuestionCleaner
-    from storage.json_storage import QuestionStorage
+    from storage.backends import get_question_storage
     
     print("="*60)
     print("FMGE Practice Engine - Universal PDF Processor")
@@ -40,8 +40,12 @@ def cmd_process(args):
         extract_images=not args.no_images,
         save_images=True
     )
-    cleaner = QuestionCleaner()
-    storage = QuestionStorage()
+    storage = get_question_storage()
+    
+    # When appending, seed the cleaner with the bank's persisted hashes so
+    # questions from earlier runs are caught as duplicates too
+    known_hashes = storage.load_hash_index()[1] if args.append else None
+    cleaner = QuestionCleaner(known_hashes=known_hashes)
     
     input_dir = Path(args.input_dir) if args.input_dir else Path("data/raw_pdfs")
     
@@ -59,12 +63,17 @@ def cmd_process(args):
         return
     
     print(f"\n🧹 Cleaning {len(raw_questions)} questions...")
-    clean_questions = cleaner.clean_questions(raw_questions)
+    clean_questions = cleaner.clean_questions(raw_questions, workers=args.workers)
     
     print(f"\n📊 Cleaning Statistics:")
     for key, value in cleaner.get_stats().items():
         print(f"   {key}: {value}")
     
+    rule_stats = cleaner.get_rule_stats()
+    print(f"\n🧪 Cleaning Rules ({rule_stats['scans']} scans, {rule_stats['combined_scan_ms']} ms):")
+    for name, data in rule_stats['rules'].items():
+        print(f"   {name}: {data['hits']} hits, ~{data['avg_cost_us']} µs/scan")
+    
     if args.append:
         added = storage.add_questions(clean_questions)
         print(f"\n✅ Added {added} new questions")
@@ -80,9 +89,9 @@ def cmd_process(args):
 
 def cmd_stats(args):
     """Show question bank statistics"""
-    from storage.json_storage import QuestionStorage
+    from storage.backends import get_question_storage
     
-    storage = QuestionStorage()
+    storage = get_question_storage()
     stats = storage.get_stats()
     
     print("\n📊 QUESTION BANK STATISTICS")
@@ -93,32 +102,32 @@ def cmd_stats(args):
             print(f"\n📚 By Subject:")
             for subject, count in list(value.items())[:20]:
                 print(f"   {subject}: {count}")
+        elif key == 'by_source':
+            print(f"\n📁 By Source:")
+            for source, count in sorted(value.items(), key=lambda x: -x[1]):
+                print(f"   {source}: {count}")
         else:
             print(f"   {key}: {value}")
 
 
 def cmd_view(args):
     """View questions with image status"""
-    from storage.json_storage import QuestionStorage
+    from storage.backends import get_question_storage
     
-    storage = QuestionStorage()
-    questions = storage.load_questions()
-    
-    # Categorize questions
-    with_images = [q for q in questions if q.images]
-    needs_images = [q for q in questions if q.has_image_reference and not q.images]
-    no_image_ref = [q for q in questions if not q.has_image_reference]
+    storage = get_question_storage()
     
+    # Counts come from the snapshot/index; only displayed questions are loaded
     print(f"\n📋 QUESTION ANALYSIS")
     print("="*50)
-    print(f"Total questions: {len(questions)}")
-    print(f"✅ With linked images: {len(with_images)}")
-    print(f"⚠️  Need image linking: {len(needs_images)}")
-    print(f"📝 No image reference: {len(no_image_ref)}")
+    print(f"Total questions: {storage.count_questions()}")
+    print(f"✅ With linked images: {storage.count_questions(has_images=True)}")
+    print(f"⚠️  Need image linking: {storage.count_questions(has_image_reference=True, has_images=False)}")
+    print(f"📝 No image reference: {storage.count_questions(has_image_reference=False)}")
     
     if args.show_linked:
+        with_images = storage.query_questions(limit=5, has_images=True)
         print(f"\n✅ Questions WITH linked images:")
-        for i, q in enumerate(with_images[:5]):
+        for i, q in enumerate(with_images):
             print(f"\n--- Question {i+1} ---")
             print(f"Q: {q.question_text[:100]}...")
             print(f"Page: {q.page_number}")
@@ -126,8 +135,9 @@ def cmd_view(args):
             print(f"Image: {q.images[0][:60]}...")
     
     if args.show_missing:
+        needs_images = storage.query_questions(limit=10, has_image_reference=True, has_images=False)
         print(f"\n⚠️  Questions MISSING images:")
-        for i, q in enumerate(needs_images[:10]):
+        for i, q in enumerate(needs_images):
             print(f"\n--- Question {i+1} ---")
             print(f"Q: {q.question_text[:100]}...")
             print(f"Page: {q.page_number}")
@@ -208,18 +218,254 @@ def cmd_diagnose(args):
 
 def cmd_export(args):
     """Export questions with images to HTML"""
-    from storage.json_storage import QuestionStorage
+    from storage.backends import get_question_storage
     
-    storage = QuestionStorage()
+    storage = get_question_storage()
     output_path = Path(args.output) if args.output else Path("data/questions_with_images.html")
     
     print(f"\n📤 Exporting questions to HTML...")
-    count = storage.export_with_images_html(output_path, limit=args.limit)
+    count = storage.export_with_images_html(
+        output_path, limit=args.limit, per_page=args.per_page, images=args.images
+    )
     
-    print(f"✅ Exported {count} questions to {output_path}")
+    print(f"✅ Exported {count} questions to {output_path} ({(count + args.per_page - 1) // args.per_page} pages)")
     print(f"\n   Open this file in a browser to view!")
 
 
+def cmd_migrate(args):
+    """Copy the question bank between storage backends"""
+    from storage.backends import get_question_storage
+    
+    source_backend = "json" if args.to == "sqlite" else "sqlite"
+    source = get_question_storage(source_backend)
+    target = get_question_storage(args.to)
+    
+    questions = source.load_questions()
+    if not questions:
+        print(f"❌ No questions found in the {source_backend} bank")
+        return
+    
+    print(f"\n🔁 Migrating {len(questions)} questions: {source_backend} → {args.to}")
+    if target.save_questions(questions):
+        print(f"✅ Migrated {len(questions)} questions")
+        print(f"\n   Set FMGE_STORAGE_BACKEND={args.to} to use it")
+    else:
+        print("❌ Migration failed, see log for details")
+
+
+def cmd_externalize_images(args):
+    """Move inline data-URI images out of the bank into the image store"""
+    from storage.backends import get_question_storage
+    
+    storage = get_question_storage()
+    questions = list(storage.load_questions())
+    
+    inline = sum(1 for q in questions for img in q.images if img.startswith("data:"))
+    if not inline:
+        print("✅ No inline images in the question bank")
+        return
+    
+    print(f"\n🖼️  Moving {inline} inline images to the image store...")
+    # Saving rewrites every data: URI as a file reference
+    if storage.save_questions(questions):
+        print(f"✅ Externalised {inline} images")
+    else:
+        print("❌ Failed to save the question bank, see log for details")
+
+
+def cmd_compact(args):
+    """Fold journalled edits into the question bank"""
+    from storage.backends import get_question_storage
+    
+    storage = get_question_storage()
+    
+    print("\n🗜️  Compacting question bank...")
+    if storage.compact():
+        print(f"✅ Compacted {storage.count_questions()} questions")
+    else:
+        print("❌ Compaction failed, see log for details")
+
+
+def cmd_restore(args):
+    """Restore the question bank from a backup"""
+    from storage.backends import get_question_storage
+    
+    storage = get_question_storage()
+    backups = storage.list_backups()
+    
+    if not args.timestamp:
+        print(f"\n🗄️  BACKUPS ({len(backups)})")
+        print("="*50)
+        for timestamp in backups:
+            print(f"   {timestamp}")
+        if backups:
+            print(f"\nRun: python main.py restore <timestamp>")
+        return
+    
+    if args.timestamp not in backups:
+        print(f"❌ No backup named {args.timestamp}")
+        return
+    
+    print(f"\n♻️  Restoring backup {args.timestamp}...")
+    if storage.restore_backup(args.timestamp):
+        print(f"✅ Restored {storage.count_questions()} questions")
+    else:
+        print("❌ Restore failed, see log for details")
+
+
+def cmd_footprint(args):
+    """Compare the memory held per question by ParsedQuestion objects and a QuestionTable"""
+    from storage.question_table import measure_footprint
+    
+    print(f"\n📏 Measuring a synthetic bank of {args.count} questions...")
+    result = measure_footprint(args.count, seed=args.seed)
+    
+    print("="*50)
+    print(f"   ParsedQuestion list: {result['objects_per_question']:,.0f} bytes/question")
+    print(f"   QuestionTable:       {result['table_per_question']:,.0f} bytes/question")
+    print(f"   Saving:              {result['saving']*100:.1f}%")
+
+
+def cmd_publish_bank(args):
+    """Publish the bank as a shared snapshot for all server processes to map"""
+    from storage.published_bank import publish_bank, publish_on_change
+    from config.settings import PUBLISHED_BANK_FILE
+    
+    if args.watch:
+        print(f"\n📡 Publishing to {PUBLISHED_BANK_FILE} on every change (Ctrl+C to stop)...")
+        try:
+            publish_on_change(interval=args.interval)
+        except KeyboardInterrupt:
+            print("\n⏹️  Stopped publishing")
+        return
+    
+    count = publish_bank()
+    if count is None:
+        print("❌ Publishing failed, see log for details")
+    else:
+        print(f"✅ Published {count} questions to {PUBLISHED_BANK_FILE}")
+
+
+def cmd_rollover_mock(args):
+    """Build the next daily mock paper ahead of time and warm its images"""
+    from datetime import date
+    from engine.mock_papers import rollover
+    from storage.shared_bank import get_shared_bank
+    
+    day = date.fromisoformat(args.date) if args.date else None
+    index = get_shared_bank().index()
+    if not len(index.bank):
+        print("❌ No questions in the bank")
+        return
+    
+    result = rollover(index, day)
+    status = "Built" if result["built"] else "Already built:"
+    print(f"✅ {status} {result['mock_id']} ({result['questions']} questions)")
+    print(f"   🖼️  Warmed {result['images_warmed']} images")
+
+
+def cmd_build_mocks(args):
+    """Build a season of daily mock papers with no repeats inside the window"""
+    from datetime import date, timedelta
+    from engine.mock_pool import build_pool
+    from storage.shared_bank import get_shared_bank
+    
+    start = date.fromisoformat(args.start) if args.start else date.today() + timedelta(days=1)
+    index = get_shared_bank().index()
+    print(f"\n🗓️  Building {args.count} mock papers from {start} "
+          f"(no repeats within {args.window} days)...")
+    try:
+        manifest = build_pool(index, start, args.count, window=args.window,
+                              workers=args.workers, seed=args.seed)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    print("="*50)
+    print(f"✅ Built {manifest['papers']} papers in {manifest['build_seconds']}s")
+    print(f"   No-repeat window: {manifest['window']} days")
+    print(f"   Distinct questions used: {manifest['distinct_questions']}")
+    if manifest["topped_up"]:
+        print(f"   ⚠️  {manifest['topped_up']} questions topped up outside the blueprint")
+
+
+def cmd_fit_irt(args):
+    """Fit IRT difficulty/discrimination per question and ability per user"""
+    from engine.irt import fit_bank
+    from storage.shared_bank import get_shared_bank
+    from config.settings import IRT_PARAMS_FILE
+    
+    index = get_shared_bank().index()
+    print(f"\n📐 Fitting a {args.model.upper()} model to recorded answers...")
+    params = fit_bank(index, model=args.model, iterations=args.iterations)
+    
+    if not params.info["responses"]:
+        print("❌ No answers recorded yet")
+        return
+    print("="*50)
+    print(f"✅ {params.info['responses']} answers from {len(params.respondents)} respondents")
+    print(f"   Questions fitted: {len(params.item_ids)}")
+    print(f"   Difficulty range: {params.difficulty.min():.2f} to {params.difficulty.max():.2f}")
+    if args.model == "2pl":
+        print(f"   Discrimination range: {params.discrimination.min():.2f} to {params.discrimination.max():.2f}")
+    print(f"   Saved to {IRT_PARAMS_FILE}")
+
+
+def cmd_compact_sessions(args):
+    """Rewrite exam sessions saved with question text as id-only payloads"""
+    import json
+    import os
+    from engine.exposure import bank_ids
+    from storage.attempt_payload import compact_session, is_compact
+    from storage.json_storage import MockExamStorage
+    from storage.shared_bank import get_shared_bank
+    from config.settings import SESSIONS_DIR
+    
+    bank_key = bank_ids(get_shared_bank().index())[0]
+    
+    print("\n🗜️  Compacting saved sessions...")
+    compacted = skipped = 0
+    saved_bytes = 0
+    for path in sorted(SESSIONS_DIR.glob("*.json")):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️ {path.name}: {e}")
+            skipped += 1
+            continue
+        if is_compact(data) or "questions" not in data:
+            continue
+        data = compact_session(data, bank_key)
+        
+        before = path.stat().st_size
+        if not args.dry_run:
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, path)
+        saved_bytes += before - len(json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        compacted += 1
+    
+    # Old mock attempts never recorded their paper: their answers are by
+    # slot only, so they are kept exactly as they are
+    old_mocks = 0
+    for path in MockExamStorage().attempt_paths():
+        try:
+            with open(path, encoding="utf-8") as f:
+                old_mocks += not is_compact(json.load(f))
+        except (OSError, ValueError):
+            continue
+    
+    print("="*50)
+    print(f"✅ {'Would compact' if args.dry_run else 'Compacted'} {compacted} sessions")
+    print(f"   Saved: {saved_bytes / 1024:.1f} KB")
+    if skipped:
+        print(f"   Skipped: {skipped}")
+    if old_mocks:
+        print(f"   Mock attempts left as saved (paper not recorded): {old_mocks}")
+
+
 def cmd_serve(args):
     """Start web interface"""
     import subprocess
@@ -250,6 +496,7 @@ def main():
     process_parser.add_argument('--input-dir', '-i', help='PDF directory')
     process_parser.add_argument('--append', action='store_true', help='Append to existing')
     process_parser.add_argument('--no-images', action='store_true', help='Skip image extraction')
+    process_parser.add_argument('--workers', '-w', type=int, default=1, help='Parallel cleaning processes')
     process_parser.set_defaults(func=cmd_process)
     
     # Stats command
@@ -270,9 +517,73 @@ def main():
     # Export command
     export_parser = subparsers.add_parser('export', help='Export to HTML')
     export_parser.add_argument('--output', '-o', help='Output file path')
-    export_parser.add_argument('--limit', '-l', type=int, default=100, help='Max questions')
+    export_parser.add_argument('--limit', '-l', type=int, default=100, help='Max questions (0 for all)')
+    export_parser.add_argument('--per-page', type=int, default=100, help='Questions per HTML page')
+    export_parser.add_argument('--images', choices=['inline', 'link'], default='inline',
+                               help='Inline each image once per page, or link to the image files')
     export_parser.set_defaults(func=cmd_export)
     
+    # Migrate command
+    migrate_parser = subparsers.add_parser('migrate', help='Move the question bank between backends')
+    migrate_parser.add_argument('--to', choices=['json', 'sqlite'], required=True, help='Target backend')
+    migrate_parser.set_defaults(func=cmd_migrate)
+    
+    # Externalize images command
+    externalize_parser = subparsers.add_parser('externalize-images',
+                                               help='Move inline data-URI images into the image store')
+    externalize_parser.set_defaults(func=cmd_externalize_images)
+    
+    # Compact command
+    compact_parser = subparsers.add_parser('compact', help='Fold the question journal into the bank')
+    compact_parser.set_defaults(func=cmd_compact)
+    
+    # Restore command
+    restore_parser = subparsers.add_parser('restore', help='Restore the question bank from a backup')
+    restore_parser.add_argument('timestamp', nargs='?', help='Backup to restore (omit to list backups)')
+    restore_parser.set_defaults(func=cmd_restore)
+    
+    # Footprint command
+    footprint_parser = subparsers.add_parser('footprint', help='Measure in-memory bytes per question')
+    footprint_parser.add_argument('--count', '-n', type=int, default=100_000, help='Synthetic questions')
+    footprint_parser.add_argument('--seed', type=int, default=0)
+    footprint_parser.set_defaults(func=cmd_footprint)
+    
+    # Publish bank command
+    publish_parser = subparsers.add_parser('publish-bank',
+                                           help='Publish the bank for all server processes to share')
+    publish_parser.add_argument('--watch', action='store_true', help='Republish whenever the bank changes')
+    publish_parser.add_argument('--interval', type=float, default=2.0, help='Seconds between checks with --watch')
+    publish_parser.set_defaults(func=cmd_publish_bank)
+    
+    # Rollover mock command
+    rollover_parser = subparsers.add_parser('rollover-mock',
+                                            help="Pre-build tomorrow's mock paper and warm its images")
+    rollover_parser.add_argument('--date', help='Day to build (YYYY-MM-DD, default tomorrow)')
+    rollover_parser.set_defaults(func=cmd_rollover_mock)
+    
+    # Build mocks command
+    build_mocks_parser = subparsers.add_parser('build-mocks', help='Pre-build a pool of daily mock papers')
+    build_mocks_parser.add_argument('--count', '-n', type=int, default=365, help='Papers (one per day)')
+    build_mocks_parser.add_argument('--window', type=int, default=30,
+                                    help='Days within which no question repeats')
+    build_mocks_parser.add_argument('--start', help='First day (YYYY-MM-DD, default tomorrow)')
+    build_mocks_parser.add_argument('--workers', '-w', type=int, default=None,
+                                    help='Parallel processes (default: all cores)')
+    build_mocks_parser.add_argument('--seed', type=int, default=0)
+    build_mocks_parser.set_defaults(func=cmd_build_mocks)
+    
+    # Fit IRT command
+    irt_parser = subparsers.add_parser('fit-irt', help='Fit question difficulty and user ability')
+    irt_parser.add_argument('--model', choices=['1pl', '2pl'], default='2pl')
+    irt_parser.add_argument('--iterations', type=int, default=100)
+    irt_parser.set_defaults(func=cmd_fit_irt)
+    
+    # Compact sessions command
+    compact_sessions_parser = subparsers.add_parser(
+        'compact-sessions', help='Convert saved exam sessions to id-only payloads')
+    compact_sessions_parser.add_argument('--dry-run', action='store_true')
+    compact_sessions_parser.set_defaults(func=cmd_compact_sessions)
+    
     # Serve command
     serve_parser = subparsers.add_parser('serve', help='Start web UI')
     serve_parser.add_argument('--port', type=int, default=8501)
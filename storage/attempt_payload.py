@@ -0,0 +1,78 @@
+"""
+Attempt Payloads
+Compact on-disk form of exam sessions and mock attempts. Question text,
+options and images already live in the bank, so a payload holds only
+what the student did, keyed by question id:
+
+    {"format": 2, "bank": "<bank key>", "question_ids": [...],
+     "answers": "AC-b?D...", "time_spent": [12, 40, ...], ...}
+
+answers has one character per question: the option letter, in lower case
+when the question is also marked for review, "?" for marked without an
+answer and "-" for neither. Readers rehydrate the questions from the bank
+by id; "bank" records which bank version the ids were drawn from.
+
+Format 1 exam sessions (a full question dict per question) are still
+read, and compact_session() converts them. Format 1 mock attempts (a
+"raw" answers dict by slot) never recorded which paper was sat, so they
+are kept as they are and cannot be rehydrated.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+FORMAT = 2
+UNANSWERED = "-"
+MARKED = "?"
+
+
+def encode_answers(answers: Sequence[Optional[str]], marked: Optional[Sequence[bool]] = None) -> str:
+    if marked is None:
+        return "".join(a or UNANSWERED for a in answers)
+    return "".join(
+        (a.lower() if m else a) if a else (MARKED if m else UNANSWERED)
+        for a, m in zip(answers, marked)
+    )
+
+
+def decode_answers(encoded: str) -> List[Optional[str]]:
+    return [None if a in (UNANSWERED, MARKED) else a.upper() for a in encoded]
+
+
+def decode_marks(encoded: str) -> List[bool]:
+    return [a == MARKED or a.islower() for a in encoded]
+
+
+def is_compact(data: Dict) -> bool:
+    return data.get("format") == FORMAT
+
+
+def question_count(data: Dict) -> int:
+    if is_compact(data):
+        return len(data["question_ids"])
+    return len(data.get("questions", []))
+
+
+def session_answers(data: Dict) -> List[Tuple[str, Optional[str]]]:
+    """(question id, selected answer) per question of a session in either format"""
+    if is_compact(data):
+        return list(zip(data["question_ids"], decode_answers(data["answers"])))
+    return [(q.get("question_id"), q.get("selected_answer")) for q in data.get("questions", [])]
+
+
+def compact_session(data: Dict, bank_key: Optional[str] = None) -> Dict:
+    """A format 1 exam session as a format 2 payload; compact ones unchanged"""
+    if is_compact(data):
+        return data
+    questions = data.get("questions", [])
+    compact = {k: v for k, v in data.items() if k != "questions"}
+    compact.update(
+        format=FORMAT,
+        bank=bank_key,
+        question_ids=[q["question_id"] for q in questions],
+        answers=encode_answers(
+            [q.get("selected_answer") for q in questions],
+            [q.get("status") in ("marked_for_review", "answered_and_marked") for q in questions],
+        ),
+        time_spent=[q.get("time_spent", 0) for q in questions],
+    )
+    return compact
@@ -0,0 +1,23 @@
+"""Question bank backend selection"""
+
+from typing import Optional
+
+from config.settings import STORAGE_BACKEND
+
+
+BACKENDS = ("json", "sqlite")
+
+
+def get_question_storage(backend: Optional[str] = None):
+    """Return the QuestionStorage implementation for a backend name"""
+    backend = backend or STORAGE_BACKEND
+
+    if backend == "sqlite":
+        from storage.sqlite_storage import SQLiteQuestionStorage
+        return SQLiteQuestionStorage()
+
+    if backend == "json":
+        from storage.json_storage import QuestionStorage
+        return QuestionStorage()
+
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {BACKENDS})")
@@ -0,0 +1,245 @@
+"""
+Backup Store
+Content-addressed, deduplicated backups of the question bank files.
+
+Files are cut into content-defined chunks at line boundaries: a chunk ends
+after a line whose CRC32 has its low bits clear, so an edit only changes the
+chunks around it and everything else is shared with earlier backups. Each
+chunk is stored once, compressed; a backup is a small JSON manifest listing
+the chunks of every file.
+"""
+
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Iterator, Optional, Set
+import logging
+
+from config.settings import DATA_DIR, BACKUP_CONFIG, BackupConfig
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def iter_chunks(data: bytes, config: BackupConfig = BACKUP_CONFIG) -> Iterator[bytes]:
+    """Split data into content-defined chunks ending on line boundaries"""
+    mask = (1 << config.boundary_bits) - 1
+    start = 0
+    pos = 0
+    size = len(data)
+
+    while pos < size:
+        end = data.find(b"\n", pos)
+        end = size if end == -1 else end + 1
+
+        # Overlong lines are cut at max size so binary files still chunk
+        if end - start > config.max_chunk_size:
+            end = start + config.max_chunk_size
+            yield data[start:end]
+            start = pos = end
+            continue
+
+        line_crc = zlib.crc32(data[pos:end])
+        pos = end
+        if end - start >= config.min_chunk_size and line_crc & mask == 0:
+            yield data[start:end]
+            start = end
+
+    if start < size:
+        yield data[start:]
+
+
+class BackupStore:
+    """
+    Chunk store plus manifests under data/backups.
+    Manifests name files relative to the directory they were backed up from.
+    """
+
+    def __init__(self, root: Path = DATA_DIR / "backups", config: BackupConfig = BACKUP_CONFIG):
+        self.root = root
+        self.config = config
+        self.chunk_dir = root / "chunks"
+        self.manifest_dir = root / "manifests"
+        self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+
+    # ----- chunks -----
+
+    def _chunk_paths(self, digest: str) -> List[Path]:
+        folder = self.chunk_dir / digest[:2]
+        return [folder / f"{digest}.zst", folder / f"{digest}.z"]
+
+    def _put_chunk(self, digest: str, chunk: bytes) -> Optional[int]:
+        """Store a chunk unless present; returns bytes written (None if it existed)"""
+        zst_path, z_path = self._chunk_paths(digest)
+        if zst_path.exists() or z_path.exists():
+            return None
+
+        if zstandard is not None:
+            path, blob = zst_path, zstandard.ZstdCompressor(level=10).compress(chunk)
+        else:
+            path, blob = z_path, zlib.compress(chunk, 9)
+
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        return len(blob)
+
+    def _get_chunk(self, digest: str) -> bytes:
+        zst_path, z_path = self._chunk_paths(digest)
+        if z_path.exists():
+            return zlib.decompress(z_path.read_bytes())
+        if zst_path.exists():
+            if zstandard is None:
+                raise RuntimeError(f"Chunk {digest} is zstd-compressed; install zstandard to restore it")
+            return zstandard.ZstdDecompressor().decompress(zst_path.read_bytes())
+        raise FileNotFoundError(f"Backup chunk missing: {digest}")
+
+    # ----- backups -----
+
+    def create_backup(self, files: List[Path], base_dir: Path) -> Optional[str]:
+        """Back up files (paths under base_dir); returns the backup timestamp"""
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        suffix = 1
+        while (self.manifest_dir / f"{timestamp}.json").exists():
+            timestamp = f"{datetime.now().strftime(TIMESTAMP_FORMAT)}_{suffix}"
+            suffix += 1
+
+        entries = []
+        new_chunks = 0
+        written = 0
+        for path in files:
+            if not path.exists():
+                continue
+            data = path.read_bytes()
+            digests = []
+            for chunk in iter_chunks(data, self.config):
+                digest = hashlib.sha256(chunk).hexdigest()
+                stored = self._put_chunk(digest, chunk)
+                if stored is not None:
+                    new_chunks += 1
+                    written += stored
+                digests.append(digest)
+            entries.append({
+                "name": path.relative_to(base_dir).as_posix(),
+                "size": len(data),
+                "mtime_ns": path.stat().st_mtime_ns,
+                "chunks": digests,
+            })
+
+        if not entries:
+            return None
+
+        manifest = {
+            "created_at": datetime.now().isoformat(),
+            "files": entries,
+        }
+        tmp_path = self.manifest_dir / f"{timestamp}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_dir / f"{timestamp}.json")
+
+        logger.info(f"Created backup {timestamp}: {new_chunks} new chunks, {written} bytes written")
+        self.apply_retention()
+        return timestamp
+
+    def list_backups(self, name: Optional[str] = None) -> List[str]:
+        """Backup timestamps, newest first; only those containing file name if given"""
+        timestamps = sorted((p.stem for p in self.manifest_dir.glob("*.json")), reverse=True)
+        if name is None:
+            return timestamps
+        return [
+            ts for ts in timestamps
+            if any(entry["name"] == name for entry in self.load_manifest(ts)["files"])
+        ]
+
+    def load_manifest(self, timestamp: str) -> Dict:
+        path = self.manifest_dir / f"{timestamp}.json"
+        if not path.exists():
+            raise FileNotFoundError(f"No backup named {timestamp}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def restore(self, timestamp: str, base_dir: Path) -> List[Path]:
+        """Write a backup's files back under base_dir with their original mtimes"""
+        manifest = self.load_manifest(timestamp)
+        restored = []
+
+        for entry in manifest["files"]:
+            data = b"".join(self._get_chunk(d) for d in entry["chunks"])
+            if len(data) != entry["size"]:
+                raise ValueError(f"Backup {timestamp} is corrupt: {entry['name']} has the wrong size")
+
+            target = base_dir / entry["name"]
+            tmp_path = target.with_name(target.name + ".restore")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # Journals bind to the bank's mtime, so keep the original one
+            os.utime(tmp_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            os.replace(tmp_path, target)
+            restored.append(target)
+
+        logger.info(f"Restored backup {timestamp} ({len(restored)} files)")
+        return restored
+
+    # ----- retention -----
+
+    def _kept(self, timestamps: List[str]) -> Set[str]:
+        """Newest N backups, plus the newest in each of the last hours, days and weeks"""
+        config = self.config
+        keep = set(timestamps[:config.keep_last])
+
+        buckets = [
+            (config.keep_hourly, lambda t: t.strftime("%Y%m%d%H")),
+            (config.keep_daily, lambda t: t.strftime("%Y%m%d")),
+            (config.keep_weekly, lambda t: "%d-%02d" % t.isocalendar()[:2]),
+        ]
+        for limit, bucket_of in buckets:
+            seen = set()
+            for ts in timestamps:
+                bucket = bucket_of(datetime.strptime(ts[:15], TIMESTAMP_FORMAT))
+                if bucket in seen:
+                    continue
+                if len(seen) >= limit:
+                    break
+                seen.add(bucket)
+                keep.add(ts)
+
+        return keep
+
+    def apply_retention(self):
+        """Drop manifests outside the retention policy, then unreferenced chunks"""
+        timestamps = self.list_backups()
+        keep = self._kept(timestamps)
+        for ts in timestamps:
+            if ts not in keep:
+                (self.manifest_dir / f"{ts}.json").unlink()
+        self.collect_garbage()
+
+    def collect_garbage(self) -> int:
+        """Delete chunks no manifest references; returns how many were removed"""
+        referenced = set()
+        for ts in self.list_backups():
+            for entry in self.load_manifest(ts)["files"]:
+                referenced.update(entry["chunks"])
+
+        removed = 0
+        for path in self.chunk_dir.glob("*/*"):
+            if path.suffix in (".z", ".zst") and path.stem not in referenced:
+                path.unlink()
+                removed += 1
+        return removed
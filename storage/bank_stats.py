@@ -0,0 +1,129 @@
+"""
+Bank Statistics Sidecar
+Aggregate counts for the question bank, kept next to it in a small JSON file
+so the CLI and UI can show statistics without loading any questions.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import logging
+
+from core.pdf_parser import ParsedQuestion
+
+logger = logging.getLogger(__name__)
+
+
+STATS_VERSION = 1
+
+COUNTERS = ("total", "with_answers", "with_explanations", "with_images", "needs_review")
+
+
+def empty_counters() -> Dict:
+    counters = {name: 0 for name in COUNTERS}
+    counters["by_subject"] = {}
+    counters["by_source"] = {}
+    return counters
+
+
+def _bump(counts: Dict, key: str, step: int):
+    counts[key] = counts.get(key, 0) + step
+    if not counts[key]:
+        del counts[key]
+
+
+def _add(counters: Dict, subject, source_file, answer, explanation, images, needs_review,
+         step: int = 1):
+    counters["total"] += step
+    counters["with_answers"] += step * bool(answer)
+    counters["with_explanations"] += step * bool(explanation)
+    counters["with_images"] += step * bool(images)
+    counters["needs_review"] += step * bool(needs_review)
+
+    _bump(counters["by_subject"], subject or "Untagged", step)
+    _bump(counters["by_source"], source_file or "unknown", step)
+
+
+def accumulate_records(counters: Dict, records: Iterable[Dict]) -> Dict:
+    """Add bank records (question dicts as stored in JSON) to counters"""
+    for r in records:
+        _add(counters, r.get("subject"), r.get("source_file"), r.get("correct_answer"),
+             r.get("explanation"), r.get("images"), r.get("needs_review"))
+    return counters
+
+
+def accumulate_questions(counters: Dict, questions: Iterable[ParsedQuestion], step: int = 1) -> Dict:
+    """Add questions to counters without forcing lazily loaded fields"""
+    for q in questions:
+        _add(counters, q.subject, q.source_file, q.correct_answer,
+             q.has_value("explanation"), q.images, q.needs_review, step)
+    return counters
+
+
+def remove_questions(counters: Dict, questions: Iterable[ParsedQuestion]) -> Dict:
+    """Take questions that were counted before back out of counters"""
+    return accumulate_questions(counters, questions, step=-1)
+
+
+def finalise(counters: Dict) -> Dict:
+    """Counters in the shape get_stats() returns"""
+    if not counters.get("total"):
+        return {"total": 0}
+
+    stats = dict(counters)
+    stats["answer_coverage"] = f"{counters['with_answers']/counters['total']*100:.1f}%"
+    return stats
+
+
+class StatsSidecar:
+    """
+    questions.stats.json: counters plus the size and mtime of the bank files
+    they describe. Counters for any other version of the bank are ignored.
+    """
+
+    def __init__(self, path: Path, *sources: Path):
+        self.path = path
+        self.sources = sources
+
+    def _signature(self):
+        signature = []
+        for source in self.sources:
+            if source.exists():
+                st = source.stat()
+                signature.append([st.st_mtime_ns, st.st_size])
+            else:
+                signature.append(None)
+        return signature
+
+    def read_counters(self) -> Optional[Dict]:
+        """Counters for the current bank, or None if missing or stale"""
+        if not self.path.exists() or not self.sources[0].exists():
+            return None
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable stats sidecar {self.path}: {e}")
+            return None
+
+        if data.get("version") != STATS_VERSION or data.get("bank") != self._signature():
+            return None
+        return data["counters"]
+
+    def write(self, counters: Dict) -> bool:
+        """Atomically replace the sidecar; call after the bank file is written"""
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": STATS_VERSION,
+                    "bank": self._signature(),
+                    "counters": counters,
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to write stats sidecar: {e}")
+            return False
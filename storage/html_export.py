@@ -0,0 +1,262 @@
+"""
+HTML Export
+Streams image questions into paginated HTML files plus an index page.
+Only one page of questions (and its images) is held in memory at a time.
+
+Images are either linked as relative files or inlined: each distinct image
+is base64-encoded once per page into a CSS class that every use shares.
+Encoding runs on a thread pool.
+"""
+
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from PIL import Image
+
+from core.pdf_parser import ParsedQuestion
+from storage.image_store import get_image_manifest
+
+logger = logging.getLogger(__name__)
+
+
+IMAGES_LINK = "link"      # <img src="../processed/images/...">
+IMAGES_INLINE = "inline"  # one data URI per distinct image per page, in a CSS class
+IMAGE_MODES = (IMAGES_LINK, IMAGES_INLINE)
+
+PAGE_CSS = """
+        body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; }
+        .question { border: 1px solid #ddd; padding: 20px; margin: 20px 0; border-radius: 8px; }
+        .question-text { font-size: 16px; font-weight: bold; margin-bottom: 15px; }
+        .image-container { text-align: center; margin: 15px 0; }
+        .image-container img { max-width: 100%; max-height: 400px; border: 1px solid #ccc; }
+        .image-container .qimg { display: inline-block; max-width: 100%; max-height: 400px;
+            border: 1px solid #ccc; background: center / contain no-repeat; }
+        .options { margin: 15px 0; }
+        .option { padding: 8px; margin: 5px 0; background: #f5f5f5; border-radius: 4px; }
+        .option.correct { background: #d4edda; border-left: 4px solid #28a745; }
+        .answer { color: #28a745; font-weight: bold; margin-top: 10px; }
+        .explanation { background: #e7f3ff; padding: 10px; border-radius: 4px; margin-top: 10px; }
+        .meta { color: #666; font-size: 12px; margin-top: 10px; }
+        .no-image { color: #dc3545; font-style: italic; }
+        nav { margin: 20px 0; }
+        nav a { margin-right: 15px; }
+"""
+
+
+def _encode(source: str) -> Optional[Tuple[str, Optional[Tuple[int, int]]]]:
+    """(data URI, (width, height)) for an image file or data URI; runs on the pool"""
+    if source.startswith("data:"):
+        uri = source
+        data = base64.b64decode(source.split(",", 1)[1])
+    else:
+        path = Path(source)
+        data = path.read_bytes()
+        ext = path.suffix.lower().lstrip(".")
+        if ext == "jpg":
+            ext = "jpeg"
+        uri = f"data:image/{ext};base64,{base64.b64encode(data).decode()}"
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            size = img.size
+    except Exception:
+        size = None
+    return uri, size
+
+
+class HTMLExporter:
+    """Writes <stem>.html (index) and <stem>_p<N>.html pages next to it"""
+
+    def __init__(self, output_path: Path, per_page: int = 100, images: str = IMAGES_INLINE,
+                 workers: Optional[int] = None):
+        if images not in IMAGE_MODES:
+            raise ValueError(f"Unknown image mode: {images} (expected one of {IMAGE_MODES})")
+        self.output_path = output_path
+        self.per_page = max(per_page, 1)
+        self.images = images
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.manifest = get_image_manifest()
+
+    def page_path(self, number: int) -> Path:
+        return self.output_path.with_name(f"{self.output_path.stem}_p{number}.html")
+
+    def export(self, questions: Iterable[ParsedQuestion], limit: Optional[int] = None) -> int:
+        """Export image-referencing questions; limit None or <= 0 means all"""
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Stale pages of an earlier, longer export; nothing else next to it
+        page_name = re.compile(rf"{re.escape(self.output_path.stem)}_p\d+\.html")
+        for old_page in self.output_path.parent.iterdir():
+            if page_name.fullmatch(old_page.name):
+                old_page.unlink()
+
+        selected: Iterator[ParsedQuestion] = (q for q in questions if q.has_image_reference)
+        if limit and limit > 0:
+            selected = islice(selected, limit)
+
+        pages: List[Tuple[int, int]] = []  # (first question number, count) per page
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            batch = list(islice(selected, self.per_page))
+            while batch:
+                # Read one page ahead so the page knows whether a next one exists
+                next_batch = list(islice(selected, self.per_page))
+                number = len(pages) + 1
+                self._write_page(pool, number, batch, count, has_next=bool(next_batch))
+                pages.append((count + 1, len(batch)))
+                count += len(batch)
+                batch = next_batch
+
+        self._write_index(pages, count)
+        logger.info(f"Exported {count} questions to {self.output_path} ({len(pages)} pages)")
+        return count
+
+    # ----- images -----
+
+    def _image_key(self, img_path: str) -> Optional[str]:
+        """Content key for an image: identical files share one CSS class"""
+        if img_path.startswith("data:"):
+            return hashlib.sha256(img_path.encode()).hexdigest()[:16]
+        digest = self.manifest.digest(img_path)
+        return digest[:16] if digest else None
+
+    def _inline_images(self, pool: ThreadPoolExecutor,
+                       batch: List[ParsedQuestion]) -> Tuple[Dict[str, str], str]:
+        """(image path -> CSS class, stylesheet) for the distinct images of a page"""
+        sources: Dict[str, str] = {}  # key -> path or data URI to encode
+        classes: Dict[str, str] = {}
+        for q in batch:
+            for img_path in q.images:
+                key = self._image_key(img_path)
+                if key is None:
+                    continue
+                classes[img_path] = f"img-{key}"
+                if key not in sources:
+                    sources[key] = img_path if img_path.startswith("data:") else str(self.manifest.resolve(img_path))
+
+        rules = []
+        for key, (uri, size) in zip(sources, pool.map(_encode, sources.values())):
+            sizing = (f"width: {size[0]}px; aspect-ratio: {size[0]} / {size[1]};"
+                      if size else "width: 100%; height: 400px;")
+            rules.append(f'        .img-{key} {{ background-image: url("{uri}"); {sizing} }}')
+        return classes, "\n".join(rules)
+
+    def _image_html(self, img_path: str, classes: Dict[str, str], page_dir: Path) -> Optional[str]:
+        if self.images == IMAGES_INLINE:
+            css_class = classes.get(img_path)
+            if css_class is None:
+                return None
+            return f'<div class="image-container"><div class="qimg {css_class}" role="img" aria-label="Question Image"></div></div>\n'
+
+        if img_path.startswith("data:"):
+            src = img_path
+        else:
+            resolved = self.manifest.resolve(img_path)
+            if resolved is None:
+                return None
+            src = Path(os.path.relpath(resolved, page_dir)).as_posix()
+        return f'<div class="image-container"><img src="{html.escape(src)}" alt="Question Image"></div>\n'
+
+    # ----- pages -----
+
+    def _nav(self, number: int, has_next: bool) -> str:
+        links = [f'<a href="{self.output_path.name}">Index</a>']
+        if number > 1:
+            links.append(f'<a href="{self.page_path(number - 1).name}">&larr; Previous</a>')
+        if has_next:
+            links.append(f'<a href="{self.page_path(number + 1).name}">Next &rarr;</a>')
+        return f'<nav>{" ".join(links)}</nav>\n'
+
+    def _write_page(self, pool: ThreadPoolExecutor, number: int, batch: List[ParsedQuestion],
+                    offset: int, has_next: bool):
+        classes, image_css = ({}, "")
+        if self.images == IMAGES_INLINE:
+            classes, image_css = self._inline_images(pool, batch)
+
+        page_dir = self.output_path.parent
+        with open(self.page_path(number), "w", encoding="utf-8") as f:
+            f.write(f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>FMGE Questions with Images - Page {number}</title>
+    <style>{PAGE_CSS}
+{image_css}
+    </style>
+</head>
+<body>
+    <h1>FMGE Questions with Images - Page {number}</h1>
+""")
+            f.write(self._nav(number, has_next))
+
+            for i, q in enumerate(batch, start=offset + 1):
+                f.write(self._question_html(i, q, classes, page_dir))
+
+            f.write(self._nav(number, has_next))
+            f.write("</body></html>\n")
+
+    def _question_html(self, number: int, q: ParsedQuestion, classes: Dict[str, str],
+                       page_dir: Path) -> str:
+        parts = ['<div class="question">\n',
+                 f'<div class="question-text">Q{number}. {html.escape(q.question_text)}</div>\n']
+
+        if q.images:
+            for img_path in q.images:
+                image = self._image_html(img_path, classes, page_dir)
+                if image:
+                    parts.append(image)
+        else:
+            parts.append('<div class="no-image">⚠️ Image referenced but not found</div>\n')
+
+        parts.append('<div class="options">\n')
+        for opt, text in [('A', q.option_a), ('B', q.option_b), ('C', q.option_c), ('D', q.option_d)]:
+            is_correct = q.correct_answer == opt
+            css_class = "option correct" if is_correct else "option"
+            prefix = "✓ " if is_correct else ""
+            parts.append(f'<div class="{css_class}">{prefix}{opt}. {html.escape(text or "")}</div>\n')
+        parts.append('</div>\n')
+
+        if q.correct_answer:
+            parts.append(f'<div class="answer">Answer: {q.correct_answer}</div>\n')
+
+        if q.explanation:
+            parts.append(f'<div class="explanation"><strong>Explanation:</strong> {html.escape(q.explanation[:500])}...</div>\n')
+
+        parts.append(f'<div class="meta">Source: {html.escape(q.source_file)} | Page: {q.page_number} | Subject: {html.escape(q.subject or "Untagged")}</div>\n')
+        parts.append('</div>\n')
+        return "".join(parts)
+
+    def _write_index(self, pages: List[Tuple[int, int]], count: int):
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            f.write(f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>FMGE Questions with Images</title>
+    <style>{PAGE_CSS}
+    </style>
+</head>
+<body>
+    <h1>FMGE Questions with Images</h1>
+    <p>{count} questions on {len(pages)} pages</p>
+    <ul>
+""")
+            for number, (first, size) in enumerate(pages, start=1):
+                f.write(f'        <li><a href="{self.page_path(number).name}">Page {number}</a>'
+                        f' &mdash; questions {first}&ndash;{first + size - 1}</li>\n')
+            f.write("    </ul>\n</body></html>\n")
+
+
+def export_questions_html(questions: Iterable[ParsedQuestion], output_path: Path,
+                          limit: Optional[int] = 100, per_page: int = 100,
+                          images: str = IMAGES_INLINE) -> int:
+    """Export image-referencing questions to paginated HTML; returns the count"""
+    return HTMLExporter(output_path, per_page=per_page, images=images).export(questions, limit)
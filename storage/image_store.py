@@ -0,0 +1,237 @@
+"""
+Image Manifest
+One os.scandir() of the processed image directory answers every existence
+and metadata check, instead of a stat() per image per load or render.
+The listing is refreshed when the directory's mtime changes, polled at most
+every poll_interval seconds (and immediately on a miss, so freshly
+extracted images are found). Recently used images are also kept as
+encoded data URIs, so every session showing an image shares one copy.
+"""
+
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+import logging
+
+from config.settings import DATA_DIR, IMAGES_DIR
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImageEntry:
+    """Metadata for one image file"""
+    size: int
+    mtime_ns: int
+    digest: Optional[str] = None  # sha256, computed on first request
+
+
+class ImageManifest:
+    """
+    path -> size, mtime, digest for the files in one image directory.
+    Paths may be absolute, relative to DATA_DIR (as stored in the bank) or
+    relative to the working directory, with either slash style.
+    """
+
+    def __init__(self, directory: Path = IMAGES_DIR, base_dir: Path = DATA_DIR,
+                 poll_interval: float = 2.0, uri_cache_size: int = 256):
+        self.directory = Path(os.path.abspath(directory))
+        self.base_dir = base_dir
+        self.poll_interval = poll_interval
+        self.uri_cache_size = uri_cache_size
+
+        self._dir_norm = os.path.normcase(str(self.directory))
+        self._entries: Dict[str, ImageEntry] = {}
+        self._dir_mtime_ns: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> data URI, least recently used first
+        self._uris: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._uri_lock = threading.Lock()
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.poll_interval:
+            return
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                dir_mtime_ns = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                self._entries, self._dir_mtime_ns = {}, None
+                return
+
+            if dir_mtime_ns == self._dir_mtime_ns:
+                return
+
+            entries = {}
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file():
+                        st = entry.stat()
+                        old = self._entries.get(entry.name)
+                        digest = old.digest if old and (old.size, old.mtime_ns) == (st.st_size, st.st_mtime_ns) else None
+                        entries[entry.name] = ImageEntry(st.st_size, st.st_mtime_ns, digest)
+
+            # Swap in whole so concurrent readers never see a partial listing
+            self._entries = entries
+            self._dir_mtime_ns = dir_mtime_ns
+            logger.info(f"Scanned {len(entries)} images in {self.directory}")
+
+    def _key(self, path: Union[str, Path]) -> Optional[str]:
+        """File name if path points into the managed directory, else None"""
+        p = Path(str(path).replace("\\", "/"))
+        candidates = [p] if p.is_absolute() else [self.base_dir / p, Path(os.path.abspath(p))]
+        for candidate in candidates:
+            parent = os.path.normcase(os.path.normpath(str(candidate.parent)))
+            if parent == self._dir_norm:
+                return candidate.name
+        return None
+
+    def stat(self, path: Union[str, Path]) -> Optional[ImageEntry]:
+        """Metadata for an image, or None if it doesn't exist"""
+        key = self._key(path)
+        if key is None:
+            return None
+
+        self._refresh()
+        entry = self._entries.get(key)
+        if entry is None:
+            self._refresh(force=True)
+            entry = self._entries.get(key)
+        return entry
+
+    def resolve(self, path: Union[str, Path]) -> Optional[Path]:
+        """Absolute path of an existing image, or None"""
+        key = self._key(path)
+        if key is None:
+            # Outside the image directory: nothing cached, ask the filesystem
+            p = Path(str(path).replace("\\", "/"))
+            if not p.is_absolute():
+                p = self.base_dir / p
+            return p if p.exists() else None
+        return self.directory / key if self.stat(path) is not None else None
+
+    def exists(self, path: Union[str, Path]) -> bool:
+        return self.resolve(path) is not None
+
+    def to_bank_path(self, path: str) -> str:
+        """Path as stored in the bank: relative to DATA_DIR when the image exists"""
+        resolved = self.resolve(path)
+        if resolved is None:
+            return path
+        try:
+            return str(resolved.relative_to(self.base_dir))
+        except ValueError:
+            return str(resolved)
+
+    def externalise(self, uri: str) -> Optional[Path]:
+        """
+        Write a base64 data: URI into the directory, named by content hash so
+        repeated images are stored once. Returns the file path, or None if
+        the URI isn't a base64 image.
+        """
+        header, _, payload = uri.partition(",")
+        if not header.startswith("data:") or not header.endswith(";base64"):
+            return None
+
+        mime = header[len("data:"):].split(";")[0]
+        ext = mime.split("/")[-1].split("+")[0] or "png"
+        try:
+            data = base64.b64decode(payload, validate=True)
+        except ValueError:
+            logger.warning("Keeping undecodable data URI inline")
+            return None
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.directory / f"inline_{digest[:20]}.{ext}"
+        if self.stat(path) is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            st = path.stat()
+            self._entries[path.name] = ImageEntry(st.st_size, st.st_mtime_ns, digest)
+        return path
+
+    def bank_path(self, image: str) -> str:
+        """
+        Image reference as stored in the bank: relative to DATA_DIR, with
+        inline data URIs written out to the directory first.
+        """
+        if image.startswith("data:"):
+            path = self.externalise(image)
+            return self.to_bank_path(str(path)) if path is not None else image
+        return self.to_bank_path(image)
+
+    def digest(self, path: Union[str, Path]) -> Optional[str]:
+        """sha256 of an image's contents, cached until its size or mtime changes"""
+        entry = self.stat(path)
+        if entry is None:
+            return None
+        if entry.digest is None:
+            with open(self.directory / self._key(path), "rb") as f:
+                entry.digest = hashlib.sha256(f.read()).hexdigest()
+        return entry.digest
+
+    def data_uri(self, path: Union[str, Path]) -> Optional[str]:
+        """base64 data URI of an image, cached until the file changes"""
+        name = self._key(path)
+        if name is not None:
+            # Keyed on the manifest's size and mtime: no stat per render
+            entry = self.stat(path)
+            if entry is None:
+                return None
+            resolved = self.directory / name
+            key = (str(resolved), entry.size, entry.mtime_ns)
+        else:
+            # Outside the image directory the manifest has no metadata
+            resolved = self.resolve(path)
+            if resolved is None:
+                return None
+            st = resolved.stat()
+            key = (str(resolved), st.st_size, st.st_mtime_ns)
+
+        with self._uri_lock:
+            uri = self._uris.get(key)
+            if uri is not None:
+                self._uris.move_to_end(key)
+                return uri
+
+        ext = resolved.suffix.lower().lstrip(".")
+        if ext == "jpg":
+            ext = "jpeg"
+        with open(resolved, "rb") as f:
+            uri = f"data:image/{ext};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+        with self._uri_lock:
+            self._uris[key] = uri
+            while len(self._uris) > self.uri_cache_size:
+                self._uris.popitem(last=False)
+        return uri
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._entries)
+
+
+_MANIFEST: Optional[ImageManifest] = None
+_MANIFEST_LOCK = threading.Lock()
+
+
+def get_image_manifest() -> ImageManifest:
+    """Process-wide manifest of IMAGES_DIR"""
+    global _MANIFEST
+    if _MANIFEST is None:
+        with _MANIFEST_LOCK:
+            if _MANIFEST is None:
+                _MANIFEST = ImageManifest()
+    return _MANIFEST
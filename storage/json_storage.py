@@ -1,108 +1,452 @@
 """JSON Storage Module with Image Support"""
 
 import json
+import os
+import threading
+import zlib
+from bisect import bisect_left
+from functools import partial
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple, Iterable, Sequence
 from datetime import datetime
-import shutil
 import logging
-import base64
+import random
 
-from core.pdf_parser import ParsedQuestion
-from config.settings import DATA_DIR, QUESTIONS_FILE
+from core.pdf_parser import ParsedQuestion, COLD_FIELDS
+from core.question_cleaner import generate_question_hashes
+from storage.backup_store import BackupStore
+from storage.html_export import IMAGES_INLINE, export_questions_html
+from storage.image_store import get_image_manifest
+from storage.snapshot import SnapshotBank, open_snapshot, write_snapshot
+from storage.question_table import QuestionTable
+from storage.bank_stats import (
+    StatsSidecar, accumulate_questions, accumulate_records, empty_counters, finalise,
+    remove_questions,
+)
+from config.settings import DATA_DIR, QUESTIONS_FILE, JOURNAL_COMPACT_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
 
+HASH_INDEX_HEADER = "# fmge-hash-index v1\n"
+
+
+class ColdSegmentReader:
+    """
+    Random access to the zlib blobs of a bank's cold segment.
+    The file is opened once at load time, so questions keep reading the
+    segment they were loaded with even after a newer save replaces it.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+    
+    def read(self, offset: int, length: int) -> Dict:
+        with self._lock:
+            self._file.seek(offset)
+            blob = self._file.read(length)
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+    
+    def __del__(self):
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+
+
+def _matches(
+    q: ParsedQuestion,
+    subject: Optional[str] = None,
+    year: Optional[str] = None,
+    source_file: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    has_image_reference: Optional[bool] = None,
+    has_answer: Optional[bool] = None,
+    is_valid: Optional[bool] = None,
+    search: Optional[str] = None,
+) -> bool:
+    """filter_questions() predicate; search must already be lower case"""
+    return (
+        (subject is None or q.subject == subject)
+        and (year is None or q.year == year)
+        and (source_file is None or q.source_file == source_file)
+        and (has_images is None or bool(q.images) == has_images)
+        and (has_image_reference is None or q.has_image_reference == has_image_reference)
+        and (has_answer is None or bool(q.correct_answer) == has_answer)
+        and (is_valid is None or q.is_valid == is_valid)
+        and (search is None or search in q.question_text.lower())
+    )
+
+
+def filter_positions(
+    questions: Sequence[ParsedQuestion],
+    subject: Optional[str] = None,
+    year: Optional[str] = None,
+    source_file: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    has_image_reference: Optional[bool] = None,
+    has_answer: Optional[bool] = None,
+    is_valid: Optional[bool] = None,
+    search: Optional[str] = None,
+) -> List[int]:
+    """Indices of the questions filter_questions() would return"""
+    filters = dict(
+        subject=subject, year=year, source_file=source_file,
+        has_images=has_images, has_image_reference=has_image_reference,
+        has_answer=has_answer, is_valid=is_valid, search=search,
+    )
+    
+    if isinstance(questions, (SnapshotBank, MergedBank, QuestionTable)):
+        # Filter on the mapped record headers or columns without materialising anything
+        return questions.positions(**filters)
+    
+    filters["search"] = search.lower() if search else None
+    return [i for i, q in enumerate(questions) if _matches(q, **filters)]
+
+
+def filter_questions(
+    questions: Iterable[ParsedQuestion],
+    subject: Optional[str] = None,
+    year: Optional[str] = None,
+    source_file: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    has_image_reference: Optional[bool] = None,
+    has_answer: Optional[bool] = None,
+    is_valid: Optional[bool] = None,
+    search: Optional[str] = None,
+) -> List[ParsedQuestion]:
+    """
+    In-memory version of the filters every storage backend accepts.
+    None means "don't filter on this field".
+    """
+    filters = dict(
+        subject=subject, year=year, source_file=source_file,
+        has_images=has_images, has_image_reference=has_image_reference,
+        has_answer=has_answer, is_valid=is_valid, search=search,
+    )
+    
+    if isinstance(questions, (SnapshotBank, MergedBank)):
+        # Filter on the mapped record headers, materialise only the matches
+        return [questions[i] for i in filter_positions(questions, **filters)]
+    
+    filters["search"] = search.lower() if search else None
+    return [q for q in questions if _matches(q, **filters)]
+
+
+def _id_index(base: Sequence[ParsedQuestion]) -> Dict[str, int]:
+    """Question id -> index of its first occurrence in a bank"""
+    if isinstance(base, SnapshotBank):
+        return base.id_index()
+    index: Dict[str, int] = {}
+    for i, q in enumerate(base):
+        index.setdefault(q.id, i)
+    return index
+
+
+class MergedBank(Sequence):
+    """
+    A base bank with journal entries applied on top.
+    Updated questions keep their position, deleted ones are skipped and
+    added ones follow the base, without copying the base itself.
+    
+    Ids may repeat. An update or delete applies to the first remaining
+    question with its id, in bank order (base, then added), as in the
+    SQLite backend.
+    """
+    
+    def __init__(self, base: Sequence[ParsedQuestion], entries: List[Dict]):
+        self.base = base
+        # base index -> replacement question, or None once deleted
+        self._replaced: Dict[int, Optional[ParsedQuestion]] = {}
+        # Added questions in journal order, None once deleted
+        added: List[Optional[ParsedQuestion]] = []
+        added_rows: Dict[str, List[int]] = {}
+        self._base_ids: Optional[Dict[str, int]] = None
+        
+        for entry in entries:
+            op = entry.get("op")
+            q_id = entry["question"]["id"] if "question" in entry else entry.get("id")
+            
+            if op == "add":
+                added_rows.setdefault(q_id, []).append(len(added))
+                added.append(QuestionStorage._from_record(entry["question"]))
+                continue
+            
+            if op not in ("update", "delete"):
+                logger.warning(f"Skipping unknown journal entry: {op}")
+                continue
+            
+            q = QuestionStorage._from_record(entry["question"]) if op == "update" else None
+            row = self._base_row(q_id)
+            if row is not None:
+                self._replaced[row] = q
+                continue
+            j = next((j for j in added_rows.get(q_id, ()) if added[j] is not None), None)
+            if j is not None:
+                added[j] = q
+        
+        self._tail = [q for q in added if q is not None]
+        self._tail_ids: Dict[str, int] = {}
+        for j, q in enumerate(self._tail):
+            self._tail_ids.setdefault(q.id, j)
+        deleted = [i for i, q in self._replaced.items() if q is None]
+        if deleted:
+            deleted = set(deleted)
+            self._rows: Optional[List[int]] = [i for i in range(len(base)) if i not in deleted]
+        else:
+            self._rows = None
+        self._base_len = len(self._rows) if self._rows is not None else len(base)
+    
+    def _base_row(self, q_id: str) -> Optional[int]:
+        """Base index of the first question with q_id not deleted by the journal"""
+        if self._base_ids is None:
+            self._base_ids = _id_index(self.base)
+        row = self._base_ids.get(q_id)
+        if row is None or self._replaced.get(row, True) is not None:
+            return row
+        # The first copy is deleted: look for a later one (ids rarely repeat)
+        get = getattr(self.base, "peek", self.base.__getitem__)
+        for i in range(row + 1, len(self.base)):
+            if get(i).id == q_id and self._replaced.get(i, True) is not None:
+                return i
+        return None
+    
+    def __len__(self) -> int:
+        return self._base_len + len(self._tail)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("bank index out of range")
+        
+        if index >= self._base_len:
+            return self._tail[index - self._base_len]
+        
+        row = self._rows[index] if self._rows is not None else index
+        replacement = self._replaced.get(row)
+        return replacement if replacement is not None else self.base[row]
+    
+    def peek(self, index: int) -> ParsedQuestion:
+        """Like bank[index], but a snapshot base doesn't cache the question"""
+        if index >= self._base_len or not isinstance(self.base, SnapshotBank):
+            return self[index]
+        row = self._rows[index] if self._rows is not None else index
+        replacement = self._replaced.get(row)
+        return replacement if replacement is not None else self.base.peek(row)
+    
+    def find(self, q_id: str) -> Optional[ParsedQuestion]:
+        """Current version of the first question with q_id"""
+        row = self._base_row(q_id)
+        if row is not None:
+            return self._replaced.get(row) or self.base[row]
+        j = self._tail_ids.get(q_id)
+        return self._tail[j] if j is not None else None
+    
+    def positions(self, search: Optional[str] = None, **filters) -> List[int]:
+        """Indices matching filter_questions() filters"""
+        if isinstance(self.base, SnapshotBank):
+            rows = self.base.positions(search=search, **filters)
+        else:
+            rows = [i for i, q in enumerate(self.base)
+                    if _matches(q, search=search.lower() if search else None, **filters)]
+        
+        # Journal replacements are checked against their new values
+        lowered = search.lower() if search else None
+        rows = set(rows).difference(self._replaced)
+        rows.update(i for i, q in self._replaced.items()
+                    if q is not None and _matches(q, search=lowered, **filters))
+        
+        if self._rows is not None:
+            merged = [bisect_left(self._rows, row) for row in sorted(rows)]
+        else:
+            merged = sorted(rows)
+        
+        merged.extend(self._base_len + j for j, q in enumerate(self._tail)
+                      if _matches(q, search=lowered, **filters))
+        return merged
+
+
+def find_question(bank: Sequence[ParsedQuestion], q_id: str) -> Optional[ParsedQuestion]:
+    """Look up a question by id in any loaded bank"""
+    if isinstance(bank, MergedBank):
+        return bank.find(q_id)
+    row = _id_index(bank).get(q_id)
+    return bank[row] if row is not None else None
+
+
+_LOCKS_GUARD = threading.Lock()
+_BANK_LOCKS: Dict[Path, threading.RLock] = {}
+_COMPACTING: Set[Path] = set()
+
+
+def _bank_lock(path: Path) -> threading.RLock:
+    """One writer lock per bank file, shared by every QuestionStorage in the process"""
+    with _LOCKS_GUARD:
+        return _BANK_LOCKS.setdefault(path.resolve(), threading.RLock())
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    if not path.exists():
+        return None
+    st = path.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
 class QuestionStorage:
     
     def __init__(self, filepath: Path = QUESTIONS_FILE):
         self.filepath = filepath
         self.backup_dir = DATA_DIR / "backups"
         self.backup_dir.mkdir(exist_ok=True)
+        self.backups = BackupStore(self.backup_dir)
+        # Dedupe index: one "id<TAB>hash hash ..." line per stored question
+        self.hash_index_path = filepath.with_suffix(".hashes.tsv")
+        self._hash_cache: Optional[Tuple[List[int], Set[str], Set[str]]] = None
+        # Binary snapshot derived from the JSON, mapped for fast startup
+        self.snapshot_path = filepath.with_suffix(".snap")
+        # Adds, edits and deletes since questions.json was last written
+        self.journal_path = filepath.with_suffix(".journal.jsonl")
+        # Aggregate counts, so stats never need the questions themselves
+        self.stats_sidecar = StatsSidecar(
+            filepath.with_suffix(".stats.json"), filepath, self.journal_path
+        )
+        self._lock = _bank_lock(filepath)
     
     def save_questions(self, questions: List[ParsedQuestion], create_backup: bool = True) -> bool:
+        with self._lock:
+            counters = self._write_bank(questions, create_backup)
+            if counters is None:
+                return False
+            self._reset_journal()
+            self.stats_sidecar.write(counters)
+            self._write_hash_index(questions)
+            return True
+    
+    @staticmethod
+    def _to_record(q: ParsedQuestion) -> Dict:
+        """Question as stored in JSON, with image paths relative to DATA_DIR"""
+        q_dict = q.to_dict()
+        if q_dict.get('images'):
+            # Inline data URIs are written to the image store, not the JSON
+            manifest = get_image_manifest()
+            q_dict['images'] = [manifest.bank_path(p) for p in q_dict['images']]
+        return q_dict
+    
+    def _write_bank(self, questions: List[ParsedQuestion], create_backup: bool = True) -> Optional[Dict]:
+        """Write bank and snapshot; returns the bank's stats counters, None on failure"""
         try:
             if create_backup and self.filepath.exists():
                 self._create_backup()
             
+            # Cold fields go to a new compressed segment; each hot record
+            # keeps [offset, length, fields] into it
+            cold_name = f"{self.filepath.stem}.cold-{datetime.now().strftime('%Y%m%d%H%M%S%f')}.z"
+            cold_path = self.filepath.parent / cold_name
+            
             # Convert questions to dict, handling images
             questions_data = []
-            for q in questions:
-                q_dict = q.to_dict()
-                
-                # Convert image paths to relative paths
-                if q_dict.get('images'):
-                    q_dict['images'] = [
-                        str(Path(p).relative_to(DATA_DIR)) if Path(p).exists() else p
-                        for p in q_dict['images']
-                    ]
-                
-                questions_data.append(q_dict)
+            snapshot_records = []
+            with open(cold_path, 'wb') as cold:
+                for q in questions:
+                    q_dict = self._to_record(q)
+                    
+                    snapshot_records.append(dict(q_dict))
+                    cold_values = {name: q_dict.pop(name) for name in COLD_FIELDS}
+                    present = [name for name, value in cold_values.items() if value]
+                    if present:
+                        blob = zlib.compress(json.dumps(
+                            {name: cold_values[name] for name in present}, ensure_ascii=False
+                        ).encode('utf-8'))
+                        q_dict['cold'] = [cold.tell(), len(blob), present]
+                        cold.write(blob)
+                    
+                    questions_data.append(q_dict)
+                cold.flush()
+                os.fsync(cold.fileno())
             
             data = {
-                "version": "1.1",
+                "version": "1.2",
                 "created_at": datetime.now().isoformat(),
                 "total_count": len(questions),
                 "with_images": sum(1 for q in questions if q.images),
+                "cold_segment": cold_name,
                 "questions": questions_data,
             }
             
-            with open(self.filepath, 'w', encoding='utf-8') as f:
+            # Write-then-rename so readers never see a bank pointing at a
+            # segment that isn't there yet
+            tmp_path = self.filepath.with_suffix(".json.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filepath)
+            
+            self._remove_stale_cold_segments(keep=cold_name)
+            write_snapshot(snapshot_records, self.snapshot_path, self.filepath)
             
             logger.info(f"Saved {len(questions)} questions to {self.filepath}")
-            return True
+            return accumulate_records(empty_counters(), snapshot_records)
             
         except Exception as e:
             logger.error(f"Failed to save questions: {e}")
-            return False
+            return None
     
-    def load_questions(self) -> List[ParsedQuestion]:
+    def _remove_stale_cold_segments(self, keep: str):
+        for path in self.filepath.parent.glob(f"{self.filepath.stem}.cold-*.z"):
+            if path.name == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                # Still open in another process (Windows); retried on next save
+                pass
+    
+    def load_questions(self) -> Sequence[ParsedQuestion]:
+        """
+        Load the bank with any journal entries applied. When the binary
+        snapshot matches the JSON file the base is a lazy, read-only
+        SnapshotBank; otherwise the JSON is parsed and the snapshot
+        regenerated for next time.
+        """
+        base = self._load_base()
+        entries = self._read_journal()
+        if not entries:
+            return base
+        return MergedBank(base, entries)
+    
+    def bank_signature(self) -> Tuple:
+        """Size and mtime of the bank and its journal; changes with every write"""
+        return (_file_signature(self.filepath), _file_signature(self.journal_path))
+    
+    def _load_base(self) -> Sequence[ParsedQuestion]:
         if not self.filepath.exists():
             logger.warning(f"Question file not found: {self.filepath}")
             return []
         
+        snapshot = open_snapshot(self.snapshot_path, self.filepath)
+        if snapshot is not None:
+            logger.info(f"Mapped {len(snapshot)} questions from {self.snapshot_path}")
+            return snapshot
+        
         try:
             with open(self.filepath, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
-            questions = []
-            for q_data in data.get("questions", []):
-                # Convert relative image paths back to absolute
-                images = q_data.get("images", [])
-                absolute_images = []
-                for img_path in images:
-                    if img_path.startswith("data:"):
-                        # Base64 data URI
-                        absolute_images.append(img_path)
-                    else:
-                        # File path
-                        abs_path = DATA_DIR / img_path
-                        if abs_path.exists():
-                            absolute_images.append(str(abs_path))
-                        else:
-                            absolute_images.append(img_path)
-                
-                question = ParsedQuestion(
-                    id=q_data["id"],
-                    question_text=q_data["question_text"],
-                    option_a=q_data["option_a"],
-                    option_b=q_data["option_b"],
-                    option_c=q_data["option_c"],
-                    option_d=q_data["option_d"],
-                    correct_answer=q_data.get("correct_answer"),
-                    explanation=q_data.get("explanation"),
-                    source_file=q_data.get("source_file", "unknown"),
-                    page_number=q_data.get("page_number", 0),
-                    images=absolute_images,
-                    subject=q_data.get("subject"),
-                    year=q_data.get("year"),
-                    is_valid=q_data.get("is_valid", True),
-                    has_image_reference=q_data.get("has_image_reference", False),
-                    needs_review=q_data.get("needs_review", False),
-                )
-                questions.append(question)
+            cold_reader = None
+            if data.get("cold_segment"):
+                cold_path = self.filepath.parent / data["cold_segment"]
+                if cold_path.exists():
+                    cold_reader = ColdSegmentReader(cold_path)
+                else:
+                    logger.warning(f"Cold segment missing, explanations unavailable: {cold_path}")
+            
+            questions = [self._from_record(q_data, cold_reader) for q_data in data.get("questions", [])]
+            self._rebuild_snapshot(data.get("questions", []), cold_reader)
             
             logger.info(f"Loaded {len(questions)} questions")
             return questions
@@ -111,139 +455,408 @@ class QuestionStorage:
             logger.error(f"Failed to load questions: {e}")
             return []
     
-    def _create_backup(self):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = self.backup_dir / f"questions_backup_{timestamp}.json"
-        shutil.copy(self.filepath, backup_path)
-        logger.info(f"Created backup: {backup_path}")
+    def _rebuild_snapshot(self, records: List[Dict], cold_reader: Optional["ColdSegmentReader"]):
+        """Regenerate the snapshot for a bank written without one (or a stale one)"""
+        snapshot_records = []
+        for q_data in records:
+            record = dict(q_data)
+            cold = record.pop("cold", None)
+            if cold and cold_reader is not None:
+                offset, length, _ = cold
+                record.update(cold_reader.read(offset, length))
+            snapshot_records.append(record)
+        write_snapshot(snapshot_records, self.snapshot_path, self.filepath)
     
-    def get_stats(self) -> Dict:
-        questions = self.load_questions()
-        
-        if not questions:
-            return {"total": 0}
+    @staticmethod
+    def _from_record(q_data: Dict, cold_reader: Optional["ColdSegmentReader"] = None) -> ParsedQuestion:
+        # Convert relative image paths back to absolute
+        images = q_data.get("images", [])
+        manifest = get_image_manifest()
+        absolute_images = []
+        for img_path in images:
+            if img_path.startswith("data:"):
+                # Base64 data URI
+                absolute_images.append(img_path)
+            else:
+                # File path, checked against the image manifest
+                abs_path = manifest.resolve(img_path)
+                if abs_path is not None:
+                    absolute_images.append(str(abs_path))
+                else:
+                    absolute_images.append(img_path)
         
-        subject_counts = {}
-        for q in questions:
-            subject = q.subject or "Untagged"
-            subject_counts[subject] = subject_counts.get(subject, 0) + 1
+        question = ParsedQuestion(
+            id=q_data["id"],
+            question_text=q_data["question_text"],
+            option_a=q_data["option_a"],
+            option_b=q_data["option_b"],
+            option_c=q_data["option_c"],
+            option_d=q_data["option_d"],
+            correct_answer=q_data.get("correct_answer"),
+            explanation=q_data.get("explanation"),
+            source_file=q_data.get("source_file", "unknown"),
+            page_number=q_data.get("page_number", 0),
+            question_number=q_data.get("question_number", ""),
+            images=absolute_images,
+            subject=q_data.get("subject"),
+            year=q_data.get("year"),
+            is_valid=q_data.get("is_valid", True),
+            has_image_reference=q_data.get("has_image_reference", False),
+            image_pattern_matched=q_data.get("image_pattern_matched", ""),
+            needs_review=q_data.get("needs_review", False),
+        )
         
-        with_answers = sum(1 for q in questions if q.correct_answer)
-        with_explanations = sum(1 for q in questions if q.explanation)
-        with_images = sum(1 for q in questions if q.images)
-        needs_review = sum(1 for q in questions if q.needs_review)
+        # v1.2 banks keep explanations out of line
+        cold = q_data.get("cold")
+        if cold and cold_reader is not None:
+            offset, length, fields = cold
+            question.detach_cold_fields(partial(cold_reader.read, offset, length), fields)
         
-        return {
-            "total": len(questions),
-            "with_answers": with_answers,
-            "with_explanations": with_explanations,
-            "with_images": with_images,
-            "needs_review": needs_review,
-            "by_subject": subject_counts,
-            "answer_coverage": f"{with_answers/len(questions)*100:.1f}%",
-        }
+        return question
     
-    def add_questions(self, new_questions: List[ParsedQuestion], deduplicate: bool = True) -> int:
-        existing = self.load_questions()
-        existing_ids = {q.id for q in existing}
+    # ----- journal -----
+    
+    def _read_journal(self) -> List[Dict]:
+        """Journal entries written against the current questions.json"""
+        if not self.journal_path.exists() or not self.filepath.exists():
+            return []
         
-        added = 0
-        for q in new_questions:
-            if deduplicate and q.id in existing_ids:
-                continue
-            existing.append(q)
-            added += 1
+        entries = []
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("bank") != _file_signature(self.filepath):
+                    # questions.json was rewritten after these entries; they
+                    # are either folded in already or belong to another bank
+                    return []
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # Torn final write from a crash; nothing after it was acknowledged
+                        logger.warning(f"Ignoring truncated journal entry in {self.journal_path}")
+                        break
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read question journal: {e}")
+            return []
         
-        self.save_questions(existing)
-        return added
+        return entries
     
-    def get_questions_needing_images(self) -> List[ParsedQuestion]:
-        """Get questions that reference images but don't have them"""
-        questions = self.load_questions()
-        return [q for q in questions if q.has_image_reference and not q.images]
+    def _reset_journal(self):
+        """Start an empty journal for the questions.json just written"""
+        tmp_path = self.journal_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"op": "base", "bank": _file_signature(self.filepath)}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logger.error(f"Failed to reset question journal: {e}")
+    
+    def _append_journal(self, entries: List[Dict]) -> bool:
+        """Durably append entries; only the batch is written"""
+        if not self._journal_is_current():
+            self._reset_journal()
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            return True
+        except OSError as e:
+            logger.error(f"Failed to append to question journal: {e}")
+            return False
+    
+    def _journal_is_current(self) -> bool:
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or "{}")
+        except (OSError, ValueError):
+            return False
+        return header.get("bank") == _file_signature(self.filepath)
     
-    def export_with_images_html(self, output_path: Path, limit: int = 100):
-        """Export questions with images to an HTML file for viewing"""
+    def _journal_length(self) -> int:
+        if not self.journal_path.exists():
+            return 0
+        with open(self.journal_path, 'rb') as f:
+            return max(sum(1 for _ in f) - 1, 0)
+    
+    def compact(self) -> bool:
+        """Fold the journal into a new questions.json, snapshot and indexes"""
+        with self._lock:
+            if not self._read_journal():
+                return True
+            
+            questions = list(self.load_questions())
+            counters = self._write_bank(questions)
+            if counters is None:
+                return False
+            
+            self._reset_journal()
+            self.stats_sidecar.write(counters)
+            # Drops lines for edited and deleted questions
+            self._write_hash_index(questions)
+            self._hash_cache = None
+            
+            logger.info(f"Compacted question journal into {self.filepath}")
+            return True
+    
+    def _maybe_compact(self):
+        """Compact in a background thread once the journal passes the threshold"""
+        if self._journal_length() < JOURNAL_COMPACT_THRESHOLD:
+            return
         
-        questions = self.load_questions()
+        key = self.filepath.resolve()
+        with _LOCKS_GUARD:
+            if key in _COMPACTING:
+                return
+            _COMPACTING.add(key)
         
-        html = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>FMGE Questions with Images</title>
-    <style>
-        body { font-family: Arial, sans-serif; max-width: 900px; margin: 0 auto; padding: 20px; }
-        .question { border: 1px solid #ddd; padding: 20px; margin: 20px 0; border-radius: 8px; }
-        .question-text { font-size: 16px; font-weight: bold; margin-bottom: 15px; }
-        .image-container { text-align: center; margin: 15px 0; }
-        .image-container img { max-width: 100%; max-height: 400px; border: 1px solid #ccc; }
-        .options { margin: 15px 0; }
-        .option { padding: 8px; margin: 5px 0; background: #f5f5f5; border-radius: 4px; }
-        .option.correct { background: #d4edda; border-left: 4px solid #28a745; }
-        .answer { color: #28a745; font-weight: bold; margin-top: 10px; }
-        .explanation { background: #e7f3ff; padding: 10px; border-radius: 4px; margin-top: 10px; }
-        .meta { color: #666; font-size: 12px; margin-top: 10px; }
-        .no-image { color: #dc3545; font-style: italic; }
-    </style>
-</head>
-<body>
-    <h1>FMGE Questions with Images</h1>
-"""
+        def run():
+            try:
+                self.compact()
+            finally:
+                with _LOCKS_GUARD:
+                    _COMPACTING.discard(key)
         
-        count = 0
-        for q in questions:
-            if count >= limit:
-                break
+        # Not a daemon: a CLI run waits for compaction to finish before exiting
+        threading.Thread(target=run, name="question-journal-compaction").start()
+    
+    def _create_backup(self):
+        # The bank references its cold segment by name, keep it alongside;
+        # derived files (snapshot, indexes, stats) are rebuilt after a restore
+        files = [
+            self.filepath,
+            *sorted(self.filepath.parent.glob(f"{self.filepath.stem}.cold-*.z")),
+            self.journal_path,
+        ]
+        timestamp = self.backups.create_backup(files, self.filepath.parent)
+        logger.info(f"Created backup: {timestamp}")
+    
+    def list_backups(self) -> List[str]:
+        """Backups of this bank, newest first"""
+        return self.backups.list_backups(self.filepath.name)
+    
+    def restore_backup(self, timestamp: str) -> bool:
+        """Replace the bank with a backup; the current bank is backed up first"""
+        with self._lock:
+            try:
+                self.backups.load_manifest(timestamp)
+                if self.filepath.exists():
+                    self._create_backup()
+                self.backups.restore(timestamp, self.filepath.parent)
+            except (OSError, ValueError, RuntimeError) as e:
+                logger.error(f"Failed to restore backup {timestamp}: {e}")
+                return False
             
-            # Only show questions with images or that need images
-            if not q.has_image_reference:
-                continue
+            # Derived files describe the bank that was just replaced
+            for path in (self.snapshot_path, self.hash_index_path, self.stats_sidecar.path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._hash_cache = None
+            return True
+    
+    def get_stats(self) -> Dict:
+        counters = self.stats_sidecar.read_counters()
+        
+        if counters is None:
+            # Sidecar missing or older than the bank: rebuild it once
+            questions = self.load_questions()
+            if isinstance(questions, SnapshotBank):
+                counters = questions.counters()
+            else:
+                counters = accumulate_questions(empty_counters(), questions)
+            if self.filepath.exists():
+                self.stats_sidecar.write(counters)
+        
+        return finalise(counters)
+    
+    def add_questions(self, new_questions: List[ParsedQuestion], deduplicate: bool = True) -> int:
+        with self._lock:
+            existing_ids, existing_hashes = self._hash_index()
             
-            count += 1
+            # Only the batch is hashed; lookups against the persisted index are O(1)
+            accepted = []
+            for q in new_questions:
+                hashes = generate_question_hashes(q)
+                if deduplicate and (
+                    q.id in existing_ids or any(h in existing_hashes for h in hashes)
+                ):
+                    continue
+                existing_ids.add(q.id)
+                existing_hashes.update(hashes)
+                accepted.append((q, hashes))
             
-            html += f'<div class="question">\n'
-            html += f'<div class="question-text">Q{count}. {q.question_text}</div>\n'
+            if not accepted:
+                return 0
             
-            # Display image
-            if q.images:
-                for img_path in q.images:
-                    if img_path.startswith("data:"):
-                        html += f'<div class="image-container"><img src="{img_path}" alt="Question Image"></div>\n'
-                    elif Path(img_path).exists():
-                        # Read and embed as base64
-                        with open(img_path, 'rb') as f:
-                            img_data = base64.b64encode(f.read()).decode()
-                        ext = Path(img_path).suffix[1:]
-                        html += f'<div class="image-container"><img src="data:image/{ext};base64,{img_data}" alt="Question Image"></div>\n'
-            else:
-                html += '<div class="no-image">⚠️ Image referenced but not found</div>\n'
+            if not self.filepath.exists():
+                # Nothing to journal against yet
+                self._hash_cache = None
+                return len(accepted) if self.save_questions([q for q, _ in accepted]) else 0
+            
+            # Fold the batch into the current counters rather than rescanning
+            counters = self.stats_sidecar.read_counters()
             
-            # Options
-            html += '<div class="options">\n'
-            for opt, text in [('A', q.option_a), ('B', q.option_b), ('C', q.option_c), ('D', q.option_d)]:
-                is_correct = q.correct_answer == opt
-                css_class = "option correct" if is_correct else "option"
-                prefix = "✓ " if is_correct else ""
-                html += f'<div class="{css_class}">{prefix}{opt}. {text}</div>\n'
-            html += '</div>\n'
+            if not self._append_journal([{"op": "add", "question": self._to_record(q)} for q, _ in accepted]):
+                self._hash_cache = None
+                return 0
+            
+            if counters is not None:
+                self.stats_sidecar.write(accumulate_questions(counters, (q for q, _ in accepted)))
+            self._append_hash_index([(q.id, hashes) for q, hashes in accepted])
+            self._hash_cache = (_file_signature(self.hash_index_path), existing_ids, existing_hashes)
+        
+        self._maybe_compact()
+        return len(accepted)
+    
+    def get_question(self, q_id: str) -> Optional[ParsedQuestion]:
+        return find_question(self.load_questions(), q_id)
+    
+    def update_question(self, question: ParsedQuestion) -> bool:
+        """Replace a stored question (matched by id) through the journal"""
+        return self._journal_edit(question.id, question)
+    
+    def delete_question(self, q_id: str) -> bool:
+        """Remove a stored question through a journal tombstone"""
+        return self._journal_edit(q_id, None)
+    
+    def _journal_edit(self, q_id: str, replacement: Optional[ParsedQuestion]) -> bool:
+        with self._lock:
+            old = self.get_question(q_id)
+            if old is None:
+                logger.warning(f"Question not found: {q_id}")
+                return False
             
-            if q.correct_answer:
-                html += f'<div class="answer">Answer: {q.correct_answer}</div>\n'
+            counters = self.stats_sidecar.read_counters()
             
-            if q.explanation:
-                html += f'<div class="explanation"><strong>Explanation:</strong> {q.explanation[:500]}...</div>\n'
+            if replacement is None:
+                entry = {"op": "delete", "id": q_id}
+            else:
+                entry = {"op": "update", "question": self._to_record(replacement)}
+            if not self._append_journal([entry]):
+                return False
             
-            html += f'<div class="meta">Source: {q.source_file} | Page: {q.page_number} | Subject: {q.subject or "Untagged"}</div>\n'
-            html += '</div>\n'
+            if counters is not None:
+                remove_questions(counters, [old])
+                if replacement is not None:
+                    accumulate_questions(counters, [replacement])
+                self.stats_sidecar.write(counters)
+            
+            hashes = generate_question_hashes(replacement) if replacement is not None else []
+            self._append_hash_index([(q_id, hashes)])
+            self._hash_cache = None
         
-        html += "</body></html>"
+        self._maybe_compact()
+        return True
+    
+    def load_hash_index(self) -> Tuple[Set[str], Set[str]]:
+        """
+        Return (question ids, duplicate-detection hashes) for the stored bank.
+        The index is rebuilt from the bank if it is missing or older than it.
+        """
+        ids, hashes = self._hash_index()
+        return set(ids), set(hashes)
+    
+    def _hash_index(self) -> Tuple[Set[str], Set[str]]:
+        """Cached index sets, re-read only when the index file changes"""
+        if not self._hash_index_is_current():
+            self._write_hash_index(self.load_questions())
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
+        signature = _file_signature(self.hash_index_path)
+        if self._hash_cache is None or self._hash_cache[0] != signature:
+            self._hash_cache = (signature, *self._read_hash_index())
+        return self._hash_cache[1], self._hash_cache[2]
+    
+    def _read_hash_index(self) -> Tuple[Set[str], Set[str]]:
+        # Later lines win: edits append new hashes, deletes an empty line
+        by_id: Dict[str, List[str]] = {}
+        
+        try:
+            with open(self.hash_index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('#'):
+                        continue
+                    q_id, _, q_hashes = line.rstrip('\n').partition('\t')
+                    if q_hashes:
+                        by_id[q_id] = q_hashes.split()
+                    else:
+                        by_id.pop(q_id, None)
+        except OSError as e:
+            logger.error(f"Failed to read hash index: {e}")
         
-        logger.info(f"Exported {count} questions to {output_path}")
-        return count
+        hashes: Set[str] = set()
+        for q_hashes in by_id.values():
+            hashes.update(q_hashes)
+        return set(by_id), hashes
+    
+    def _hash_index_is_current(self) -> bool:
+        if not self.hash_index_path.exists():
+            return False
+        if not self.filepath.exists():
+            return True
+        return self.hash_index_path.stat().st_mtime_ns >= self.filepath.stat().st_mtime_ns
+    
+    def _write_hash_index(self, questions: Iterable[ParsedQuestion]):
+        try:
+            with open(self.hash_index_path, 'w', encoding='utf-8') as f:
+                f.write(HASH_INDEX_HEADER)
+                for q in questions:
+                    f.write(f"{q.id}\t{' '.join(generate_question_hashes(q))}\n")
+        except OSError as e:
+            logger.error(f"Failed to write hash index: {e}")
+    
+    def _append_hash_index(self, entries: List[Tuple[str, List[str]]]):
+        try:
+            with open(self.hash_index_path, 'a', encoding='utf-8') as f:
+                for q_id, hashes in entries:
+                    f.write(f"{q_id}\t{' '.join(hashes)}\n")
+        except OSError as e:
+            logger.error(f"Failed to append to hash index: {e}")
+    
+    def get_questions_needing_images(self) -> List[ParsedQuestion]:
+        """Get questions that reference images but don't have them"""
+        return filter_questions(self.load_questions(), has_image_reference=True, has_images=False)
+    
+    def count_questions(self, **filters) -> int:
+        questions = self.load_questions()
+        if isinstance(questions, (SnapshotBank, MergedBank)):
+            return len(questions.positions(**filters))
+        return len(filter_questions(questions, **filters))
+    
+    def query_questions(self, limit: Optional[int] = None, offset: int = 0, **filters) -> List[ParsedQuestion]:
+        questions = self.load_questions()
+        end = offset + limit if limit is not None else None
+        if isinstance(questions, (SnapshotBank, MergedBank)):
+            return [questions[i] for i in questions.positions(**filters)[offset:end]]
+        matched = filter_questions(questions, **filters)
+        return matched[offset:end]
+    
+    def sample_questions(self, count: int, **filters) -> List[ParsedQuestion]:
+        questions = self.load_questions()
+        if isinstance(questions, (SnapshotBank, MergedBank)):
+            # Sample indices so only the chosen questions are materialised
+            positions = questions.positions(**filters)
+            return [questions[i] for i in random.sample(positions, min(count, len(positions)))]
+        matched = filter_questions(questions, **filters)
+        return random.sample(matched, min(count, len(matched)))
+    
+    def export_with_images_html(self, output_path: Path, limit: int = 100, per_page: int = 100,
+                                images: str = IMAGES_INLINE) -> int:
+        """Export questions with images to paginated HTML files for viewing"""
+        bank = self.load_questions()
+        if isinstance(bank, (SnapshotBank, MergedBank)):
+            # Stream without caching, so memory stays bounded to one page
+            questions = (bank.peek(i) for i in bank.positions(has_image_reference=True))
+        else:
+            questions = bank
+        return export_questions_html(questions, output_path, limit, per_page, images)
     
 # ===========================
 # Mock Exam Attempt Storage
@@ -266,14 +879,17 @@ class MockExamStorage:
 
     def save_mock_attempt(self, data: Dict) -> None:
         """
-        Persist a completed mock exam attempt.
+        Persist a completed mock exam attempt, a compact payload
+        (storage/attempt_payload.py) with the analysis summary.
         """
         user_dir = self.BASE_DIR / data["user_id"]
         user_dir.mkdir(parents=True, exist_ok=True)
 
         path = user_dir / f"{data['mock_id']}.json"
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp_path, path)
 
         logger.info(
             f"Saved mock exam attempt for user={data['user_id']} mock={data['mock_id']}"
@@ -287,6 +903,10 @@ class MockExamStorage:
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def attempt_paths(self) -> List[Path]:
+        """Every saved attempt file, all users"""
+        return sorted(self.BASE_DIR.glob("*/*.json"))
+
     def list_user_attempts(self, user_id: str) -> List[str]:
         """
         List all mock IDs attempted by a user.
@@ -0,0 +1,277 @@
+"""
+Mock Session Store
+In-progress mock attempts kept outside any one server process, keyed by
+(user_id, mock_id), so a refresh, a restart or a move to another node
+resumes the attempt where it was.
+
+The state is compact: the paper itself follows from the mock_id, so only
+the answers (one character per question), the current question and the
+start time are stored. The start time is claimed once, atomically, by
+whichever node sees the first answer. Every node counts the remaining
+time from that stored value, never from its own session.
+
+Answer and navigation saves are batched: the latest state per attempt is
+written at most every flush_interval seconds, by a background timer if
+nothing else triggers it. Starting and submitting write through at once.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from storage.attempt_payload import decode_answers, encode_answers
+from config.settings import MOCK_SESSION_BACKEND, MOCK_SESSIONS_DB, MOCK_STATE_DIR
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MockState:
+    """One user's attempt at one mock"""
+    user_id: str
+    mock_id: str
+    answers: str  # encode_answers() of the answer per question
+    current_q: int = 0
+    start_time: Optional[float] = None  # unix time, set once by start()
+    submitted: bool = False
+    updated_at: float = 0.0
+
+
+class MockSessionStore(ABC):
+    """Batching shared by the backends; subclasses read and write states"""
+
+    def __init__(self, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], MockState] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    # ----- backend -----
+
+    @abstractmethod
+    def _read(self, user_id: str, mock_id: str) -> Optional[MockState]:
+        """The stored state of an attempt, None if there is none"""
+        pass
+
+    @abstractmethod
+    def _write(self, states: List[MockState]):
+        """Store states, keeping any stored start time"""
+        pass
+
+    @abstractmethod
+    def _claim_start(self, state: MockState, now: float) -> float:
+        """Store now as the start time unless one is stored; return the stored one"""
+        pass
+
+    # ----- API -----
+
+    def load(self, user_id: str, mock_id: str) -> Optional[MockState]:
+        """Latest state of an attempt, including saves not yet flushed"""
+        with self._lock:
+            pending = self._pending.get((user_id, mock_id))
+        return pending or self._read(user_id, mock_id)
+
+    def save(self, state: MockState):
+        """Queue a state; written within flush_interval seconds"""
+        state.updated_at = time.time()
+        with self._lock:
+            self._pending[(state.user_id, state.mock_id)] = state
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write every queued state now"""
+        with self._lock:
+            states = list(self._pending.values())
+            self._pending.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if states:
+            try:
+                self._write(states)
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Failed to save {len(states)} mock sessions: {e}")
+
+    def start(self, state: MockState, now: Optional[float] = None) -> float:
+        """The attempt's authoritative start time, claiming now if it has none"""
+        self.flush()
+        state.start_time = self._claim_start(state, time.time() if now is None else now)
+        return state.start_time
+
+    def submit(self, state: MockState):
+        state.submitted = True
+        self.save(state)
+        self.flush()
+
+
+class SQLiteMockSessionStore(MockSessionStore):
+    """All attempts in one SQLite table"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS mock_sessions (
+        user_id TEXT NOT NULL,
+        mock_id TEXT NOT NULL,
+        answers TEXT NOT NULL,
+        current_q INTEGER NOT NULL DEFAULT 0,
+        start_time REAL,
+        submitted INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (user_id, mock_id)
+    ) WITHOUT ROWID;
+    """
+
+    def __init__(self, db_path: Path = MOCK_SESSIONS_DB, flush_interval: float = 1.0):
+        super().__init__(flush_interval)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _read(self, user_id: str, mock_id: str) -> Optional[MockState]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT answers, current_q, start_time, submitted, updated_at "
+                "FROM mock_sessions WHERE user_id = ? AND mock_id = ?",
+                (user_id, mock_id),
+            ).fetchone()
+        if row is None:
+            return None
+        return MockState(user_id, mock_id, row[0], row[1], row[2], bool(row[3]), row[4])
+
+    def _write(self, states: List[MockState]):
+        # The start time is only ever set by _claim_start
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO mock_sessions (user_id, mock_id, answers, current_q, start_time, submitted, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, mock_id) DO UPDATE SET "
+                "answers = excluded.answers, current_q = excluded.current_q, "
+                "submitted = MAX(submitted, excluded.submitted), updated_at = excluded.updated_at",
+                [(s.user_id, s.mock_id, s.answers, s.current_q, s.start_time, int(s.submitted), s.updated_at)
+                 for s in states],
+            )
+
+    def _claim_start(self, state: MockState, now: float) -> float:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO mock_sessions (user_id, mock_id, answers, current_q, start_time, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user_id, mock_id) DO UPDATE SET "
+                "start_time = COALESCE(start_time, excluded.start_time)",
+                (state.user_id, state.mock_id, state.answers, state.current_q, now, now),
+            )
+            return conn.execute(
+                "SELECT start_time FROM mock_sessions WHERE user_id = ? AND mock_id = ?",
+                (state.user_id, state.mock_id),
+            ).fetchone()[0]
+
+
+class FileMockSessionStore(MockSessionStore):
+    """<root>/<user_id>/<mock_id>.json per attempt, for setups without SQLite on shared storage"""
+
+    START_READ_ATTEMPTS = 20
+
+    def __init__(self, root: Path = MOCK_STATE_DIR, flush_interval: float = 1.0):
+        super().__init__(flush_interval)
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, user_id: str, mock_id: str, suffix: str = ".json") -> Path:
+        return self.root / user_id / f"{mock_id}{suffix}"
+
+    def _read(self, user_id: str, mock_id: str) -> Optional[MockState]:
+        try:
+            with open(self._path(user_id, mock_id), "r", encoding="utf-8") as f:
+                state = MockState(**json.load(f))
+        except FileNotFoundError:
+            state = None
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Failed to read mock session {user_id}/{mock_id}: {e}")
+            state = None
+        start_time = self._stored_start(user_id, mock_id)
+        if start_time is not None:
+            if state is None:
+                state = MockState(user_id, mock_id, "")
+            state.start_time = start_time
+        return state
+
+    def _write(self, states: List[MockState]):
+        for state in states:
+            path = self._path(state.user_id, state.mock_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(asdict(state), f)
+            os.replace(tmp_path, path)
+
+    def _stored_start(self, user_id: str, mock_id: str) -> Optional[float]:
+        path = self._path(user_id, mock_id, ".start")
+        error = None
+        for _ in range(self.START_READ_ATTEMPTS):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return float(f.read())
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError) as e:
+                # Empty while the node that claimed it is writing it
+                error = e
+                time.sleep(0.05)
+        logger.error(f"Unreadable start time for mock session {user_id}/{mock_id}: {error}")
+        return None
+
+    def _claim_start(self, state: MockState, now: float) -> float:
+        path = self._path(state.user_id, state.mock_id, ".start")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # O_EXCL: exactly one node creates the file
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            stored = self._stored_start(state.user_id, state.mock_id)
+            # The claiming node died before writing it: go on from now
+            return now if stored is None else stored
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(repr(now))
+        return now
+
+
+MOCK_SESSION_BACKENDS = ("sqlite", "file")
+
+_MOCK_SESSION_STORE: Optional[MockSessionStore] = None
+_MOCK_SESSION_STORE_LOCK = threading.Lock()
+
+
+def get_mock_session_store(backend: Optional[str] = None) -> MockSessionStore:
+    """Process-wide store for the configured backend"""
+    global _MOCK_SESSION_STORE
+    backend = backend or MOCK_SESSION_BACKEND
+    with _MOCK_SESSION_STORE_LOCK:
+        if _MOCK_SESSION_STORE is None:
+            if backend == "sqlite":
+                _MOCK_SESSION_STORE = SQLiteMockSessionStore()
+            elif backend == "file":
+                _MOCK_SESSION_STORE = FileMockSessionStore()
+            else:
+                raise ValueError(f"Unknown mock session backend: {backend} "
+                                 f"(expected one of {MOCK_SESSION_BACKENDS})")
+        return _MOCK_SESSION_STORE
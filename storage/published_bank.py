@@ -0,0 +1,133 @@
+"""
+Published Question Bank
+One loader process writes the bank, from either backend, as a standalone
+snapshot file. Every server process maps that same file read-only, so the
+operating system keeps a single copy of the bank in the page cache and
+each extra process adds almost nothing for it.
+
+Next to the snapshot, questions.published.json records which version of
+the bank (the backend's bank_signature()) and which snapshot file it
+describes. Processes only attach while both still match; otherwise they
+fall back to loading the bank themselves until it is republished.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+from core.pdf_parser import ParsedQuestion
+from storage.backends import get_question_storage
+from storage.image_store import get_image_manifest
+from storage.snapshot import SnapshotBank, open_snapshot, write_snapshot
+from config.settings import PUBLISHED_BANK_FILE
+
+logger = logging.getLogger(__name__)
+
+
+PUBLISH_VERSION = 1
+
+
+def info_path(path: Path) -> Path:
+    return path.with_suffix(".json")
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def published_signature(path: Path = PUBLISHED_BANK_FILE) -> Optional[List[int]]:
+    """Size and mtime of the publish info file; changes with every publish"""
+    return _file_signature(info_path(path))
+
+
+def _bank_version(storage) -> Dict:
+    # Round-trip through JSON so it compares equal to what was stored
+    return json.loads(json.dumps({
+        "backend": type(storage).__name__,
+        "signature": storage.bank_signature(),
+    }))
+
+
+def _to_record(q: ParsedQuestion) -> Dict:
+    record = q.to_dict()
+    manifest = get_image_manifest()
+    record["images"] = [
+        img if img.startswith("data:") else manifest.to_bank_path(img)
+        for img in q.images
+    ]
+    return record
+
+
+def publish_bank(storage=None, path: Path = PUBLISHED_BANK_FILE) -> Optional[int]:
+    """Write the current bank for server processes to map; returns the question count"""
+    storage = storage or get_question_storage()
+
+    # Taken before loading: a write during the load leaves the publish
+    # marked stale, and the next publish picks the write up
+    version = _bank_version(storage)
+    records = [_to_record(q) for q in storage.load_questions()]
+
+    if not write_snapshot(records, path, None):
+        return None
+
+    info = {
+        "version": PUBLISH_VERSION,
+        "bank": version,
+        "snapshot": _file_signature(path),
+        "questions": len(records),
+        "published_at": datetime.now().isoformat(),
+    }
+    tmp_path = info_path(path).with_suffix(".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.replace(tmp_path, info_path(path))
+    except OSError as e:
+        logger.error(f"Failed to write publish info: {e}")
+        return None
+
+    logger.info(f"Published {len(records)} questions to {path}")
+    return len(records)
+
+
+def attach_published_bank(storage, path: Path = PUBLISHED_BANK_FILE) -> Optional[SnapshotBank]:
+    """Map the published bank if it is the storage's current version, else None"""
+    try:
+        with open(info_path(path), "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable publish info: {e}")
+        return None
+
+    if info.get("version") != PUBLISH_VERSION:
+        return None
+    if info.get("snapshot") != _file_signature(path):
+        # Snapshot replaced after the info was written: a publish is under way
+        return None
+    if info.get("bank") != _bank_version(storage):
+        logger.info("Published bank is out of date; loading the bank directly")
+        return None
+
+    # Uncached: questions are decoded from the shared mapping on each access
+    return open_snapshot(path, None, cache=False)
+
+
+def publish_on_change(storage=None, path: Path = PUBLISHED_BANK_FILE, interval: float = 2.0):
+    """Republish whenever the bank changes; runs until interrupted"""
+    storage = storage or get_question_storage()
+    published = None
+    while True:
+        version = _bank_version(storage)
+        if version != published and publish_bank(storage, path) is not None:
+            published = version
+        time.sleep(interval)
@@ -0,0 +1,382 @@
+"""
+Columnar Question Table
+A read-only, column-per-field store for a whole question bank, behind
+lightweight row views that read like ParsedQuestion.
+
+A ParsedQuestion costs a __dict__, two lists, a string object per field
+and its own copy of every source_file, subject and year. Here each free
+text field is one UTF-8 buffer plus an offsets array (decoded on access),
+the repeated fields are interned category codes, page numbers and flags
+are typed arrays, and the mostly-empty images/validation_errors lists are
+sparse. Cold fields the storage layer detached stay lazy.
+"""
+
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from array import array
+from collections.abc import Sequence
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.pdf_parser import ParsedQuestion, COLD_FIELDS
+
+
+TEXT_FIELDS = ("id", "question_text", "option_a", "option_b", "option_c", "option_d",
+               "question_number") + COLD_FIELDS
+CATEGORY_FIELDS = ("source_file", "subject", "year", "correct_answer")
+SPARSE_FIELDS = ("images", "validation_errors")
+
+# Bits of the flags column
+IS_VALID = 1
+HAS_IMAGE_REFERENCE = 2
+NEEDS_REVIEW = 4
+FLAG_FIELDS = {"is_valid": IS_VALID, "has_image_reference": HAS_IMAGE_REFERENCE,
+               "needs_review": NEEDS_REVIEW}
+
+
+class _Categories:
+    """One categorical column: a code per row plus the distinct values"""
+
+    __slots__ = ("values", "index", "codes")
+
+    def __init__(self):
+        self.values: List = []
+        self.index: Dict = {}
+        self.codes = array("I")
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(sys.intern(value) if isinstance(value, str) else value)
+            self.index[value] = code
+        self.codes.append(code)
+
+    def code_of(self, value) -> Optional[int]:
+        return self.index.get(value)
+
+
+class _TextColumn:
+    """Strings packed end to end in one UTF-8 buffer; None is kept in a set"""
+
+    __slots__ = ("data", "offsets", "nulls")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("I", [0])
+        self.nulls = set()
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.nulls.add(len(self.offsets) - 1)
+        else:
+            self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, row: int) -> Optional[str]:
+        if row in self.nulls:
+            return None
+        return self.data[self.offsets[row]:self.offsets[row + 1]].decode("utf-8")
+
+
+class QuestionRow:
+    """Read-only ParsedQuestion view of one row of a QuestionTable"""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "QuestionTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._table.value(self._row, name)
+
+    def __setattr__(self, name: str, value):
+        if name in QuestionRow.__slots__:
+            object.__setattr__(self, name, value)
+            return
+        raise AttributeError("Question rows are read-only; use to_question() for an editable copy")
+
+    def __eq__(self, other):
+        if isinstance(other, (QuestionRow, ParsedQuestion)):
+            return self.to_dict() == other.to_dict()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"QuestionRow({self._row}, id={self.id!r})"
+
+    def has_value(self, name: str) -> bool:
+        """Truthiness of a field without forcing a lazy load"""
+        return self._table.has_value(self._row, name)
+
+    def to_dict(self) -> Dict:
+        return self.to_question().to_dict()
+
+    def to_question(self) -> ParsedQuestion:
+        """Independent ParsedQuestion with this row's values"""
+        values = {name: self._table.value(self._row, name)
+                  for name in ParsedQuestion.__dataclass_fields__}
+        return ParsedQuestion(**values)
+
+
+class QuestionTable(Sequence):
+    """Whole bank in columns; indexing returns QuestionRow views"""
+
+    def __init__(self):
+        self._text: Dict[str, _TextColumn] = {name: _TextColumn() for name in TEXT_FIELDS}
+        self._categories: Dict[str, _Categories] = {name: _Categories() for name in CATEGORY_FIELDS}
+        self._sparse: Dict[str, Dict[int, Tuple[str, ...]]] = {name: {} for name in SPARSE_FIELDS}
+        self._page_number = array("i")
+        self._flags = array("B")
+        # row -> (loader, names) for cold fields not loaded yet, and their
+        # values once loaded (the packed columns are append-only)
+        self._cold: Dict[int, Tuple[Callable[[], Dict], Tuple[str, ...]]] = {}
+        self._loaded: Dict[Tuple[str, int], Optional[str]] = {}
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[ParsedQuestion]) -> "QuestionTable":
+        table = cls()
+        for q in questions:
+            table.append(q)
+        return table
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "QuestionTable":
+        """Build straight from bank records (question dicts as stored in JSON)"""
+        table = cls()
+        for r in records:
+            table._append_values(r.get, None)
+        return table
+
+    def append(self, q: ParsedQuestion):
+        cold = q.__dict__.get("_cold")
+        if cold is None:
+            self._append_values(lambda name, default=None: getattr(q, name), None)
+        else:
+            # Keep detached fields detached: read the rest straight from __dict__
+            self._append_values(lambda name, default=None: q.__dict__.get(name, default), cold)
+
+    def _append_values(self, get: Callable, cold):
+        row = len(self._flags)
+        for name in TEXT_FIELDS:
+            self._text[name].append(get(name, ""))
+        for name in CATEGORY_FIELDS:
+            self._categories[name].append(get(name, None))
+        for name in SPARSE_FIELDS:
+            values = get(name, None)
+            if values:
+                self._sparse[name][row] = tuple(values)
+        self._page_number.append(get("page_number", 0) or 0)
+        self._flags.append(
+            IS_VALID * bool(get("is_valid", True))
+            | HAS_IMAGE_REFERENCE * bool(get("has_image_reference", False))
+            | NEEDS_REVIEW * bool(get("needs_review", False))
+        )
+        if cold is not None:
+            self._cold[row] = cold
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [QuestionRow(self, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("question index out of range")
+        return QuestionRow(self, index)
+
+    # ----- cells -----
+
+    def value(self, row: int, name: str):
+        column = self._text.get(name)
+        if column is not None:
+            if name in COLD_FIELDS:
+                if row in self._cold:
+                    self._load_cold(row)
+                if (name, row) in self._loaded:
+                    return self._loaded[(name, row)]
+            return column[row]
+
+        categories = self._categories.get(name)
+        if categories is not None:
+            return categories.values[categories.codes[row]]
+
+        sparse = self._sparse.get(name)
+        if sparse is not None:
+            return list(sparse.get(row, ()))
+
+        if name == "page_number":
+            return self._page_number[row]
+        if name in FLAG_FIELDS:
+            return bool(self._flags[row] & FLAG_FIELDS[name])
+        raise AttributeError(name)
+
+    def has_value(self, row: int, name: str) -> bool:
+        cold = self._cold.get(row)
+        if cold is not None and name in cold[1]:
+            return True
+        return bool(self.value(row, name))
+
+    def _load_cold(self, row: int):
+        cold = self._cold.get(row)
+        if cold is None:
+            return
+        # Values go in before the row leaves _cold: a concurrent reader that
+        # no longer finds the row must find its values (the packed column
+        # only holds "" for detached fields)
+        loader, names = cold
+        values = loader()
+        for name in names:
+            self._loaded.setdefault((name, row), values.get(name))
+        self._cold.pop(row, None)
+
+    # ----- queries -----
+
+    def category_column(self, name: str) -> Tuple[array, List]:
+        """(code per row, value per code) of a categorical field"""
+        categories = self._categories[name]
+        return categories.codes, categories.values
+
+    def flag_column(self) -> array:
+        """IS_VALID / HAS_IMAGE_REFERENCE / NEEDS_REVIEW bits per row"""
+        return self._flags
+
+    def rows_with(self, name: str) -> List[int]:
+        """Rows whose sparse field (images, validation_errors) is non-empty"""
+        return list(self._sparse[name])
+
+    def id_index(self) -> Dict[str, int]:
+        index: Dict[str, int] = {}
+        ids = self._text["id"]
+        for i in range(len(self)):
+            index.setdefault(ids[i], i)
+        return index
+
+    def positions(
+        self,
+        subject: Optional[str] = None,
+        year: Optional[str] = None,
+        source_file: Optional[str] = None,
+        has_images: Optional[bool] = None,
+        has_image_reference: Optional[bool] = None,
+        has_answer: Optional[bool] = None,
+        is_valid: Optional[bool] = None,
+        search: Optional[str] = None,
+    ) -> List[int]:
+        """Rows matching filter_questions() filters, compared on codes and flags"""
+        rows = range(len(self))
+
+        for name, value in (("subject", subject), ("year", year), ("source_file", source_file)):
+            if value is not None:
+                categories = self._categories[name]
+                code = categories.code_of(value)
+                if code is None:
+                    return []
+                rows = [i for i in rows if categories.codes[i] == code]
+
+        for bit, wanted in ((HAS_IMAGE_REFERENCE, has_image_reference), (IS_VALID, is_valid)):
+            if wanted is not None:
+                flags = self._flags
+                rows = [i for i in rows if bool(flags[i] & bit) == wanted]
+
+        if has_images is not None:
+            images = self._sparse["images"]
+            rows = [i for i in rows if (i in images) == has_images]
+
+        if has_answer is not None:
+            answers = self._categories["correct_answer"]
+            answered = {code for code, value in enumerate(answers.values) if value}
+            rows = [i for i in rows if (answers.codes[i] in answered) == has_answer]
+
+        if search:
+            needle = search.lower()
+            texts = self._text["question_text"]
+            rows = [i for i in rows if needle in texts[i].lower()]
+
+        return list(rows)
+
+
+# ----- footprint report -----
+
+SYNTHETIC_SUBJECTS = (
+    "Anatomy", "Physiology", "Biochemistry", "Pathology", "Pharmacology", "Microbiology",
+    "Forensic Medicine", "Community Medicine", "ENT", "Ophthalmology", "Medicine",
+    "Surgery", "Obstetrics & Gynaecology", "Pediatrics", "Orthopedics", "Dermatology",
+    "Psychiatry", "Radiology", "Anesthesia",
+)
+
+_WORDS = ("patient", "presents", "with", "acute", "chronic", "pain", "fever", "history",
+          "most", "likely", "diagnosis", "following", "treatment", "of", "choice", "is",
+          "the", "which", "year", "old", "male", "female", "examination", "reveals", "drug")
+
+
+def synthetic_records(count: int, seed: int = 0) -> List[Dict]:
+    """Bank records shaped like parsed FMGE questions, for measurements"""
+    rng = random.Random(seed)
+
+    def words(n):
+        return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+    records = []
+    for i in range(count):
+        source = f"FMGE_{2010 + i % 15}_{('June', 'December')[i % 2]}.pdf"
+        has_image = rng.random() < 0.1
+        records.append({
+            "id": f"{i:016x}",
+            "question_text": words(rng.randint(10, 40)).capitalize() + "?",
+            "option_a": words(rng.randint(1, 4)),
+            "option_b": words(rng.randint(1, 4)),
+            "option_c": words(rng.randint(1, 4)),
+            "option_d": words(rng.randint(1, 4)),
+            "correct_answer": rng.choice("ABCD") if rng.random() < 0.9 else None,
+            "explanation": words(rng.randint(0, 60)),
+            "source_file": source,
+            "page_number": rng.randint(1, 400),
+            "question_number": str(i % 300 + 1),
+            "images": [f"processed/images/{source[:-4]}_p{i % 400}_img0.png"] if has_image else [],
+            "subject": rng.choice(SYNTHETIC_SUBJECTS),
+            "year": str(2010 + i % 15),
+            "is_valid": True,
+            "has_image_reference": has_image,
+            "image_pattern_matched": "shown in the image" if has_image else "",
+            "needs_review": rng.random() < 0.05,
+        })
+    return records
+
+
+def _retained_bytes(build: Callable[[List[Dict]], object], payload: str) -> Tuple[int, object]:
+    """Bytes still allocated by build()'s result once the parsed records are freed"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        records = json.loads(payload)
+        result = build(records)
+        del records
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+def measure_footprint(count: int = 100_000, seed: int = 0) -> Dict[str, float]:
+    """Bytes per question held by a list of ParsedQuestion vs a QuestionTable"""
+    # Both are built from freshly parsed JSON, as the loaders do
+    payload = json.dumps(synthetic_records(count, seed))
+
+    objects_bytes, _ = _retained_bytes(
+        lambda records: [ParsedQuestion(**r) for r in records], payload)
+    table_bytes, _ = _retained_bytes(QuestionTable.from_records, payload)
+
+    return {
+        "questions": count,
+        "objects_per_question": objects_bytes / count,
+        "table_per_question": table_bytes / count,
+        "saving": 1 - table_bytes / objects_bytes,
+    }
@@ -0,0 +1,127 @@
+"""
+Shared Question Bank
+One read-only copy of the question bank per process, referenced by every
+Streamlit session instead of each session loading its own. Sessions keep
+only index arrays into it (QuestionSelection), so memory stays flat as the
+number of concurrent users grows.
+
+When a loader process has published the bank (storage/published_bank.py)
+and it is current, the process maps that file instead of loading its own.
+The bank is reloaded when the backend's files or the publication change,
+checked at most every poll_interval seconds. A reload swaps in a new bank object; selections made
+from the old one keep pointing at it until they are dropped, so an exam in
+progress never sees its questions shift.
+"""
+
+import threading
+import time
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, Optional
+import logging
+
+from core.pdf_parser import ParsedQuestion
+from storage.backends import get_question_storage
+from storage.json_storage import MergedBank
+from storage.published_bank import attach_published_bank, published_signature
+from storage.question_table import QuestionTable
+from storage.snapshot import SnapshotBank
+from config.settings import PUBLISHED_BANK_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionSelection(Sequence):
+    """Questions of one bank version, stored as an array of indices into it"""
+
+    def __init__(self, bank: Sequence[ParsedQuestion], indices: Iterable[int]):
+        self.bank = bank
+        self.indices = array("I", indices)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return QuestionSelection(self.bank, self.indices[index])
+        return self.bank[self.indices[index]]
+
+
+class SharedBank:
+    """Process-wide bank holder; the bank it returns must not be modified"""
+
+    def __init__(self, storage=None, poll_interval: float = 2.0,
+                 published_path: Path = PUBLISHED_BANK_FILE):
+        self.storage = storage or get_question_storage()
+        self.poll_interval = poll_interval
+        self.published_path = published_path
+        self.version = 0  # bumped on every (re)load
+
+        self._bank: Optional[Sequence[ParsedQuestion]] = None
+        self._index = None  # QuestionIndex of _bank, built on first use
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Sequence[ParsedQuestion]:
+        """The current bank, reloaded first if its files have changed"""
+        if self._bank is not None and time.monotonic() - self._checked_at < self.poll_interval:
+            return self._bank
+
+        with self._lock:
+            now = time.monotonic()
+            if self._bank is not None and now - self._checked_at < self.poll_interval:
+                return self._bank  # another session just checked
+            self._checked_at = now
+
+            # Read the signature before loading: a write during the load
+            # then simply triggers another reload on the next check
+            signature = (self.storage.bank_signature(), published_signature(self.published_path))
+            if self._bank is None or signature != self._signature:
+                bank = attach_published_bank(self.storage, self.published_path)
+                if bank is None:
+                    bank = self.storage.load_questions()
+                if not isinstance(bank, (SnapshotBank, MergedBank)):
+                    # Plain lists (the sqlite backend) are packed into columns
+                    bank = QuestionTable.from_questions(bank)
+                self._bank, self._signature, self._index = bank, signature, None
+                self.version += 1
+                logger.info(f"Loaded shared question bank v{self.version} ({len(bank)} questions)")
+            return self._bank
+
+    def index(self):
+        """Filter masks for the current bank, built once per bank version"""
+        # Imported here: engine modules build on storage, not the reverse
+        from engine.question_index import QuestionIndex
+
+        bank = self.get()
+        index = self._index
+        if index is None or index.bank is not bank:
+            with self._lock:
+                if self._index is None or self._index.bank is not bank:
+                    self._index = QuestionIndex(bank)
+                index = self._index
+        return index
+
+    def select(self, indices: Iterable[int]) -> QuestionSelection:
+        return QuestionSelection(self.get(), indices)
+
+    def sample(self, count: int, **filters) -> QuestionSelection:
+        """Random selection of up to count questions matching filters"""
+        index = self.index()
+        return QuestionSelection(index.bank, index.sample(count, **filters))
+
+
+_SHARED_BANK: Optional[SharedBank] = None
+_SHARED_BANK_LOCK = threading.Lock()
+
+
+def get_shared_bank() -> SharedBank:
+    """Process-wide bank for the configured storage backend"""
+    global _SHARED_BANK
+    if _SHARED_BANK is None:
+        with _SHARED_BANK_LOCK:
+            if _SHARED_BANK is None:
+                _SHARED_BANK = SharedBank()
+    return _SHARED_BANK
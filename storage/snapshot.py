@@ -0,0 +1,347 @@
+"""
+Binary Question Bank Snapshot
+Memory-mapped, versioned snapshot of questions.json for fast startup.
+JSON stays the interchange format; the snapshot is derived from it at save
+time and ignored whenever it no longer matches the JSON file. The same
+format is used for the bank published to all server processes, which is
+bound to no source file.
+
+Layout (little endian):
+    header      HEADER struct, see below
+    records     record_count x RECORD (fixed width)
+    flags       record_count bytes, copy of each record's flag byte
+    str index   string_count x (offset u32, length u32) into str data
+    str data    utf-8 strings, each distinct string stored once
+    stats       utf-8 JSON of the bank's stats counters
+"""
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Optional, Iterable
+import logging
+
+from core.pdf_parser import ParsedQuestion, COLD_FIELDS
+from storage.bank_stats import accumulate_records, empty_counters, finalise
+from storage.image_store import get_image_manifest
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"FMGESNAP"
+SNAPSHOT_VERSION = 1
+
+# magic, version, reserved, record_count, string_count,
+# records/flags/str index/str data/stats offsets, stats length,
+# source JSON mtime_ns and size
+HEADER = struct.Struct("<8sHHII5QIqQ")
+
+# Fields stored as string ids, in record order
+STRING_FIELDS = (
+    "id", "question_text", "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "explanation", "source_file", "question_number",
+    "images", "subject", "year", "image_pattern_matched",
+)
+FIELD_POS = {name: i for i, name in enumerate(STRING_FIELDS)}
+
+# String ids..., page_number, flags
+RECORD = struct.Struct(f"<{len(STRING_FIELDS)}IIB3x")
+STR_INDEX = struct.Struct("<II")
+NONE_ID = 0xFFFFFFFF
+
+# Flag bits
+IS_VALID = 1
+HAS_IMAGE_REFERENCE = 2
+NEEDS_REVIEW = 4
+HAS_IMAGES = 8
+HAS_ANSWER = 16
+HAS_EXPLANATION = 32
+
+# filter_questions() boolean filters -> flag bit
+FLAG_FILTERS = {
+    "is_valid": IS_VALID,
+    "has_image_reference": HAS_IMAGE_REFERENCE,
+    "has_images": HAS_IMAGES,
+    "has_answer": HAS_ANSWER,
+}
+STRING_FILTERS = ("subject", "year", "source_file")
+
+
+def _source_signature(source: Optional[Path]):
+    if source is None:
+        return 0, 0
+    st = source.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def write_snapshot(records: List[Dict], path: Path, source: Optional[Path]) -> bool:
+    """
+    Write a snapshot for bank records (question dicts as stored in JSON,
+    cold fields included). source is the JSON file the snapshot mirrors,
+    or None for a standalone snapshot.
+    """
+    strings: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NONE_ID
+        sid = strings.get(value)
+        if sid is None:
+            sid = strings[value] = len(strings)
+        return sid
+
+    packed = bytearray()
+    flags_column = bytearray()
+    for r in records:
+        flags = (
+            (IS_VALID if r.get("is_valid", True) else 0)
+            | (HAS_IMAGE_REFERENCE if r.get("has_image_reference") else 0)
+            | (NEEDS_REVIEW if r.get("needs_review") else 0)
+            | (HAS_IMAGES if r.get("images") else 0)
+            | (HAS_ANSWER if r.get("correct_answer") else 0)
+            | (HAS_EXPLANATION if r.get("explanation") else 0)
+        )
+        ids = [
+            intern("\n".join(r.get("images") or []) if name == "images" else r.get(name))
+            for name in STRING_FIELDS
+        ]
+        packed += RECORD.pack(*ids, r.get("page_number") or 0, flags)
+        flags_column.append(flags)
+
+    str_index = bytearray()
+    str_data = bytearray()
+    for value in strings:  # dicts keep insertion order == id order
+        encoded = value.encode("utf-8")
+        str_index += STR_INDEX.pack(len(str_data), len(encoded))
+        str_data += encoded
+
+    counters = accumulate_records(empty_counters(), records)
+    stats = json.dumps(counters, ensure_ascii=False).encode("utf-8")
+
+    records_off = HEADER.size
+    flags_off = records_off + len(packed)
+    index_off = flags_off + len(flags_column)
+    data_off = index_off + len(str_index)
+    stats_off = data_off + len(str_data)
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        mtime_ns, size = _source_signature(source)
+        header = HEADER.pack(
+            MAGIC, SNAPSHOT_VERSION, 0, len(records), len(strings),
+            records_off, flags_off, index_off, data_off, stats_off, len(stats),
+            mtime_ns, size,
+        )
+        with open(tmp_path, "wb") as f:
+            for chunk in (header, packed, flags_column, str_index, str_data, stats):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        return True
+
+    except OSError as e:
+        # On Windows a snapshot mapped by a running reader can't be replaced;
+        # it goes stale and readers fall back to JSON until the next save
+        logger.warning(f"Could not write snapshot {path}: {e}")
+        return False
+
+
+def open_snapshot(path: Path, source: Optional[Path],
+                  cache: bool = True) -> Optional["SnapshotBank"]:
+    """Map a snapshot if it exists and still matches its source JSON (if any)"""
+    if not path.exists() or (source is not None and not source.exists()):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not map snapshot {path}: {e}")
+        return None
+
+    if len(mm) < HEADER.size:
+        mm.close()
+        return None
+
+    header = HEADER.unpack_from(mm, 0)
+    magic, version = header[0], header[1]
+    signature = (header[-2], header[-1])
+
+    if magic != MAGIC or version != SNAPSHOT_VERSION or signature != _source_signature(source):
+        mm.close()
+        return None
+
+    return SnapshotBank(mm, header, cache=cache)
+
+
+class SnapshotBank(Sequence):
+    """
+    Read-only question bank over a mapped snapshot.
+    Questions are materialised on first access and, unless cache is off,
+    cached; counts and flag filters read the record headers without
+    materialising anything. Uncached, the process holds nothing beyond the
+    shared mapping.
+    """
+
+    def __init__(self, mm: mmap.mmap, header: tuple, cache: bool = True):
+        (_, _, _, self._count, self._string_count,
+         self._records_off, self._flags_off, self._index_off,
+         self._data_off, self._stats_off, self._stats_len, _, _) = header
+        self._mm = mm
+        self._cache: Optional[List[Optional[ParsedQuestion]]] = [None] * self._count if cache else None
+        self._ids: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("snapshot index out of range")
+
+        if self._cache is None:
+            return self._materialise(index)
+        question = self._cache[index]
+        if question is None:
+            question = self._cache[index] = self._materialise(index)
+        return question
+
+    def peek(self, index: int) -> ParsedQuestion:
+        """bank[index] without adding it to the cache, for one-pass scans"""
+        if self._cache is None:
+            return self._materialise(index)
+        question = self._cache[index]
+        return question if question is not None else self._materialise(index)
+
+    def record_buffer(self) -> memoryview:
+        """The fixed-width records, for building column views over them"""
+        return memoryview(self._mm)[self._records_off:self._records_off + self._count * RECORD.size]
+
+    def string(self, sid: int) -> Optional[str]:
+        """A string by id; string fields of records hold these ids"""
+        return self._string(sid)
+
+    def _string(self, sid: int) -> Optional[str]:
+        if sid == NONE_ID:
+            return None
+        offset, length = STR_INDEX.unpack_from(self._mm, self._index_off + sid * STR_INDEX.size)
+        start = self._data_off + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _record(self, index: int) -> tuple:
+        return RECORD.unpack_from(self._mm, self._records_off + index * RECORD.size)
+
+    def _field(self, record: tuple, name: str) -> Optional[str]:
+        return self._string(record[FIELD_POS[name]])
+
+    def _materialise(self, index: int) -> ParsedQuestion:
+        record = self._record(index)
+        flags = record[-1]
+
+        manifest = get_image_manifest()
+        images = []
+        for img_path in (self._field(record, "images") or "").split("\n"):
+            if not img_path:
+                continue
+            if img_path.startswith("data:"):
+                images.append(img_path)
+            else:
+                abs_path = manifest.resolve(img_path)
+                images.append(str(abs_path) if abs_path is not None else img_path)
+
+        question = ParsedQuestion(
+            id=self._field(record, "id"),
+            question_text=self._field(record, "question_text"),
+            option_a=self._field(record, "option_a"),
+            option_b=self._field(record, "option_b"),
+            option_c=self._field(record, "option_c"),
+            option_d=self._field(record, "option_d"),
+            correct_answer=self._field(record, "correct_answer"),
+            explanation=None,
+            source_file=self._field(record, "source_file") or "unknown",
+            page_number=record[len(STRING_FIELDS)],
+            question_number=self._field(record, "question_number") or "",
+            images=images,
+            subject=self._field(record, "subject"),
+            year=self._field(record, "year"),
+            is_valid=bool(flags & IS_VALID),
+            has_image_reference=bool(flags & HAS_IMAGE_REFERENCE),
+            needs_review=bool(flags & NEEDS_REVIEW),
+        )
+
+        present = [name for name in COLD_FIELDS if record[FIELD_POS[name]] != NONE_ID
+                   and self._field(record, name)]
+        if present:
+            question.detach_cold_fields(partial(self._cold_values, index), present)
+
+        return question
+
+    def _cold_values(self, index: int) -> Dict:
+        record = self._record(index)
+        return {name: self._field(record, name) for name in COLD_FIELDS}
+
+    def id_index(self) -> Dict[str, int]:
+        """Question id -> index, built on first use"""
+        if self._ids is None:
+            self._ids = {}
+            for i in range(self._count):
+                self._ids.setdefault(self._string(self._record(i)[FIELD_POS["id"]]), i)
+        return self._ids
+
+    def counters(self) -> Dict:
+        """Stats counters computed when the snapshot was written"""
+        start = self._stats_off
+        return json.loads(self._mm[start:start + self._stats_len].decode("utf-8"))
+
+    def stats(self) -> Dict:
+        return finalise(self.counters())
+
+    def positions(self, search: Optional[str] = None, **filters) -> List[int]:
+        """Indices matching filter_questions() filters, materialising nothing"""
+        flags = self._mm[self._flags_off:self._flags_off + self._count]
+
+        required = 0
+        forbidden = 0
+        for name, bit in FLAG_FILTERS.items():
+            value = filters.pop(name, None)
+            if value is True:
+                required |= bit
+            elif value is False:
+                forbidden |= bit
+
+        matched: Iterable[int] = (
+            i for i, f in enumerate(flags)
+            if f & required == required and not f & forbidden
+        )
+
+        wanted = {name: filters.pop(name) for name in STRING_FILTERS
+                  if filters.get(name) is not None}
+        for name in list(filters):
+            if filters[name] is None:
+                filters.pop(name)
+        if filters:
+            raise ValueError(f"Unknown filter: {', '.join(filters)}")
+
+        if wanted or search:
+            search = search.lower() if search else None
+            matched = [
+                i for i in matched
+                if self._record_matches(self._record(i), wanted, search)
+            ]
+
+        return list(matched)
+
+    def _record_matches(self, record: tuple, wanted: Dict, search: Optional[str]) -> bool:
+        for name, value in wanted.items():
+            if self._field(record, name) != value:
+                return False
+        if search is not None:
+            return search in (self._field(record, "question_text") or "").lower()
+        return True
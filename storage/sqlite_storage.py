@@ -0,0 +1,421 @@
+"""SQLite Storage Module - indexed question bank backend"""
+
+import json
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+import logging
+
+from core.pdf_parser import ParsedQuestion, COLD_FIELDS
+from core.question_cleaner import generate_question_hashes
+from storage.backup_store import BackupStore
+from storage.image_store import get_image_manifest
+from storage.html_export import IMAGES_INLINE, export_questions_html
+from config.settings import DATA_DIR, QUESTIONS_DB
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    position INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    question_text TEXT NOT NULL,
+    option_a TEXT,
+    option_b TEXT,
+    option_c TEXT,
+    option_d TEXT,
+    correct_answer TEXT,
+    explanation TEXT,
+    source_file TEXT NOT NULL,
+    page_number INTEGER NOT NULL DEFAULT 0,
+    question_number TEXT NOT NULL DEFAULT '',
+    images TEXT NOT NULL DEFAULT '[]',
+    subject TEXT,
+    year TEXT,
+    is_valid INTEGER NOT NULL DEFAULT 1,
+    has_image_reference INTEGER NOT NULL DEFAULT 0,
+    image_pattern_matched TEXT NOT NULL DEFAULT '',
+    needs_review INTEGER NOT NULL DEFAULT 0,
+    has_images INTEGER NOT NULL DEFAULT 0,
+    has_answer INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_questions_id ON questions(id);
+CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions(subject);
+CREATE INDEX IF NOT EXISTS idx_questions_year ON questions(year);
+CREATE INDEX IF NOT EXISTS idx_questions_source ON questions(source_file);
+CREATE INDEX IF NOT EXISTS idx_questions_image_ref ON questions(has_image_reference, has_images);
+CREATE INDEX IF NOT EXISTS idx_questions_answer ON questions(has_answer, is_valid);
+
+CREATE TABLE IF NOT EXISTS question_hashes (
+    hash TEXT PRIMARY KEY,
+    question_id TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+COLUMNS = [
+    "id", "question_text", "option_a", "option_b", "option_c", "option_d",
+    "correct_answer", "explanation", "source_file", "page_number",
+    "question_number", "images", "subject", "year", "is_valid",
+    "has_image_reference", "image_pattern_matched", "needs_review",
+    "has_images", "has_answer",
+]
+
+# Everything but the cold fields, which load on first access
+HOT_SELECT = (
+    "SELECT position, "
+    + ", ".join(c for c in COLUMNS if c not in COLD_FIELDS)
+    + ", " + ", ".join(f"COALESCE({c}, '') != '' AS has_{c}" for c in COLD_FIELDS)
+    + " FROM questions"
+)
+
+# Filter name -> column; booleans are stored as 0/1
+FILTER_COLUMNS = {
+    "subject": "subject",
+    "year": "year",
+    "source_file": "source_file",
+    "has_images": "has_images",
+    "has_image_reference": "has_image_reference",
+    "has_answer": "has_answer",
+    "is_valid": "is_valid",
+}
+
+
+class SQLiteQuestionStorage:
+    """
+    Same API as QuestionStorage, backed by an indexed SQLite database.
+    Filters, counts and random sampling run as SQL instead of over a
+    fully parsed list.
+    """
+
+    def __init__(self, db_path: Path = QUESTIONS_DB):
+        self.db_path = db_path
+        self.backup_dir = DATA_DIR / "backups"
+        self.backup_dir.mkdir(exist_ok=True)
+        self.backups = BackupStore(self.backup_dir)
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_questions(self, questions: List[ParsedQuestion], create_backup: bool = True) -> bool:
+        try:
+            if create_backup and self.db_path.exists():
+                self._create_backup()
+
+            with self._connect() as conn:
+                conn.execute("DELETE FROM questions")
+                conn.execute("DELETE FROM question_hashes")
+                self._insert(conn, questions)
+
+            logger.info(f"Saved {len(questions)} questions to {self.db_path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to save questions: {e}")
+            return False
+
+    def _insert(self, conn: sqlite3.Connection, questions: List[ParsedQuestion]):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        conn.executemany(
+            f"INSERT INTO questions ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+            (self._to_row(q) for q in questions),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO question_hashes (hash, question_id) VALUES (?, ?)",
+            ((h, q.id) for q in questions for h in generate_question_hashes(q)),
+        )
+
+    @staticmethod
+    def _to_row(q: ParsedQuestion) -> Tuple:
+        return (
+            q.id, q.question_text, q.option_a, q.option_b, q.option_c, q.option_d,
+            q.correct_answer, q.explanation, q.source_file, q.page_number,
+            q.question_number, json.dumps([get_image_manifest().bank_path(p) for p in q.images]),
+            q.subject, q.year,
+            int(q.is_valid), int(q.has_image_reference), q.image_pattern_matched,
+            int(q.needs_review), int(bool(q.images)), int(bool(q.correct_answer)),
+        )
+
+    def _from_row(self, row: sqlite3.Row) -> ParsedQuestion:
+        manifest = get_image_manifest()
+        images = []
+        for img_path in json.loads(row["images"]):
+            if img_path.startswith("data:"):
+                images.append(img_path)
+            else:
+                abs_path = manifest.resolve(img_path)
+                images.append(str(abs_path) if abs_path is not None else img_path)
+
+        question = ParsedQuestion(
+            id=row["id"],
+            question_text=row["question_text"],
+            option_a=row["option_a"],
+            option_b=row["option_b"],
+            option_c=row["option_c"],
+            option_d=row["option_d"],
+            correct_answer=row["correct_answer"],
+            explanation=None,
+            source_file=row["source_file"],
+            page_number=row["page_number"],
+            question_number=row["question_number"],
+            images=images,
+            subject=row["subject"],
+            year=row["year"],
+            is_valid=bool(row["is_valid"]),
+            has_image_reference=bool(row["has_image_reference"]),
+            image_pattern_matched="",
+            needs_review=bool(row["needs_review"]),
+        )
+        
+        present = [name for name in COLD_FIELDS if row[f"has_{name}"]]
+        if present:
+            question.detach_cold_fields(partial(self._load_cold, row["position"]), present)
+        
+        return question
+    
+    def _load_cold(self, position: int) -> Dict:
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(COLD_FIELDS)} FROM questions WHERE position = ?", (position,)
+            ).fetchone()
+        return dict(row) if row else {}
+
+    def load_questions(self) -> List[ParsedQuestion]:
+        return self.query_questions()
+
+    def bank_signature(self) -> Tuple:
+        """Size and mtime of the database and its WAL; changes with every write"""
+        signature = []
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            if path.exists():
+                st = path.stat()
+                signature.append((st.st_mtime_ns, st.st_size))
+            else:
+                signature.append(None)
+        return tuple(signature)
+
+    def _create_backup(self):
+        # Take a consistent copy with the backup API, then chunk that copy
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as tmp_dir:
+            copy_path = Path(tmp_dir) / self.db_path.name
+            src = sqlite3.connect(self.db_path)
+            dst = sqlite3.connect(copy_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            timestamp = self.backups.create_backup([copy_path], Path(tmp_dir))
+        logger.info(f"Created backup: {timestamp}")
+
+    def list_backups(self) -> List[str]:
+        """Backups of this database, newest first"""
+        return self.backups.list_backups(self.db_path.name)
+
+    def restore_backup(self, timestamp: str) -> bool:
+        """Replace the database with a backup; the current one is backed up first"""
+        try:
+            self.backups.load_manifest(timestamp)
+            if self.db_path.exists():
+                self._create_backup()
+            self.backups.restore(timestamp, self.db_path.parent)
+            return True
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.error(f"Failed to restore backup {timestamp}: {e}")
+            return False
+
+    def get_stats(self) -> Dict:
+        with self._connect() as conn:
+            totals = conn.execute("""
+                SELECT COUNT(*) AS total,
+                       SUM(has_answer) AS with_answers,
+                       SUM(explanation IS NOT NULL AND explanation != '') AS with_explanations,
+                       SUM(has_images) AS with_images,
+                       SUM(needs_review) AS needs_review
+                FROM questions
+            """).fetchone()
+
+            if not totals["total"]:
+                return {"total": 0}
+
+            subject_counts = {
+                row["subject"]: row["n"]
+                for row in conn.execute("""
+                    SELECT COALESCE(subject, 'Untagged') AS subject, COUNT(*) AS n
+                    FROM questions GROUP BY 1 ORDER BY MIN(position)
+                """)
+            }
+            source_counts = {
+                row["source_file"]: row["n"]
+                for row in conn.execute("""
+                    SELECT source_file, COUNT(*) AS n
+                    FROM questions GROUP BY 1 ORDER BY MIN(position)
+                """)
+            }
+
+        total = totals["total"]
+        return {
+            "total": total,
+            "with_answers": totals["with_answers"],
+            "with_explanations": totals["with_explanations"],
+            "with_images": totals["with_images"],
+            "needs_review": totals["needs_review"],
+            "by_subject": subject_counts,
+            "by_source": source_counts,
+            "answer_coverage": f"{totals['with_answers']/total*100:.1f}%",
+        }
+
+    def add_questions(self, new_questions: List[ParsedQuestion], deduplicate: bool = True) -> int:
+        accepted = []
+
+        with self._connect() as conn:
+            for q in new_questions:
+                if deduplicate:
+                    hashes = generate_question_hashes(q)
+                    marks = ", ".join("?" for _ in hashes)
+                    seen = conn.execute(
+                        f"""SELECT 1 FROM questions WHERE id = ?
+                            UNION ALL
+                            SELECT 1 FROM question_hashes WHERE hash IN ({marks})
+                            LIMIT 1""",
+                        (q.id, *hashes),
+                    ).fetchone()
+                    if seen:
+                        continue
+
+                # Insert one at a time so later duplicates in the batch are caught
+                self._insert(conn, [q])
+                accepted.append(q)
+
+        return len(accepted)
+
+    def get_question(self, q_id: str) -> Optional[ParsedQuestion]:
+        with self._connect() as conn:
+            row = conn.execute(f"{HOT_SELECT} WHERE id = ? ORDER BY position LIMIT 1", (q_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    # Edits apply to the first question with an id, as in the JSON backend
+    FIRST_WITH_ID = "position = (SELECT MIN(position) FROM questions WHERE id = ?)"
+
+    def update_question(self, question: ParsedQuestion) -> bool:
+        """Replace a stored question (matched by id), keeping its position"""
+        assignments = ", ".join(f"{c} = ?" for c in COLUMNS[1:])
+        with self._connect() as conn:
+            updated = conn.execute(
+                f"UPDATE questions SET {assignments} WHERE {self.FIRST_WITH_ID}",
+                (*self._to_row(question)[1:], question.id),
+            ).rowcount
+            if updated:
+                self._rehash(conn, question.id)
+        return bool(updated)
+
+    def delete_question(self, q_id: str) -> bool:
+        with self._connect() as conn:
+            deleted = conn.execute(f"DELETE FROM questions WHERE {self.FIRST_WITH_ID}", (q_id,)).rowcount
+            if deleted:
+                self._rehash(conn, q_id)
+        return bool(deleted)
+
+    def _rehash(self, conn: sqlite3.Connection, q_id: str):
+        """Recompute the duplicate-detection hashes of the questions with an id"""
+        conn.execute("DELETE FROM question_hashes WHERE question_id = ?", (q_id,))
+        rows = conn.execute(f"{HOT_SELECT} WHERE id = ? ORDER BY position", (q_id,)).fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO question_hashes (hash, question_id) VALUES (?, ?)",
+            ((h, q_id) for row in rows for h in generate_question_hashes(self._from_row(row))),
+        )
+
+    def compact(self) -> bool:
+        """Reclaim space left by deletes and updates"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("VACUUM")
+            finally:
+                conn.close()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Failed to compact {self.db_path}: {e}")
+            return False
+
+    def load_hash_index(self) -> Tuple[Set[str], Set[str]]:
+        """Return (question ids, duplicate-detection hashes) for the stored bank"""
+        with self._connect() as conn:
+            ids = {row[0] for row in conn.execute("SELECT id FROM questions")}
+            hashes = {row[0] for row in conn.execute("SELECT hash FROM question_hashes")}
+        return ids, hashes
+
+    def get_questions_needing_images(self) -> List[ParsedQuestion]:
+        """Get questions that reference images but don't have them"""
+        return self.query_questions(has_image_reference=True, has_images=False)
+
+    @staticmethod
+    def _where(filters: Dict) -> Tuple[str, List]:
+        clauses = []
+        params = []
+
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name == "search":
+                clauses.append("question_text LIKE ? ESCAPE '\\'")
+                escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{escaped}%")
+            elif name in FILTER_COLUMNS:
+                clauses.append(f"{FILTER_COLUMNS[name]} = ?")
+                params.append(int(value) if isinstance(value, bool) else value)
+            else:
+                raise ValueError(f"Unknown filter: {name}")
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def count_questions(self, **filters) -> int:
+        where, params = self._where(filters)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM questions {where}", params).fetchone()[0]
+
+    def query_questions(self, limit: Optional[int] = None, offset: int = 0, **filters) -> List[ParsedQuestion]:
+        where, params = self._where(filters)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"{HOT_SELECT} {where} ORDER BY position LIMIT ? OFFSET ?",
+                (*params, -1 if limit is None else limit, offset),
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def sample_questions(self, count: int, **filters) -> List[ParsedQuestion]:
+        """Uniform random sample, drawn in SQL; only the chosen rows are materialised"""
+        where, params = self._where(filters)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"{HOT_SELECT} {where} ORDER BY random() LIMIT ?", (*params, count)
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def export_with_images_html(self, output_path: Path, limit: int = 100, per_page: int = 100,
+                                images: str = IMAGES_INLINE) -> int:
+        """Export questions with images to paginated HTML files for viewing"""
+        def pages():
+            offset = 0
+            while True:
+                rows = self.query_questions(limit=per_page, offset=offset, has_image_reference=True)
+                if not rows:
+                    return
+                yield from rows
+                offset += per_page
+
+        return export_questions_html(pages(), output_path, limit, per_page, images)
@@ -6,7 +6,6 @@ Complete interface with image display
 import streamlit as st
 from pathlib import Path
 import sys
-import base64
 import random
 from datetime import datetime
 import time
@@ -14,23 +13,33 @@ import time
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from storage.json_storage import QuestionStorage
-from config.settings import DATA_DIR, EXAM_CONFIG
+from storage.backends import get_question_storage
+from storage.image_store import get_image_manifest
+from storage.shared_bank import QuestionSelection, get_shared_bank
+from config.settings import EXAM_CONFIG, REVIEW_CONFIG, STORAGE_BACKEND
 
 # ===== MOCK EXAM IMPORTS =====
 from engine.mock_exam_engine import (
     init_mock_session,
     start_exam_if_needed,
-    remaining_time
+    remaining_time,
+    save_mock_state,
+    submit_mock_state,
+    track_question_time,
+    mock_attempt_payload
 )
 from storage.json_storage import MockExamStorage
 from engine.mock_analysis_adapter import analyze_mock_attempt
+from engine.mock_papers import attempt_questions, mock_id_for
+from engine.exposure import get_exposure_store
+from engine.review_scheduler import get_review_scheduler
+from engine.irt import AdaptiveSelector, get_irt_parameters
 from storage.mock_users import validate_user
 
 
 def get_current_mock_id():
     """Returns the official mock ID for today."""
-    return f"mock_fmge_{datetime.now().strftime('%Y_%m_%d')}"
+    return mock_id_for(datetime.now().date())
 
 
 # Page config
@@ -129,23 +138,9 @@ st.markdown("""
 def load_image_as_base64(image_path: str) -> str:
     """Robust image loader for Streamlit Cloud + Windows."""
     try:
-        image_path = image_path.replace("\\", "/")
-        path = Path(image_path)
-
-        if not path.is_absolute():
-            path = DATA_DIR / path
-
-        if not path.exists():
-            return None
-
-        with open(path, "rb") as f:
-            data = base64.b64encode(f.read()).decode("utf-8")
-
-        ext = path.suffix.lower().replace(".", "")
-        if ext == "jpg":
-            ext = "jpeg"
-
-        return f"data:image/{ext};base64,{data}"
+        # Backslashes and DATA_DIR-relative paths are handled by the manifest,
+        # which also keeps recently shown images encoded for every session
+        return get_image_manifest().data_uri(image_path)
 
     except Exception as e:
         st.error(f"Error loading image: {e}")
@@ -181,12 +176,108 @@ def display_question_image(question):
         ''', unsafe_allow_html=True)
 
 
+def get_storage():
+    """Question bank backend, created once per session"""
+    if 'storage' not in st.session_state:
+        st.session_state.storage = get_question_storage()
+    return st.session_state.storage
+
+
+def get_bank():
+    """The process-wide question bank; sessions never hold their own copy"""
+    return get_shared_bank().get()
+
+
+def get_question_index():
+    """Filter masks over the shared bank, built once per bank version"""
+    return get_shared_bank().index()
+
+
+def get_bank_stats() -> dict:
+    """Bank aggregates from the stats sidecar - no questions are scanned"""
+    return get_storage().get_stats()
+
+
+def in_sql(filters: dict) -> bool:
+    """Whether filters run in SQL: on the sqlite backend, unless they carry a history mask"""
+    return STORAGE_BACKEND == "sqlite" and "within" not in filters
+
+
+def count_matching(**filters) -> int:
+    """Count questions matching filters - in SQL on the sqlite backend"""
+    if in_sql(filters):
+        return get_storage().count_questions(**filters)
+    return get_question_index().count(**filters)
+
+
+def sample_matching(count: int, **filters):
+    """
+    Random selection of matching questions - in SQL on the sqlite backend,
+    so it agrees with count_matching; otherwise held as indices into the
+    shared bank
+    """
+    if in_sql(filters):
+        return get_storage().sample_questions(count, **filters)
+    return get_shared_bank().sample(count, **filters)
+
+
+def page_matching(limit: int, offset: int, **filters) -> list:
+    """One page of matching questions - in SQL on the sqlite backend"""
+    if in_sql(filters):
+        return get_storage().query_questions(limit=limit, offset=offset, **filters)
+    index = get_question_index()
+    return [index.bank[i] for i in index.positions(**filters)[offset:offset + limit]]
+
+
+def record_exposure(questions, answers: dict):
+    """Add a submitted exam to the logged-in user's question history"""
+    user_id = st.session_state.get('user_id')
+    if not user_id:
+        return
+    question_ids, outcomes = [], []
+    for q in questions:
+        answer = answers.get(q.id)
+        question_ids.append(q.id)
+        outcomes.append(None if answer is None else answer == q.correct_answer)
+    get_exposure_store().record(user_id, get_question_index(), question_ids, outcomes)
+
+
+def schedule_reviews(results):
+    """Reschedule the logged-in user's review cards from an exam's QuestionResults"""
+    user_id = st.session_state.get('user_id')
+    if user_id:
+        get_review_scheduler().schedule(user_id, results)
+
+
+def practice_analysis():
+    """SessionAnalysis of the current practice exam"""
+    questions = st.session_state.exam_questions
+    answers = st.session_state.exam_answers
+    return analyze_mock_attempt(
+        user_id=st.session_state.user_id,
+        mock_id="practice",
+        questions=questions,
+        answers={i: answers.get(q.id) for i, q in enumerate(questions)},
+        start_time=st.session_state.exam_start_time.timestamp(),
+        end_time=time.time(),
+    )
+
+
+def history_mask(history: str):
+    """Practice history filter as a mask over the bank, None for no filter"""
+    user_id = st.session_state.get('user_id')
+    if not user_id or history == "All Questions":
+        return None
+    store, index = get_exposure_store(), get_question_index()
+    if history == "Unseen Only":
+        return store.mask(user_id, index, unseen=True)
+    if history == "Previously Wrong":
+        return store.mask(user_id, index, wrong=True)
+    return store.mask(user_id, index, not_seen_days=30)
+
+
 def init_session_state():
     """Initialize session state variables"""
-    if 'questions' not in st.session_state:
-        storage = QuestionStorage()
-        st.session_state.questions = storage.load_questions()
-
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 'home'
 
@@ -240,6 +331,10 @@ def render_sidebar():
         st.session_state.current_page = 'mock_login'
         st.rerun()
 
+    if st.sidebar.button("🧠 Adaptive Practice", use_container_width=True):
+        st.session_state.current_page = 'adaptive'
+        st.rerun()
+
     if st.sidebar.button("📖 Browse Questions", use_container_width=True):
         st.session_state.current_page = 'browse'
         st.rerun()
@@ -254,11 +349,10 @@ def render_sidebar():
 
     st.sidebar.markdown("---")
 
-    total = len(st.session_state.questions)
-    with_images = sum(1 for q in st.session_state.questions if q.images)
+    stats = get_bank_stats()
 
-    st.sidebar.metric("Total Questions", total)
-    st.sidebar.metric("With Images", with_images)
+    st.sidebar.metric("Total Questions", stats.get("total", 0))
+    st.sidebar.metric("With Images", stats.get("with_images", 0))
 
 
 def render_home():
@@ -274,20 +368,20 @@ def render_home():
     Practice with real FMGE questions including **image-based questions**.
     """)
 
-    questions = st.session_state.questions
+    stats = get_bank_stats()
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
         st.markdown(f'''
             <div class="stat-card">
-                <h2>{len(questions)}</h2>
+                <h2>{stats.get("total", 0)}</h2>
                 <p>Total Questions</p>
             </div>
         ''', unsafe_allow_html=True)
 
     with col2:
-        with_ans = sum(1 for q in questions if q.correct_answer)
+        with_ans = stats.get("with_answers", 0)
         st.markdown(f'''
             <div class="stat-card">
                 <h2>{with_ans}</h2>
@@ -296,7 +390,7 @@ def render_home():
         ''', unsafe_allow_html=True)
 
     with col3:
-        with_img = sum(1 for q in questions if q.images)
+        with_img = stats.get("with_images", 0)
         st.markdown(f'''
             <div class="stat-card">
                 <h2>{with_img}</h2>
@@ -305,7 +399,7 @@ def render_home():
         ''', unsafe_allow_html=True)
 
     with col4:
-        subjects = len(set(q.subject for q in questions if q.subject))
+        subjects = len([s for s in stats.get("by_subject", {}) if s != "Untagged"])
         st.markdown(f'''
             <div class="stat-card">
                 <h2>{subjects}</h2>
@@ -349,22 +443,17 @@ def render_home():
 
 def start_practice_exam(num_questions: int, images_only: bool = False):
     """Start a new practice exam session"""
-    questions = st.session_state.questions
-
-    available = [q for q in questions if q.is_valid and q.correct_answer]
+    filters = {"is_valid": True, "has_answer": True}
 
     if images_only:
-        available = [q for q in available if q.images]
+        filters["has_images"] = True
 
-    if len(available) < num_questions:
-        num_questions = len(available)
+    selected = sample_matching(num_questions, **filters)
 
-    if num_questions == 0:
+    if not selected:
         st.error("No questions available!")
         return
 
-    selected = random.sample(available, num_questions)
-
     st.session_state.exam_questions = selected
     st.session_state.exam_answers = {}
     st.session_state.exam_submitted = False
@@ -474,6 +563,8 @@ def render_exam():
     with col5:
         if st.button("📤 Submit", type="primary"):
             st.session_state.exam_submitted = True
+            record_exposure(questions, st.session_state.exam_answers)
+            schedule_reviews(practice_analysis().question_results)
             st.rerun()
 
     # ── Question Navigator Grid ──
@@ -597,47 +688,52 @@ def render_exam_results():
                 f"Q{i+1}. {q.question_text[:80]}...",
                 expanded=not is_correct and is_attempted,
             ):
-                st.markdown(f"**Question:** {q.question_text}")
-                display_question_image(q)
-                st.markdown("---")
-
-                for opt in ['A', 'B', 'C', 'D']:
-                    opt_text = getattr(q, f'option_{opt.lower()}')
-
-                    if opt == q.correct_answer and opt == user_ans:
-                        st.markdown(f'''
-                            <div class="option-correct">
-                                ✅ <strong>{opt}.</strong> {opt_text} (Your answer - Correct!)
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    elif opt == q.correct_answer:
-                        st.markdown(f'''
-                            <div class="option-correct">
-                                ✅ <strong>{opt}.</strong> {opt_text} (Correct Answer)
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    elif opt == user_ans:
-                        st.markdown(f'''
-                            <div class="option-incorrect">
-                                ❌ <strong>{opt}.</strong> {opt_text} (Your answer)
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    else:
-                        st.markdown(f'''
-                            <div class="option-normal">
-                                ⚪ <strong>{opt}.</strong> {opt_text}
-                            </div>
-                        ''', unsafe_allow_html=True)
-
-                if q.explanation:
-                    st.markdown(f'''
-                        <div class="explanation-box">
-                            <strong>📚 Explanation:</strong><br>
-                            {q.explanation}
-                        </div>
-                    ''', unsafe_allow_html=True)
+                render_answer_review(q, user_ans)
+
 
-                st.caption(f"Source: {q.source_file} | Subject: {q.subject or 'Untagged'}")
+def render_answer_review(q, user_ans):
+    """One reviewed question: the options marked against the user's answer, and the explanation"""
+    st.markdown(f"**Question:** {q.question_text}")
+    display_question_image(q)
+    st.markdown("---")
+
+    for opt in ['A', 'B', 'C', 'D']:
+        opt_text = getattr(q, f'option_{opt.lower()}')
+
+        if opt == q.correct_answer and opt == user_ans:
+            st.markdown(f'''
+                <div class="option-correct">
+                    ✅ <strong>{opt}.</strong> {opt_text} (Your answer - Correct!)
+                </div>
+            ''', unsafe_allow_html=True)
+        elif opt == q.correct_answer:
+            st.markdown(f'''
+                <div class="option-correct">
+                    ✅ <strong>{opt}.</strong> {opt_text} (Correct Answer)
+                </div>
+            ''', unsafe_allow_html=True)
+        elif opt == user_ans:
+            st.markdown(f'''
+                <div class="option-incorrect">
+                    ❌ <strong>{opt}.</strong> {opt_text} (Your answer)
+                </div>
+            ''', unsafe_allow_html=True)
+        else:
+            st.markdown(f'''
+                <div class="option-normal">
+                    ⚪ <strong>{opt}.</strong> {opt_text}
+                </div>
+            ''', unsafe_allow_html=True)
+
+    if q.explanation:
+        st.markdown(f'''
+            <div class="explanation-box">
+                <strong>📚 Explanation:</strong><br>
+                {q.explanation}
+            </div>
+        ''', unsafe_allow_html=True)
+
+    st.caption(f"Source: {q.source_file} | Subject: {q.subject or 'Untagged'}")
 
 
 def render_mock_login():
@@ -673,6 +769,32 @@ def render_mock_login():
         st.rerun()
 
 
+def render_mock_attempt_review(attempt):
+    """Review of a submitted mock attempt, its questions rehydrated from the bank"""
+    try:
+        reviewed = attempt_questions(get_question_index(), attempt) if attempt else None
+    except ValueError as e:
+        st.warning(f"Could not load your attempt: {e}")
+        return
+    if reviewed is None:
+        # Attempts saved before question ids were recorded
+        return
+    questions, answers = reviewed
+
+    st.markdown("---")
+    if not st.checkbox("📖 Review your attempt"):
+        return
+
+    for i, (q, user_ans) in enumerate(zip(questions, answers)):
+        is_correct = user_ans == q.correct_answer
+        is_attempted = user_ans is not None
+        with st.expander(
+            f"{'✅' if is_correct else '❌' if is_attempted else '⬜'} "
+            f"Q{i+1}. {q.question_text[:80]}...",
+        ):
+            render_answer_review(q, user_ans)
+
+
 def render_mock_exam():
     """Render the real mock exam with timer and navigator"""
     mock_store = MockExamStorage()
@@ -687,10 +809,12 @@ def render_mock_exam():
             st.session_state.exam_mode = "practice"
             st.session_state.current_page = "home"
             st.rerun()
+        render_mock_attempt_review(mock_store.load_mock_attempt(user_id, mock_id))
         st.stop()
 
     # Init mock session once
-    init_mock_session(st.session_state.questions)
+    index = get_question_index()
+    init_mock_session(index.bank, index, mock_id, user_id)
 
     time_left = remaining_time()
 
@@ -713,6 +837,7 @@ def render_mock_exam():
     idx = st.session_state.mock_current_q
     questions = st.session_state.mock_questions
     question = questions[idx]
+    track_question_time()
 
     # ── Header info ──
     col1, col2 = st.columns(2)
@@ -749,6 +874,7 @@ def render_mock_exam():
         if picked:
             start_exam_if_needed()
             st.session_state.mock_answers[idx] = picked
+            save_mock_state()
 
     st.radio(
         "Select your answer:",
@@ -767,16 +893,19 @@ def render_mock_exam():
     with col1:
         if st.button("⬅️ Previous", disabled=idx == 0):
             st.session_state.mock_current_q -= 1
+            save_mock_state()
             st.rerun()
 
     with col2:
         if st.button("➡️ Next", disabled=idx >= 149):
             st.session_state.mock_current_q += 1
+            save_mock_state()
             st.rerun()
 
     with col3:
         if st.button("❌ Clear"):
             st.session_state.mock_answers[idx] = None
+            save_mock_state()
             st.rerun()
 
     with col4:
@@ -835,6 +964,7 @@ def render_mock_exam():
             with cols[col_idx]:
                 if st.button(label, key=f"mock_nav_{i}"):
                     st.session_state.mock_current_q = i
+                    save_mock_state()
                     st.rerun()
 
 
@@ -842,6 +972,8 @@ def submit_mock_exam():
     """Submit mock exam and save results"""
     mock_store = MockExamStorage()
     mock_id = get_current_mock_id()
+    end_time = time.time()
+    track_question_time()
 
     analysis = analyze_mock_attempt(
         user_id=st.session_state.user_id,
@@ -849,21 +981,26 @@ def submit_mock_exam():
         questions=st.session_state.mock_questions,
         answers=st.session_state.mock_answers,
         start_time=st.session_state.mock_start_time,
-        end_time=time.time(),
+        end_time=end_time,
+        time_spent=st.session_state.mock_time_spent,
     )
 
     mock_store.save_mock_attempt({
         "user_id": st.session_state.user_id,
         "mock_id": mock_id,
         "mode": "mock",
-        "raw": {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "start_time": st.session_state.mock_start_time,
-            "end_time": time.time(),
-            "answers": st.session_state.mock_answers,
-        },
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "start_time": st.session_state.mock_start_time,
+        "end_time": end_time,
+        **mock_attempt_payload(),
         "analysis": analysis.to_dict(),
     })
+    submit_mock_state()
+    questions = st.session_state.mock_questions
+    record_exposure(questions, {
+        q.id: st.session_state.mock_answers[i] for i, q in enumerate(questions)
+    })
+    schedule_reviews(analysis.question_results)
 
     st.success("✅ Mock Exam Submitted Successfully!")
     st.info(
@@ -882,7 +1019,10 @@ def render_practice():
     """Render practice setup page"""
     st.header("📝 Start Practice Session")
 
-    questions = st.session_state.questions
+    questions = get_bank()
+
+    if st.session_state.user_id:
+        render_review_due()
 
     col1, col2 = st.columns(2)
 
@@ -892,28 +1032,38 @@ def render_practice():
     with col2:
         mode = st.selectbox("Mode", ["All Questions", "Image Questions Only", "Non-Image Questions"])
 
-    subjects = sorted(set(q.subject for q in questions if q.subject))
-    subjects = ["All Subjects"] + subjects
+    subjects = ["All Subjects"] + get_question_index().values("subject")
 
     selected_subject = st.selectbox("Filter by Subject", subjects)
 
-    available = [q for q in questions if q.is_valid and q.correct_answer]
+    if st.session_state.user_id:
+        history = st.selectbox(
+            "History",
+            ["All Questions", "Unseen Only", "Previously Wrong", "Not Seen in 30 Days"],
+        )
+    else:
+        history = "All Questions"
+        st.caption("Log in through the Real Mock Test page to filter by your history")
+
+    filters = {"is_valid": True, "has_answer": True}
+
+    within = history_mask(history)
+    if within is not None:
+        filters["within"] = within
 
     if mode == "Image Questions Only":
-        available = [q for q in available if q.images]
+        filters["has_images"] = True
     elif mode == "Non-Image Questions":
-        available = [q for q in available if not q.images and not q.has_image_reference]
+        filters["has_images"] = False
+        filters["has_image_reference"] = False
 
     if selected_subject != "All Subjects":
-        available = [q for q in available if q.subject == selected_subject]
+        filters["subject"] = selected_subject
 
-    st.info(f"📊 {len(available)} questions available with current filters")
+    st.info(f"📊 {count_matching(**filters)} questions available with current filters")
 
     if st.button("🚀 Start Practice", type="primary", use_container_width=True):
-        if len(available) >= num_questions:
-            selected = random.sample(available, num_questions)
-        else:
-            selected = available
+        selected = sample_matching(num_questions, **filters)
 
         if selected:
             start_practice_exam_with_questions(selected)
@@ -921,6 +1071,25 @@ def render_practice():
             st.error("No questions match your filters!")
 
 
+def render_review_due():
+    """Offer the logged-in user's due review cards, most overdue first"""
+    due_ids = get_review_scheduler().due(st.session_state.user_id, REVIEW_CONFIG.session_size)
+    if not due_ids:
+        return
+
+    st.markdown("### 🔁 Review Due")
+    st.info(f"📅 {len(due_ids)} questions due for review")
+    if st.button("🔁 Start Review", use_container_width=True):
+        index = get_question_index()
+        by_id = index.id_positions()
+        positions = [by_id[q_id] for q_id in due_ids if q_id in by_id]
+        if positions:
+            start_practice_exam_with_questions(QuestionSelection(index.bank, positions))
+        else:
+            st.error("The questions due for review are no longer in the bank")
+    st.markdown("---")
+
+
 def start_practice_exam_with_questions(selected_questions):
     """Start practice exam with pre-selected questions"""
     st.session_state.exam_questions = selected_questions
@@ -933,48 +1102,139 @@ def start_practice_exam_with_questions(selected_questions):
     st.rerun()
 
 
+def render_adaptive():
+    """One question at a time, the most informative at the student's current ability"""
+    st.header("🧠 Adaptive Practice")
+
+    params = get_irt_parameters()
+    if params is None:
+        st.warning("No difficulty estimates yet. Run `python main.py fit-irt` first.")
+        return
+
+    index = get_question_index()
+    selector = AdaptiveSelector(index, params)
+    state = st.session_state.get('adaptive')
+    if state is None or state["bank"] is not index.bank:
+        # New session, or the bank was reloaded and positions moved
+        user_id = st.session_state.user_id
+        prior = params.user_ability(user_id) if user_id else 0.0
+        state = st.session_state.adaptive = {
+            "bank": index.bank, "prior": prior, "theta": prior,
+            "positions": [], "correct": [], "current": None, "picked": None,
+        }
+
+    if state["current"] is None:
+        state["current"] = selector.next_question(
+            state["theta"], index.mask(is_valid=True, has_answer=True), state["positions"])
+        state["picked"] = None
+        if state["current"] is None:
+            st.success("🎉 You have answered every available question!")
+            return
+
+    answered = len(state["correct"])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Answered", answered)
+    col2.metric("Accuracy", f"{sum(state['correct']) / answered * 100:.0f}%" if answered else "-")
+    col3.metric("Ability estimate", f"{state['theta']:+.2f}")
+
+    question = index.bank[state["current"]]
+    st.markdown(f"""
+        <div class="question-box">
+            <strong>Q{answered + 1}.</strong> {question.question_text}
+        </div>
+    """, unsafe_allow_html=True)
+    display_question_image(question)
+
+    options = {
+        'A': question.option_a,
+        'B': question.option_b,
+        'C': question.option_c,
+        'D': question.option_d,
+    }
+    picked = st.radio(
+        "Select your answer:",
+        options=['A', 'B', 'C', 'D'],
+        format_func=lambda x: f"{x}. {options[x]}",
+        index=None,
+        key=f"adaptive_q_{answered}",
+        disabled=state["picked"] is not None,
+    )
+
+    if state["picked"] is None:
+        if st.button("✅ Check Answer", type="primary", disabled=picked is None):
+            is_correct = picked == question.correct_answer
+            state["picked"] = picked
+            state["positions"].append(state["current"])
+            state["correct"].append(is_correct)
+            state["theta"] = selector.update_ability(state["prior"], state["positions"], state["correct"])
+            record_exposure([question], {question.id: picked})
+            st.rerun()
+        return
+
+    if state["correct"][-1]:
+        st.success(f"✅ Correct! The answer is {question.correct_answer}")
+    else:
+        st.error(f"❌ You chose {state['picked']}; the answer is {question.correct_answer}")
+    if question.explanation:
+        st.markdown(f'''
+            <div class="explanation-box">
+                <strong>📚 Explanation:</strong><br>
+                {question.explanation}
+            </div>
+        ''', unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("➡️ Next Question", type="primary"):
+            state["current"] = None
+            st.rerun()
+    with col2:
+        if st.button("⏹️ End Session"):
+            del st.session_state['adaptive']
+            st.session_state.current_page = 'home'
+            st.rerun()
+
+
 def render_browse():
     """Browse all questions"""
     st.header("📖 Browse Questions")
 
-    questions = st.session_state.questions
-
     col1, col2, col3 = st.columns(3)
 
     with col1:
         search = st.text_input("🔍 Search", "")
 
     with col2:
-        subjects = ["All"] + sorted(set(q.subject for q in questions if q.subject))
+        subjects = ["All"] + get_question_index().values("subject")
         subject = st.selectbox("Subject", subjects)
 
     with col3:
         image_filter = st.selectbox("Images", ["All", "With Images", "Without Images"])
 
-    filtered = questions
+    filters = {}
 
     if search:
-        filtered = [q for q in filtered if search.lower() in q.question_text.lower()]
+        filters["search"] = search
 
     if subject != "All":
-        filtered = [q for q in filtered if q.subject == subject]
+        filters["subject"] = subject
 
     if image_filter == "With Images":
-        filtered = [q for q in filtered if q.images]
+        filters["has_images"] = True
     elif image_filter == "Without Images":
-        filtered = [q for q in filtered if not q.images]
+        filters["has_images"] = False
 
-    st.info(f"Showing {len(filtered)} questions")
+    total_matching = count_matching(**filters)
+    st.info(f"Showing {total_matching} questions")
 
     per_page = 10
-    total_pages = (len(filtered) - 1) // per_page + 1 if filtered else 1
+    total_pages = (total_matching - 1) // per_page + 1 if total_matching else 1
 
     page = st.number_input("Page", 1, total_pages, 1)
 
     start_idx = (page - 1) * per_page
-    end_idx = start_idx + per_page
 
-    for i, q in enumerate(filtered[start_idx:end_idx]):
+    for i, q in enumerate(page_matching(per_page, start_idx, **filters)):
         with st.expander(f"Q{start_idx + i + 1}. {q.question_text[:100]}..."):
             st.markdown(f"**Question:** {q.question_text}")
             display_question_image(q)
@@ -1003,10 +1263,11 @@ def render_image_questions():
     """View only image-based questions"""
     st.header("🖼️ Image-Based Questions")
 
-    questions = st.session_state.questions
+    index = get_question_index()
+    questions = index.bank
 
-    image_questions = [q for q in questions if q.images]
-    needs_images = [q for q in questions if q.has_image_reference and not q.images]
+    image_questions = index.positions(has_images=True)
+    needs_images = index.positions(has_image_reference=True, has_images=False)
 
     col1, col2, col3 = st.columns(3)
 
@@ -1027,7 +1288,7 @@ def render_image_questions():
         if not image_questions:
             st.info("No questions with linked images found.")
         else:
-            for i, q in enumerate(image_questions[:20]):
+            for i, q in enumerate(questions[p] for p in image_questions[:20]):
                 with st.expander(f"Q{i+1}. {q.question_text[:80]}...", expanded=(i < 3)):
                     st.markdown(f"**Question:** {q.question_text}")
                     display_question_image(q)
@@ -1049,7 +1310,7 @@ def render_image_questions():
         else:
             st.warning(f"{len(needs_images)} questions reference images but couldn't be linked.")
 
-            for i, q in enumerate(needs_images[:20]):
+            for i, q in enumerate(questions[p] for p in needs_images[:20]):
                 with st.expander(f"Q{i+1}. {q.question_text[:80]}..."):
                     st.markdown(f"**Question:** {q.question_text}")
                     st.markdown(f"**Pattern matched:** `{q.image_pattern_matched}`")
@@ -1061,53 +1322,42 @@ def render_stats():
     """Render statistics page"""
     st.header("📊 Question Bank Statistics")
 
-    questions = st.session_state.questions
+    stats = get_bank_stats()
+    total = stats.get("total", 0)
 
-    if not questions:
+    if not total:
         st.warning("No questions loaded.")
         return
 
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Total Questions", len(questions))
+        st.metric("Total Questions", total)
 
     with col2:
-        with_ans = sum(1 for q in questions if q.correct_answer)
-        st.metric("With Answers", with_ans)
+        st.metric("With Answers", stats["with_answers"])
 
     with col3:
-        with_exp = sum(1 for q in questions if q.explanation)
-        st.metric("With Explanations", with_exp)
+        st.metric("With Explanations", stats["with_explanations"])
 
     with col4:
-        with_img = sum(1 for q in questions if q.images)
-        st.metric("With Images", with_img)
+        st.metric("With Images", stats["with_images"])
 
     st.markdown("---")
 
     st.subheader("📚 Subject Distribution")
 
-    subject_counts = {}
-    for q in questions:
-        subj = q.subject or "Untagged"
-        subject_counts[subj] = subject_counts.get(subj, 0) + 1
-
-    sorted_subjects = sorted(subject_counts.items(), key=lambda x: -x[1])
+    sorted_subjects = sorted(stats["by_subject"].items(), key=lambda x: -x[1])
 
     for subj, count in sorted_subjects[:15]:
-        pct = count / len(questions) * 100
+        pct = count / total * 100
         st.progress(pct / 100, f"{subj}: {count} ({pct:.1f}%)")
 
     st.markdown("---")
 
     st.subheader("📁 Source Files")
 
-    source_counts = {}
-    for q in questions:
-        source_counts[q.source_file] = source_counts.get(q.source_file, 0) + 1
-
-    for source, count in sorted(source_counts.items(), key=lambda x: -x[1]):
+    for source, count in sorted(stats["by_source"].items(), key=lambda x: -x[1]):
         st.text(f"{source}: {count} questions")
 
 
@@ -1130,6 +1380,8 @@ def main():
         render_mock_login()
     elif page == 'mock_exam':
         render_mock_exam()
+    elif page == 'adaptive':
+        render_adaptive()
     elif page == 'browse':
         render_browse()
     elif page == 'images':